@@ -1,9 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks, Query
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
+from app.core.metrics import track_stage
+from app.core.responses import APIResponse, columnar
 from app.models import schemas
-from app.models.db_models import CML, UploadHistory, RiskLevel
-import pandas as pd
+from app.models.db_models import CML, Measurement, UploadHistory, RiskLevel
+# Registers forecast cache and remaining-life invalidation on inspection history changes
+import app.services.forecast_cache  # noqa: F401
+from app.services.fleet_metrics import recompute_fleet_metrics
+from app.services.remaining_life import refresh_remaining_life
+from app.services.thickness_state import sync_thickness_states
 import logging
 from datetime import datetime
 from typing import List, Optional
@@ -19,6 +27,8 @@ async def upload_cml_data(
     db: Session = Depends(get_db)
 ):
     """Upload and parse CML data from Excel file"""
+    import pandas as pd
+    
     start_time = time.time()
     
     if not file.filename.endswith(('.xlsx', '.xls')):
@@ -64,11 +74,18 @@ async def upload_cml_data(
             'Notes': 'notes'
         }
         
+        # Load the CMLs being updated up front rather than one lookup per row
+        uploaded_ids = df['CML_ID'].dropna().astype(str).unique().tolist()
+        existing_cmls = {}
+        for start in range(0, len(uploaded_ids), 1000):
+            chunk = uploaded_ids[start:start + 1000]
+            existing_cmls.update({c.cml_id: c for c in db.query(CML).filter(CML.cml_id.in_(chunk))})
+        
         # Process each row
         for idx, row in df.iterrows():
             try:
                 # Check if CML already exists
-                existing = db.query(CML).filter(CML.cml_id == row['CML_ID']).first()
+                existing = existing_cmls.get(str(row['CML_ID']))
                 if existing:
                     # Update existing
                     for excel_col, db_col in column_map.items():
@@ -89,6 +106,7 @@ async def upload_cml_data(
                     
                     cml = CML(**cml_data)
                     db.add(cml)
+                    existing_cmls[str(row['CML_ID'])] = cml
                 
                 successful += 1
             except Exception as e:
@@ -98,6 +116,12 @@ async def upload_cml_data(
         
         db.commit()
         
+        # Recompute corrosion rates, remaining life and risk from the uploaded history, rebuild
+        # the remaining-life index and advance the thickness filters, each in one vectorized pass
+        recompute_fleet_metrics(db, cml_ids=uploaded_ids)
+        refresh_remaining_life(db, cml_ids=uploaded_ids)
+        sync_thickness_states(db, cml_ids=uploaded_ids)
+        
         # Log upload history
         upload_record = UploadHistory(
             filename=file.filename,
@@ -126,9 +150,9 @@ async def upload_cml_data(
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 @router.get("/summary", response_model=schemas.CMLSummary)
-async def get_summary(db: Session = Depends(get_db)):
+async def get_summary(db: AsyncSession = Depends(get_async_db)):
     """Get summary statistics of all CMLs"""
-    cmls = db.query(CML).all()
+    cmls = (await db.scalars(select(CML))).all()
     
     risk_dist = {
         'Critical': sum(1 for c in cmls if c.risk_level == RiskLevel.CRITICAL),
@@ -149,6 +173,9 @@ async def get_summary(db: Session = Depends(get_db)):
         systems=list(set(c.system for c in cmls if c.system))
     )
 
+# Fields of the column-oriented /list layout, matching CMLResponse
+LIST_COLUMNS = list(schemas.CMLResponse.model_fields)
+
 @router.get("/list", response_model=List[schemas.CMLResponse])
 async def list_cmls(
     facility: Optional[str] = None,
@@ -156,29 +183,121 @@ async def list_cmls(
     elimination_only: bool = False,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    layout: str = Query(default="rows", pattern="^(rows|columns)$"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List CMLs with optional filtering"""
-    query = db.query(CML)
+    """List CMLs with optional filtering, as CML objects or (layout=columns) one array per field"""
+    if layout == 'columns':
+        query = select(*(getattr(CML, name) for name in LIST_COLUMNS))
+    else:
+        query = select(CML)
     
     if facility:
-        query = query.filter(CML.facility == facility)
+        query = query.where(CML.facility == facility)
     if risk_level:
-        query = query.filter(CML.risk_level == RiskLevel[risk_level.upper().replace(' ', '_')])
+        query = query.where(CML.risk_level == RiskLevel[risk_level.upper().replace(' ', '_')])
     if elimination_only:
-        query = query.filter(CML.elimination_candidate == True)
+        query = query.where(CML.elimination_candidate == True)
+    
+    if layout == 'columns':
+        rows = (await db.execute(query.offset(skip).limit(limit))).all()
+        return APIResponse(content=columnar(rows, LIST_COLUMNS))
     
-    cmls = query.offset(skip).limit(limit).all()
+    cmls = (await db.scalars(query.offset(skip).limit(limit))).all()
     return cmls
 
 @router.get("/{cml_id}", response_model=schemas.CMLResponse)
-async def get_cml(cml_id: str, db: Session = Depends(get_db)):
+async def get_cml(cml_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get details of a specific CML"""
-    cml = db.query(CML).filter(CML.cml_id == cml_id).first()
+    cml = await db.scalar(select(CML).where(CML.cml_id == cml_id))
     if not cml:
         raise HTTPException(status_code=404, detail="CML not found")
     return cml
 
+@router.post("/{cml_id}/measurements")
+async def add_measurement(
+    cml_id: str,
+    measurement: schemas.MeasurementCreate,
+    db: Session = Depends(get_db)
+):
+    """Record a new thickness measurement for a CML"""
+    cml = db.query(CML).filter(CML.cml_id == cml_id).first()
+    if not cml:
+        raise HTTPException(status_code=404, detail="CML not found")
+    
+    db.add(Measurement(cml_id=cml.id, **measurement.model_dump()))
+    
+    # Keep the inspection history the forecasts work from in step
+    new_date = measurement.inspection_date.isoformat()
+    new_value = f"{measurement.measured_thickness_mm:.3f}"
+    if cml.inspection_history_dates and cml.inspection_history_measurements:
+        cml.inspection_history_dates = f"{cml.inspection_history_dates}|{new_date}"
+        cml.inspection_history_measurements = f"{cml.inspection_history_measurements}|{new_value}"
+    else:
+        cml.inspection_history_dates = new_date
+        cml.inspection_history_measurements = new_value
+    
+    if cml.last_inspection_date is None or measurement.inspection_date >= cml.last_inspection_date:
+        cml.last_inspection_date = measurement.inspection_date
+        cml.current_thickness_mm = measurement.measured_thickness_mm
+    cml.number_of_inspections = (cml.number_of_inspections or 0) + 1
+    
+    db.commit()
+    
+    return {"message": "Measurement recorded successfully", "cml_id": cml.cml_id}
+
+@router.get("/{cml_id}/explanation", response_model=schemas.CMLExplanation)
+async def get_cml_explanation(
+    cml_id: str,
+    top_k: int = Query(default=5, ge=1, le=50),
+    include_shap_values: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Get SHAP explanation for a CML's elimination prediction, computed on demand"""
+    from app.services.explanation_service import ExplanationService
+
+    cml = db.query(CML).filter(CML.cml_id == cml_id).first()
+    if not cml:
+        raise HTTPException(status_code=404, detail="CML not found")
+
+    try:
+        explanations = ExplanationService().explain(
+            [cml], top_k=top_k, include_shap_values=include_shap_values
+        )
+    except ValueError:
+        raise HTTPException(status_code=404, detail="No trained model available. Run /analyze first")
+
+    if cml.cml_id not in explanations:
+        raise HTTPException(status_code=500, detail="Explanation could not be computed")
+
+    return explanations[cml.cml_id]
+
+@router.post("/explanations", response_model=schemas.ExplanationBatchResponse)
+async def get_cml_explanations(
+    request: schemas.ExplanationBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """Get SHAP explanations for many CMLs in one vectorized call"""
+    from app.services.explanation_service import ExplanationService
+
+    requested = list(dict.fromkeys(request.cml_ids))
+    cmls = db.query(CML).filter(CML.cml_id.in_(requested)).all()
+    found = {c.cml_id for c in cmls}
+
+    explanations = {}
+    if cmls:
+        try:
+            explanations = ExplanationService().explain(
+                cmls, top_k=request.top_k, include_shap_values=request.include_shap_values
+            )
+        except ValueError:
+            raise HTTPException(status_code=404, detail="No trained model available. Run /analyze first")
+
+    return schemas.ExplanationBatchResponse(
+        explanations=[explanations[c] for c in requested if c in explanations],
+        not_found=[c for c in requested if c not in found]
+    )
+
 @router.post("/analyze", response_model=schemas.AnalysisResponse)
 async def analyze_cmls(
     request: schemas.AnalysisRequest,
@@ -204,25 +323,41 @@ async def analyze_cmls(
     model = CMLEliminationModel()
     
     if request.retrain or not os.path.exists(model.model_path):
-        model.train(cmls)
+        with track_stage('elimination_train'):
+            model.train(cmls)
     
-    predictions = model.predict(cmls, threshold=request.threshold)
+    with track_stage('elimination_predict'):
+        predictions = model.predict(cmls, threshold=request.threshold)
     
-    # Update database with predictions
+    # Update database with predictions: one executemany UPDATE by primary key, not one per CML
+    pks_by_id = {c.cml_id: c.id for c in cmls}
+    facilities = {c.facility for c in cmls}
+    predicted_at = datetime.now()
     high_confidence = 0
+    updates = []
     for cml_id, pred in predictions.items():
-        cml = db.query(CML).filter(CML.cml_id == cml_id).first()
-        if cml:
-            cml.ml_elimination_probability = pred['probability']
-            cml.ml_confidence = pred['confidence']
-            cml.ml_prediction_date = datetime.now()
-            cml.shap_values = pred.get('shap_values')
-            cml.elimination_candidate = pred['recommendation'] == 'eliminate'
+        pk = pks_by_id.get(cml_id)
+        if pk is not None:
+            updates.append({
+                'id': pk,
+                'ml_elimination_probability': pred['probability'],
+                'ml_confidence': pred['confidence'],
+                'ml_prediction_date': predicted_at,
+                'shap_values': pred.get('shap_values'),
+                'elimination_candidate': pred['recommendation'] == 'eliminate'
+            })
             if pred['confidence'] > 0.85:
                 high_confidence += 1
     
+    if updates:
+        db.execute(update(CML), updates)
     db.commit()
     
+    # Fleet SHAP importance is rebuilt from a sample of every analyzed facility once per pass,
+    # after the response is sent
+    from app.services.explanation_service import refresh_importance_stats_task
+    background_tasks.add_task(refresh_importance_stats_task, list(facilities))
+    
     # Refresh to get updated data
     results = query.all()
     
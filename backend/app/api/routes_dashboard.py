@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, Response
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.responses import APIResponse, columnar
+from app.core.shared_cache import shared_cache
 from app.models import schemas
 from app.models.db_models import CML, RiskLevel
+from app.services.data_version import cml_version_async
 import logging
 from datetime import datetime
 import json
@@ -11,10 +14,21 @@ import json
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Aggregates are shared by all workers on the host and keyed by the CML table's version
+CACHE_NAMESPACE = 'dashboard'
+
+async def _cache_key(db: AsyncSession, name: str) -> str:
+    return f"{name}|{await cml_version_async(db)}"
+
 @router.get("/metrics", response_model=schemas.DashboardMetrics)
-async def get_dashboard_metrics(db: Session = Depends(get_db)):
+async def get_dashboard_metrics(db: AsyncSession = Depends(get_async_db)):
     """Get key metrics for dashboard"""
-    cmls = db.query(CML).all()
+    key = await _cache_key(db, 'metrics')
+    cached = await shared_cache.get_async(CACHE_NAMESPACE, key)
+    if cached is not None:
+        return schemas.DashboardMetrics(**cached)
+    
+    cmls = (await db.scalars(select(CML))).all()
     
     metrics = schemas.DashboardMetrics(
         total_cmls=len(cmls),
@@ -28,12 +42,37 @@ async def get_dashboard_metrics(db: Session = Depends(get_db)):
         facilities_count=len(set(c.facility for c in cmls if c.facility)),
         last_updated=datetime.now()
     )
+    await shared_cache.put_async(CACHE_NAMESPACE, key, metrics.model_dump(mode='json'))
     return metrics
 
+RISK_MATRIX_COLUMNS = ['cml_id', 'corrosion_rate', 'remaining_life', 'risk_level', 'facility', 'commodity']
+
 @router.get("/risk-matrix")
-async def get_risk_matrix(db: Session = Depends(get_db)):
-    """Get risk matrix data for heatmap visualization"""
-    cmls = db.query(CML).all()
+async def get_risk_matrix(
+    layout: str = Query(default="rows", pattern="^(rows|columns)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get risk matrix data for heatmap visualization, as row objects or one array per column"""
+    key = await _cache_key(db, f'risk-matrix-{layout}')
+    content = await shared_cache.get_async(CACHE_NAMESPACE, key)
+    if content is not None:
+        return APIResponse(content=content)
+    
+    if layout == 'columns':
+        rows = (await db.execute(
+            select(
+                CML.cml_id, CML.average_corrosion_rate, CML.remaining_life_years,
+                CML.risk_level, CML.facility, CML.commodity
+            ).where(CML.average_corrosion_rate != 0, CML.remaining_life_years != 0)
+        )).all()
+        content = columnar(
+            [(*row[:3], row[3].value if row[3] else 'Unknown', *row[4:]) for row in rows],
+            RISK_MATRIX_COLUMNS
+        )
+        await shared_cache.put_async(CACHE_NAMESPACE, key, content)
+        return APIResponse(content=content)
+    
+    cmls = (await db.scalars(select(CML))).all()
     
     # Create matrix: corrosion rate vs remaining life
     matrix_data = []
@@ -48,12 +87,19 @@ async def get_risk_matrix(db: Session = Depends(get_db)):
                 'commodity': cml.commodity
             })
     
-    return JSONResponse(content={'data': matrix_data, 'count': len(matrix_data)})
+    content = {'data': matrix_data, 'count': len(matrix_data)}
+    await shared_cache.put_async(CACHE_NAMESPACE, key, content)
+    return APIResponse(content=content)
 
 @router.get("/corrosion-trends")
-async def get_corrosion_trends(db: Session = Depends(get_db)):
+async def get_corrosion_trends(db: AsyncSession = Depends(get_async_db)):
     """Get corrosion rate trends by commodity and material"""
-    cmls = db.query(CML).all()
+    key = await _cache_key(db, 'corrosion-trends')
+    content = await shared_cache.get_async(CACHE_NAMESPACE, key)
+    if content is not None:
+        return APIResponse(content=content)
+    
+    cmls = (await db.scalars(select(CML))).all()
     
     # Group by commodity
     commodity_trends = {}
@@ -76,12 +122,50 @@ async def get_corrosion_trends(db: Session = Depends(get_db)):
     
     trends.sort(key=lambda x: x['avg_rate'], reverse=True)
     
-    return JSONResponse(content={'trends': trends})
+    content = {'trends': trends}
+    await shared_cache.put_async(CACHE_NAMESPACE, key, content)
+    return APIResponse(content=content)
+
+ELIMINATION_COLUMNS = [
+    'cml_id', 'facility', 'system', 'commodity', 'risk_level', 'remaining_life',
+    'ml_probability', 'ml_confidence', 'sme_override', 'sme_decision', 'reason'
+]
+
+def _elimination_reason(risk_level, remaining_life) -> str:
+    return f"Low risk ({risk_level.value}), {remaining_life:.1f} years remaining" if remaining_life else "Low risk"
 
 @router.get("/elimination-summary")
-async def get_elimination_summary(db: Session = Depends(get_db)):
-    """Get summary of elimination candidates with reasoning"""
-    candidates = db.query(CML).filter(CML.elimination_candidate == True).all()
+async def get_elimination_summary(
+    layout: str = Query(default="rows", pattern="^(rows|columns)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get summary of elimination candidates with reasoning, as row objects or one array per column"""
+    key = await _cache_key(db, f'elimination-summary-{layout}')
+    content = await shared_cache.get_async(CACHE_NAMESPACE, key)
+    if content is not None:
+        return APIResponse(content=content)
+    
+    if layout == 'columns':
+        rows = (await db.execute(
+            select(
+                CML.cml_id, CML.facility, CML.system, CML.commodity, CML.risk_level,
+                CML.remaining_life_years, CML.ml_elimination_probability, CML.ml_confidence,
+                CML.sme_override, CML.sme_decision
+            ).where(CML.elimination_candidate == True)
+        )).all()
+        content = columnar(
+            [
+                (*row[:4], row[4].value if row[4] else 'Unknown', *row[5:], _elimination_reason(row[4], row[5]))
+                for row in rows
+            ],
+            ELIMINATION_COLUMNS
+        )
+        content['total_candidates'] = content['count']
+        content['sme_overrides'] = sum(1 for override in content['columns']['sme_override'] if override)
+        await shared_cache.put_async(CACHE_NAMESPACE, key, content)
+        return APIResponse(content=content)
+    
+    candidates = (await db.scalars(select(CML).where(CML.elimination_candidate == True))).all()
     
     summary = []
     for cml in candidates:
@@ -96,19 +180,26 @@ async def get_elimination_summary(db: Session = Depends(get_db)):
             'ml_confidence': cml.ml_confidence,
             'sme_override': cml.sme_override,
             'sme_decision': cml.sme_decision,
-            'reason': f"Low risk ({cml.risk_level.value}), {cml.remaining_life_years:.1f} years remaining" if cml.remaining_life_years else "Low risk"
+            'reason': _elimination_reason(cml.risk_level, cml.remaining_life_years)
         })
     
-    return JSONResponse(content={
+    content = {
         'total_candidates': len(summary),
         'candidates': summary,
         'sme_overrides': sum(1 for c in candidates if c.sme_override)
-    })
+    }
+    await shared_cache.put_async(CACHE_NAMESPACE, key, content)
+    return APIResponse(content=content)
 
 @router.get("/facility-breakdown")
-async def get_facility_breakdown(db: Session = Depends(get_db)):
+async def get_facility_breakdown(db: AsyncSession = Depends(get_async_db)):
     """Get CML breakdown by facility"""
-    cmls = db.query(CML).all()
+    key = await _cache_key(db, 'facility-breakdown')
+    content = await shared_cache.get_async(CACHE_NAMESPACE, key)
+    if content is not None:
+        return APIResponse(content=content)
+    
+    cmls = (await db.scalars(select(CML))).all()
     
     facility_data = {}
     for cml in cmls:
@@ -136,4 +227,33 @@ async def get_facility_breakdown(db: Session = Depends(get_db)):
         elif cml.risk_level == RiskLevel.LOW:
             facility_data[facility]['low'] += 1
     
-    return JSONResponse(content={'facilities': facility_data})
+    content = {'facilities': facility_data}
+    await shared_cache.put_async(CACHE_NAMESPACE, key, content)
+    return APIResponse(content=content)
+
+@router.get("/feature-importance")
+async def get_feature_importance(
+    facility: str = None,
+    model_version: str = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get fleet-wide SHAP feature importance and variance accumulated across explained batches"""
+    from app.services.explanation_service import load_importance_stats
+    
+    accumulator = await db.run_sync(load_importance_stats, model_version)
+    if accumulator is None:
+        raise HTTPException(status_code=404, detail="No feature importance statistics available")
+    
+    importance = accumulator.importance(facility)
+    features = sorted(
+        importance['features'].items(), key=lambda x: x[1]['importance'], reverse=True
+    )
+    
+    return APIResponse(content={
+        'model_version': accumulator.model_version,
+        'facility': facility,
+        'facilities': sorted(accumulator.slices.keys()),
+        'sample_count': importance['count'],
+        'population': importance['population'],
+        'features': [{'feature': name, **stats} for name, stats in features]
+    })
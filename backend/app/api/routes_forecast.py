@@ -1,22 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
+from app.core.metrics import track_stage
+from app.core.responses import APIResponse
+from app.core.shared_cache import shared_cache
 from app.models import schemas
-from app.models.db_models import CML, Forecast
+from app.models.db_models import CML, Forecast, ForecastRun
+from app.services.data_version import cml_version
+from app.services.forecast_cache import ForecastCache, forecast_cache_key, payload_from_points
+from app.services.remaining_life import (
+    compute_remaining_life, get_remaining_life, query_remaining_life, refresh_remaining_life
+)
+from app.services.thickness_state import get_thickness_state, state_failure_date, state_forecast
 import logging
-from datetime import datetime, timedelta
-import pandas as pd
+from datetime import date
+from typing import TYPE_CHECKING, List, Optional
+import json
+import time
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def _to_forecast_points(forecast_df: 'pd.DataFrame') -> List[schemas.ForecastPoint]:
+    """Convert a model forecast DataFrame to API forecast points"""
+    import pandas as pd
+    
+    forecast_points = []
+    for _, row in forecast_df.iterrows():
+        forecast_points.append(schemas.ForecastPoint(
+            date=pd.Timestamp(row['ds']).date(),
+            predicted_thickness=round(row['yhat'], 2),
+            lower_bound=round(row.get('yhat_lower', row['yhat'] - 0.5), 2),
+            upper_bound=round(row.get('yhat_upper', row['yhat'] + 0.5), 2)
+        ))
+    return forecast_points
+
+def _isoformat(value) -> Optional[str]:
+    import pandas as pd
+    
+    return None if pd.isna(value) else pd.Timestamp(value).date().isoformat()
+
+def _failure_dates(remaining_life) -> dict:
+    """Earliest/expected/latest minimum-thickness dates of a remaining-life row"""
+    if remaining_life is None:
+        return {}
+    return {
+        'estimated_failure_date': remaining_life.expected_date,
+        'earliest_failure_date': remaining_life.earliest_date,
+        'latest_failure_date': remaining_life.latest_date
+    }
+
 @router.post("/predict", response_model=schemas.ForecastResponse)
 async def predict_forecast(
     request: schemas.ForecastRequest,
     db: Session = Depends(get_db)
 ):
     """Generate thickness forecast for a CML"""
-    from app.ml.model_forecast import CMLForecastModel
+    from app.ml.model_forecast import CMLForecastModel, history_to_frame
     
     # Get CML
     cml = db.query(CML).filter(CML.cml_id == request.cml_id).first()
@@ -28,84 +74,317 @@ async def predict_forecast(
         raise HTTPException(status_code=400, detail="Insufficient historical data for forecasting")
     
     try:
-        dates_str = cml.inspection_history_dates.split('|')
-        measurements_str = cml.inspection_history_measurements.split('|')
+        df = history_to_frame(cml.inspection_history_dates, cml.inspection_history_measurements)
         
-        dates = [datetime.strptime(d.strip(), '%Y-%m-%d').date() for d in dates_str]
-        measurements = [float(m.strip()) for m in measurements_str]
-        
-        if len(dates) < 3:
+        if len(df) < 3:
             raise HTTPException(status_code=400, detail="Need at least 3 historical measurements")
         
-        # Create DataFrame for model
-        df = pd.DataFrame({
-            'ds': dates,
-            'y': measurements
-        })
-        
-        # Initialize and run forecast model
-        forecast_model = CMLForecastModel(model_type=request.model_type)
-        forecast_df = forecast_model.predict(df, periods=request.periods)
+        # Serve repeat views from the cache; the key changes whenever the history does
+        cache = ForecastCache(db)
+        cache_key = forecast_cache_key(df, request.model_type, request.periods)
+        cached = cache.get(cml.id, cache_key)
         
-        # Convert to forecast points
-        forecast_points = []
-        for _, row in forecast_df.iterrows():
-            forecast_points.append(schemas.ForecastPoint(
-                date=row['ds'],
-                predicted_thickness=round(row['yhat'], 2),
-                lower_bound=round(row.get('yhat_lower', row['yhat'] - 0.5), 2),
-                upper_bound=round(row.get('yhat_upper', row['yhat'] + 0.5), 2)
-            ))
-        
-        # Estimate failure date (when thickness hits min allowable)
-        estimated_failure = None
-        for point in forecast_points:
-            if point.predicted_thickness <= cml.min_allowable_thickness_mm:
-                estimated_failure = point.date
-                break
-        
-        # Save forecasts to database
-        for point in forecast_points:
-            forecast_record = Forecast(
+        if cached is not None:
+            forecast_points = [schemas.ForecastPoint(**p) for p in cached['points']]
+        else:
+            if request.model_type == 'kalman':
+                # Read straight from the persisted filter state, no refit over the history
+                forecast_df = state_forecast(get_thickness_state(db, cml), periods=request.periods)
+                if forecast_df is None:
+                    raise HTTPException(status_code=404, detail="No inspection history available for this CML")
+            else:
+                # Initialize and run forecast model
+                forecast_model = CMLForecastModel(model_type=request.model_type)
+                with track_stage(f"forecast_{request.model_type}"):
+                    forecast_df = forecast_model.predict(df, periods=request.periods)
+            
+            # Convert to forecast points
+            forecast_points = _to_forecast_points(forecast_df)
+            
+            # Save forecasts to database as one run, bulk-inserting its points
+            run = ForecastRun(
                 cml_id=cml.id,
-                forecast_date=point.date,
-                predicted_thickness_mm=point.predicted_thickness,
-                lower_bound=point.lower_bound,
-                upper_bound=point.upper_bound,
-                confidence_level=0.95,
-                model_used=request.model_type
+                model_used=request.model_type,
+                periods=request.periods,
+                confidence_level=0.95
             )
-            db.add(forecast_record)
+            db.add(run)
+            db.flush()
+            db.execute(insert(Forecast), [
+                {
+                    'cml_id': cml.id,
+                    'run_id': run.id,
+                    'forecast_date': point.date,
+                    'predicted_thickness_mm': point.predicted_thickness,
+                    'lower_bound': point.lower_bound,
+                    'upper_bound': point.upper_bound,
+                    'confidence_level': 0.95,
+                    'model_used': request.model_type
+                }
+                for point in forecast_points
+            ])
+            
+            cache.put(cml.id, cache_key, request.model_type, request.periods,
+                      payload_from_points(forecast_points, request.model_type))
+            db.commit()
         
-        db.commit()
+        # Dates the thickness trend and its band reach min allowable, solved analytically
+        failure_dates = _failure_dates(get_remaining_life(db, cml))
         
         return schemas.ForecastResponse(
             cml_id=cml.cml_id,
             current_thickness=cml.current_thickness_mm,
             min_allowable=cml.min_allowable_thickness_mm,
             forecast_points=forecast_points,
-            estimated_failure_date=estimated_failure,
-            confidence=0.95
+            confidence=0.95,
+            **failure_dates
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Forecast error for CML {request.cml_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Forecasting failed: {str(e)}")
 
+@router.post("/fleet", response_model=schemas.FleetForecastResponse)
+async def predict_fleet_forecast(
+    request: schemas.FleetForecastRequest,
+    db: Session = Depends(get_db)
+):
+    """Generate linear thickness forecasts for every CML in one vectorized pass"""
+    from app.ml.fleet_forecast import forecast_fleet
+    from app.ml.model_forecast import FORECAST_CODE_VERSION
+    
+    start_time = time.time()
+    
+    # Computed once per host: any worker serves a fleet forecast another already computed
+    cache_key = f"{request.model_dump_json()}|{cml_version(db, request.facility)}|{FORECAST_CODE_VERSION}"
+    content = await shared_cache.get_async('forecast_fleet', cache_key)
+    if content is not None:
+        content['processing_time'] = time.time() - start_time
+        return APIResponse(content=content)
+    
+    query = db.query(
+        CML.cml_id,
+        CML.min_allowable_thickness_mm,
+        CML.inspection_history_dates,
+        CML.inspection_history_measurements
+    )
+    if request.facility:
+        query = query.filter(CML.facility == request.facility)
+    
+    rows = query.all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="No CMLs found matching criteria")
+    
+    cml_ids, min_allowable, dates, measurements = zip(*rows)
+    with track_stage('forecast_fleet'):
+        fleet = forecast_fleet(
+            cml_ids,
+            [m if m is not None else float('nan') for m in min_allowable],
+            dates,
+            measurements,
+            periods=request.periods
+        )
+    
+    summary = fleet['summary']
+    forecast = fleet['forecast']
+    failure_dates = summary['estimated_failure_date'].to_numpy().astype('datetime64[D]').astype(object)
+    
+    results = []
+    for i, (cml_id, rate, std) in enumerate(zip(
+        summary['cml_id'], summary['corrosion_rate_mm_per_year'], summary['residual_std']
+    )):
+        points = None
+        if request.include_points:
+            points = [
+                schemas.ForecastPoint(
+                    date=d,
+                    predicted_thickness=round(y, 2),
+                    lower_bound=round(lo, 2),
+                    upper_bound=round(hi, 2)
+                )
+                for d, y, lo, hi in zip(
+                    forecast['ds'][i].astype(object),
+                    forecast['yhat'][i].tolist(),
+                    forecast['yhat_lower'][i].tolist(),
+                    forecast['yhat_upper'][i].tolist()
+                )
+            ]
+        results.append(schemas.FleetForecastResult(
+            cml_id=cml_id,
+            corrosion_rate_mm_per_year=round(rate, 4),
+            residual_std=round(std, 4),
+            estimated_failure_date=failure_dates[i],
+            forecast_points=points
+        ))
+    
+    response = schemas.FleetForecastResponse(
+        total_cmls=len(rows),
+        forecasted=len(results),
+        skipped=fleet['skipped'],
+        processing_time=time.time() - start_time,
+        results=results
+    )
+    content = response.model_dump(mode='json')
+    await shared_cache.put_async('forecast_fleet', cache_key, content)
+    return APIResponse(content=content)
+
+@router.post("/batch")
+async def predict_batch_forecast(
+    request: schemas.BatchForecastRequest,
+    db: Session = Depends(get_db)
+):
+    """Forecast many CMLs with Prophet or ARIMA fits spread across a process pool, streamed as NDJSON"""
+    from app.ml.model_forecast import history_to_frame, forecast_batch_prophet, forecast_batch_arima
+    
+    query = db.query(
+        CML.cml_id,
+        CML.commodity,
+        CML.material_type,
+        CML.min_allowable_thickness_mm,
+        CML.inspection_history_dates,
+        CML.inspection_history_measurements
+    )
+    if request.cml_ids:
+        query = query.filter(CML.cml_id.in_(request.cml_ids))
+    if request.facility:
+        query = query.filter(CML.facility == request.facility)
+    
+    rows = query.all()
+    histories = {}
+    groups = {}
+    skipped = []
+    for cml_id, commodity, material_type, min_thickness, dates, measurements in rows:
+        try:
+            df = history_to_frame(dates, measurements)
+        except Exception:
+            df = None
+        if df is None or len(df) < 3:
+            skipped.append(cml_id)
+            continue
+        histories[cml_id] = df
+        groups[cml_id] = (commodity, material_type)
+    
+    if not histories:
+        raise HTTPException(status_code=404, detail="No CMLs with sufficient history found")
+    
+    # Minimum-thickness dates for every CML in one vectorized solve
+    cml_ids, _, _, min_allowable, dates, measurements = zip(*rows)
+    remaining_life = compute_remaining_life(cml_ids, min_allowable, dates, measurements).set_index('cml_id')
+    
+    def failure_dates(cml_id):
+        if cml_id not in remaining_life.index:
+            return {'estimated_failure_date': None, 'earliest_failure_date': None, 'latest_failure_date': None}
+        row = remaining_life.loc[cml_id]
+        return {
+            'estimated_failure_date': _isoformat(row['expected_date']),
+            'earliest_failure_date': _isoformat(row['earliest_date']),
+            'latest_failure_date': _isoformat(row['latest_date'])
+        }
+    
+    def stream_results():
+        for cml_id in skipped:
+            yield json.dumps({'cml_id': cml_id, 'error': 'Insufficient historical data for forecasting'}) + "\n"
+        
+        if request.model_type == 'arima':
+            # CMLs of the same commodity and material warm-start from one another
+            results = forecast_batch_arima(histories, groups, periods=request.periods)
+        else:
+            results = forecast_batch_prophet(histories, periods=request.periods)
+        
+        for cml_id, forecast_df, model_used in results:
+            forecast_points = _to_forecast_points(forecast_df)
+            yield json.dumps({
+                'cml_id': cml_id,
+                'model_used': model_used,
+                **failure_dates(cml_id),
+                'forecast_points': [p.model_dump(mode='json') for p in forecast_points]
+            }) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@router.get("/remaining-life", response_model=schemas.RemainingLifeResponse)
+async def get_remaining_life_range(
+    before: Optional[date] = None,
+    after: Optional[date] = None,
+    bound: str = Query(default="expected", pattern="^(earliest|expected|latest)$"),
+    facility: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(default=100, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """List CMLs reaching minimum thickness in a date range, from the remaining-life index"""
+    rows = query_remaining_life(db, before=before, after=after, bound=bound,
+                                facility=facility, skip=skip, limit=limit)
+    
+    return schemas.RemainingLifeResponse(
+        bound=bound,
+        before=before,
+        after=after,
+        results=[
+            schemas.RemainingLifeResult(
+                cml_id=cml.cml_id,
+                facility=cml.facility,
+                min_allowable=cml.min_allowable_thickness_mm,
+                corrosion_rate_mm_per_year=life.corrosion_rate_mm_per_year,
+                **_failure_dates(life)
+            )
+            for cml, life in rows
+        ]
+    )
+
+@router.post("/remaining-life/refresh")
+async def refresh_remaining_life_index(
+    facility: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Recompute the remaining-life index for all CMLs (or one facility)"""
+    start_time = time.time()
+    count = refresh_remaining_life(db, facility=facility)
+    return {"refreshed": count, "processing_time": time.time() - start_time}
+
+@router.get("/{cml_id}/state", response_model=schemas.ThicknessStateResponse)
+async def get_cml_thickness_state(
+    cml_id: str,
+    db: Session = Depends(get_db)
+):
+    """Get the Kalman-filtered thickness and corrosion rate of a CML"""
+    cml = db.query(CML).filter(CML.cml_id == cml_id).first()
+    if not cml:
+        raise HTTPException(status_code=404, detail="CML not found")
+    
+    state = get_thickness_state(db, cml)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No inspection history available for this CML")
+    
+    return schemas.ThicknessStateResponse(
+        cml_id=cml.cml_id,
+        thickness_mm=state.level_mm,
+        thickness_std=state.p00 ** 0.5,
+        corrosion_rate_mm_per_year=-state.rate_mm_per_year,
+        corrosion_rate_std=state.p11 ** 0.5,
+        last_measurement_date=state.last_date,
+        measurements_applied=state.n_updates,
+        estimated_failure_date=state_failure_date(state, cml.min_allowable_thickness_mm)
+    )
+
 @router.get("/{cml_id}/history", response_model=schemas.ForecastResponse)
 async def get_forecast_history(
     cml_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get existing forecast history for a CML"""
-    cml = db.query(CML).filter(CML.cml_id == cml_id).first()
+    cml = await db.scalar(select(CML).where(CML.cml_id == cml_id))
     if not cml:
         raise HTTPException(status_code=404, detail="CML not found")
     
-    # Get latest forecasts
-    forecasts = db.query(Forecast).filter(
-        Forecast.cml_id == cml.id
-    ).order_by(Forecast.forecast_date).all()
+    # Get the latest run's forecasts (served by the (cml_id, run_id) index)
+    latest_run_id = await db.scalar(select(func.max(Forecast.run_id)).where(Forecast.cml_id == cml.id))
+    forecasts = (await db.scalars(select(Forecast).where(
+        Forecast.cml_id == cml.id,
+        Forecast.run_id == latest_run_id if latest_run_id is not None else Forecast.run_id.is_(None)
+    ).order_by(Forecast.forecast_date))).all()
     
     if not forecasts:
         raise HTTPException(status_code=404, detail="No forecasts available for this CML")
@@ -120,17 +399,14 @@ async def get_forecast_history(
         for f in forecasts
     ]
     
-    estimated_failure = None
-    for point in forecast_points:
-        if point.predicted_thickness <= cml.min_allowable_thickness_mm:
-            estimated_failure = point.date
-            break
+    # Computed (and stored) on first use, so it runs on the session's sync side
+    failure_dates = _failure_dates(await db.run_sync(get_remaining_life, cml))
     
     return schemas.ForecastResponse(
         cml_id=cml.cml_id,
         current_thickness=cml.current_thickness_mm,
         min_allowable=cml.min_allowable_thickness_mm,
         forecast_points=forecast_points,
-        estimated_failure_date=estimated_failure,
-        confidence=forecasts[0].confidence_level if forecasts else 0.95
+        confidence=forecasts[0].confidence_level if forecasts else 0.95,
+        **failure_dates
     )
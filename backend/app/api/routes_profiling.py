@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from app.core.profiling import is_authorized, list_profiles, load_profile, profile_path
+from typing import Optional
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _require_token(token: Optional[str]):
+    if not is_authorized(token):
+        raise HTTPException(status_code=403, detail="A valid X-Profile token is required")
+
+@router.get("")
+async def get_profiles(
+    route: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    x_profile: Optional[str] = Header(default=None)
+):
+    """List stored request profiles, newest first"""
+    _require_token(x_profile)
+    return {"profiles": list_profiles(route=route, limit=limit)}
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str, x_profile: Optional[str] = Header(default=None)):
+    """Get a profile's summary: stage breakdown, SQL totals and hottest functions"""
+    _require_token(x_profile)
+    summary = load_profile(profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return summary
+
+@router.get("/{profile_id}/download")
+async def download_profile(profile_id: str, x_profile: Optional[str] = Header(default=None)):
+    """Download a profile's full call tree in pstats format (open with pstats or snakeviz)"""
+    _require_token(x_profile)
+    summary = load_profile(profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(
+        profile_path(profile_id, "prof"),
+        media_type="application/octet-stream",
+        filename=f"profile_{summary['route'].strip('/').replace('/', '_')}_{profile_id}.prof"
+    )
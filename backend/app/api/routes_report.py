@@ -1,58 +1,117 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
+from app.core.shared_cache import shared_cache
 from app.models import schemas
 from app.models.db_models import CML, RiskLevel
+from app.services.data_version import cml_version
 import logging
 from datetime import datetime
-import io
+from typing import Optional
+import asyncio
+import tempfile
 import os
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def _pdf_response(job: dict) -> FileResponse:
+    filename = f"CML_Report_{job['facility'] or 'All'}_{job['job_id'][:12]}.pdf"
+    return FileResponse(job['path'], media_type="application/pdf", filename=filename)
+
 @router.post("/generate")
 async def generate_report(
     request: schemas.ReportRequest,
     db: Session = Depends(get_db)
 ):
-    """Generate PDF report for CML analysis"""
-    from app.services.report_service import ReportService
-    
-    # Query CMLs based on filters
-    query = db.query(CML)
-    
-    if request.facility:
-        query = query.filter(CML.facility == request.facility)
+    """Generate PDF report for CML analysis, served from the report cache when unchanged"""
+    from app.services.report_jobs import submit_report
     
-    if request.start_date:
-        query = query.filter(CML.last_inspection_date >= request.start_date)
+    job = submit_report(db, request)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No CMLs found matching criteria")
     
-    if request.end_date:
-        query = query.filter(CML.last_inspection_date <= request.end_date)
+    # Rendering runs in the report worker pool; wait for it without blocking the event loop
+    if job['status'] != 'completed':
+        try:
+            await asyncio.wrap_future(job['future'])
+        except Exception as e:
+            logger.error(f"Report generation failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Report generation failed: {str(e)}")
     
-    cmls = query.all()
+    return _pdf_response(job)
+
+@router.post("/jobs", status_code=202)
+async def create_report_job(
+    request: schemas.ReportRequest,
+    db: Session = Depends(get_db)
+):
+    """Start generating a PDF report in the background; identical requests share one job and file"""
+    from app.services.report_jobs import submit_report, job_status
     
-    if not cmls:
+    job = submit_report(db, request)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No CMLs found matching criteria")
+    return job_status(job)
+
+@router.get("/jobs/{job_id}")
+async def get_report_job(job_id: str):
+    """Get the status of a report job"""
+    from app.services.report_jobs import get_job, job_status
+    
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job_status(job)
+
+@router.get("/jobs/{job_id}/download")
+async def download_report(job_id: str):
+    """Download a completed report"""
+    from app.services.report_jobs import get_job
+    
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    if job['status'] != 'completed':
+        raise HTTPException(status_code=409, detail=f"Report is {job['status']}")
+    return _pdf_response(job)
+
+@router.post("/batch")
+async def generate_report_batch(request: schemas.BatchReportRequest):
+    """
+    Generate one PDF report per facility in a single pass: the fleet is loaded once and the
+    reports render in parallel. Returns a manifest of the cached PDFs, or a zip of them.
+    """
+    from app.services.report_jobs import submit_report_batch, write_report_zip
+    
+    try:
+        manifest = await asyncio.wrap_future(submit_report_batch(request))
+    except Exception as e:
+        logger.error(f"Batch report generation failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch report generation failed: {str(e)}")
+    
+    if not manifest['total_facilities']:
         raise HTTPException(status_code=404, detail="No CMLs found matching criteria")
     
-    # Generate report
-    report_service = ReportService()
-    pdf_buffer = report_service.generate_pdf_report(
-        cmls=cmls,
-        include_forecasts=request.include_forecasts,
-        include_shap=request.include_shap
-    )
-    
-    # Generate filename
-    filename = f"CML_Report_{request.facility or 'All'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    
-    return StreamingResponse(
-        io.BytesIO(pdf_buffer.getvalue()),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    if request.output == 'zip':
+        fd, path = tempfile.mkstemp(suffix='.zip', prefix='cml_reports_')
+        os.close(fd)
+        await run_in_threadpool(write_report_zip, manifest, path)
+        return FileResponse(
+            path,
+            media_type="application/zip",
+            filename=f"CML_Reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+            headers={"X-Report-Seconds": str(manifest['total_seconds'])},
+            background=BackgroundTask(os.remove, path)
+        )
+    
+    return schemas.BatchReportResponse(**manifest)
+
+def _export_filename(facility: Optional[str], extension: str) -> str:
+    return f"CML_Export_{facility or 'All'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
 
 @router.get("/export-excel")
 async def export_to_excel(
@@ -60,60 +119,73 @@ async def export_to_excel(
     db: Session = Depends(get_db)
 ):
     """Export CML data to Excel"""
-    import pandas as pd
-    
-    query = db.query(CML)
+    _require_cmls(db, facility)
+    return await _export_xlsx(db, facility)
+
+def _require_cmls(db: Session, facility: Optional[str]):
+    query = db.query(CML.id)
     if facility:
         query = query.filter(CML.facility == facility)
+    if query.first() is None:
+        raise HTTPException(status_code=404, detail="No CMLs found")
+
+def _stream_with_session(stream, facility: Optional[str]):
+    # The request session is closed before a streamed body is sent, so the stream owns its own
+    db = SessionLocal()
+    try:
+        yield from stream(db, facility)
+    finally:
+        db.close()
+
+async def _export_xlsx(db: Session, facility: Optional[str]) -> FileResponse:
+    from app.services.export_service import write_xlsx
     
-    cmls = query.all()
+    # Writing the workbook takes seconds for a large fleet; keep it off the event loop
+    path = await run_in_threadpool(write_xlsx, db, facility)
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=_export_filename(facility, 'xlsx'),
+        background=BackgroundTask(os.remove, path)
+    )
+
+@router.get("/export")
+async def export_cmls(
+    format: str = Query(default="csv", pattern="^(csv|parquet|xlsx)$"),
+    facility: str = None,
+    db: Session = Depends(get_db)
+):
+    """Export CML data as CSV or Parquet streamed while rows are read, or as constant-memory Excel"""
+    from app.services.export_service import stream_csv, stream_parquet
     
-    if not cmls:
-        raise HTTPException(status_code=404, detail="No CMLs found")
+    _require_cmls(db, facility)
+    
+    if format == 'xlsx':
+        return await _export_xlsx(db, facility)
     
-    # Convert to DataFrame
-    data = []
-    for cml in cmls:
-        data.append({
-            'CML ID': cml.cml_id,
-            'Facility': cml.facility,
-            'System': cml.system,
-            'Commodity': cml.commodity,
-            'Material': cml.material_type,
-            'Feature Type': cml.feature_type,
-            'Current Thickness (mm)': cml.current_thickness_mm,
-            'Min Allowable (mm)': cml.min_allowable_thickness_mm,
-            'Corrosion Rate (mm/yr)': cml.average_corrosion_rate,
-            'Remaining Life (years)': cml.remaining_life_years,
-            'Risk Level': cml.risk_level.value if cml.risk_level else None,
-            'Elimination Candidate': 'Yes' if cml.elimination_candidate else 'No',
-            'ML Probability': cml.ml_elimination_probability,
-            'ML Confidence': cml.ml_confidence,
-            'SME Override': 'Yes' if cml.sme_override else 'No',
-            'SME Decision': cml.sme_decision,
-            'Last Inspection': cml.last_inspection_date
-        })
-    
-    df = pd.DataFrame(data)
-    
-    # Create Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='CML Data', index=False)
-    
-    output.seek(0)
-    
-    filename = f"CML_Export_{facility or 'All'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    if format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        content, media_type = _stream_with_session(stream_parquet, facility), "application/vnd.apache.parquet"
+    else:
+        content, media_type = _stream_with_session(stream_csv, facility), "text/csv"
     
     return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={_export_filename(facility, format)}"}
     )
 
 @router.get("/summary-stats")
 async def get_summary_statistics(db: Session = Depends(get_db)):
     """Get statistical summary for reports"""
+    cache_key = cml_version(db)
+    stats = await shared_cache.get_async('report_summary', cache_key)
+    if stats is not None:
+        return stats
+    
     cmls = db.query(CML).all()
     
     if not cmls:
@@ -153,4 +225,5 @@ async def get_summary_statistics(db: Session = Depends(get_db)):
         }
     }
     
+    await shared_cache.put_async('report_summary', cache_key, stats)
     return stats
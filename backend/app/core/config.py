@@ -9,6 +9,8 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "cml_optimization")
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "cml_user")
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "password")
+    # Full SQLAlchemy URL used instead of the POSTGRES_* settings, e.g. sqlite:///data/bench.db
+    DATABASE_URL_OVERRIDE: str = os.getenv("DATABASE_URL_OVERRIDE", "")
     
     # Application
     APP_ENV: str = os.getenv("APP_ENV", "development")
@@ -22,15 +24,65 @@ class Settings(BaseSettings):
     MIN_TRAINING_SAMPLES: int = int(os.getenv("MIN_TRAINING_SAMPLES", "50"))
     ELIMINATION_THRESHOLD: float = float(os.getenv("ELIMINATION_THRESHOLD", "0.70"))
     CONFIDENCE_THRESHOLD: float = float(os.getenv("CONFIDENCE_THRESHOLD", "0.85"))
+    SHAP_BACKGROUND_SIZE: int = int(os.getenv("SHAP_BACKGROUND_SIZE", "100"))
+    SHAP_BACKGROUND_METHOD: str = os.getenv("SHAP_BACKGROUND_METHOD", "kmeans")
+    SHAP_FIDELITY_SAMPLES: int = int(os.getenv("SHAP_FIDELITY_SAMPLES", "50"))
+    EXPLANATION_CACHE_SIZE: int = int(os.getenv("EXPLANATION_CACHE_SIZE", "10000"))
+    IMPORTANCE_SAMPLE_SIZE: int = int(os.getenv("IMPORTANCE_SAMPLE_SIZE", "500"))  # CMLs per facility behind fleet SHAP importance
+    
+    # Forecasting
+    FORECAST_WORKERS: int = int(os.getenv("FORECAST_WORKERS", str(os.cpu_count() or 2)))
+    PROPHET_FIT_TIMEOUT: float = float(os.getenv("PROPHET_FIT_TIMEOUT", "30"))
+    FORECAST_CACHE_SIZE: int = int(os.getenv("FORECAST_CACHE_SIZE", "5000"))
+    FORECAST_RUNS_TO_KEEP: int = int(os.getenv("FORECAST_RUNS_TO_KEEP", "3"))
+    FORECAST_RUN_MAX_AGE_DAYS: int = int(os.getenv("FORECAST_RUN_MAX_AGE_DAYS", "90"))
+    KALMAN_MEASUREMENT_STD: float = float(os.getenv("KALMAN_MEASUREMENT_STD", "0.1"))
+    KALMAN_RATE_DRIFT_STD: float = float(os.getenv("KALMAN_RATE_DRIFT_STD", "0.02"))
+    KALMAN_INITIAL_RATE_STD: float = float(os.getenv("KALMAN_INITIAL_RATE_STD", "0.5"))
     
     # Feature Engineering
     MAX_CORROSION_RATE: float = float(os.getenv("MAX_CORROSION_RATE", "5.0"))
     MIN_REMAINING_LIFE: float = float(os.getenv("MIN_REMAINING_LIFE", "0.0"))
     MAX_REMAINING_LIFE: float = float(os.getenv("MAX_REMAINING_LIFE", "100.0"))
+    RISK_CRITICAL_YEARS: float = float(os.getenv("RISK_CRITICAL_YEARS", "2.0"))
+    RISK_HIGH_YEARS: float = float(os.getenv("RISK_HIGH_YEARS", "5.0"))
+    RISK_MEDIUM_YEARS: float = float(os.getenv("RISK_MEDIUM_YEARS", "10.0"))
     
     # Reports
     REPORT_OUTPUT_DIR: str = os.getenv("REPORT_OUTPUT_DIR", "reports/")
     REPORT_COMPANY_NAME: str = os.getenv("REPORT_COMPANY_NAME", "Wood Engineering")
+    REPORT_WORKERS: int = int(os.getenv("REPORT_WORKERS", "2"))
+    REPORT_JOB_TTL: int = int(os.getenv("REPORT_JOB_TTL", "3600"))  # Seconds a finished job stays in memory
+    REPORT_MAX_JOBS: int = int(os.getenv("REPORT_MAX_JOBS", "500"))
+    REPORT_RETENTION_HOURS: float = float(os.getenv("REPORT_RETENTION_HOURS", "168"))  # PDFs older than this are deleted
+    REPORT_KEEP: int = int(os.getenv("REPORT_KEEP", "500"))  # Newest PDFs kept in REPORT_OUTPUT_DIR
+    EXPORT_CHUNK_SIZE: int = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+    
+    # Metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True") == "True"
+    SQL_REPEAT_THRESHOLD: int = int(os.getenv("SQL_REPEAT_THRESHOLD", "10"))  # 0 disables N+1 warnings
+    SQL_QUERY_BUDGET: int = int(os.getenv("SQL_QUERY_BUDGET", "0"))  # Max queries per request, 0 = unlimited
+    SQL_QUERY_BUDGET_ENFORCE: bool = os.getenv("SQL_QUERY_BUDGET_ENFORCE", "False") == "True"
+    
+    # Profiling
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")  # Requests sending it in the X-Profile header are profiled
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0.0"))
+    PROFILE_OUTPUT_DIR: str = os.getenv("PROFILE_OUTPUT_DIR", "profiles/")
+    PROFILE_KEEP: int = int(os.getenv("PROFILE_KEEP", "200"))
+    
+    # Responses
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True") == "True"  # gzip/brotli per Accept-Encoding
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+    
+    # Startup
+    PREWARM_IMPORTS: bool = os.getenv("PREWARM_IMPORTS", "False") == "True"  # Import ML/report libraries in the background after startup
+    
+    # Serving (gunicorn pre-fork mode, see gunicorn.conf.py)
+    SHARED_ARRAY_DIR: str = os.getenv("SHARED_ARRAY_DIR", "")  # Memory-map large model arrays from here so processes share them; empty disables
+    SHARED_ARRAY_MIN_BYTES: int = int(os.getenv("SHARED_ARRAY_MIN_BYTES", "65536"))
+    SHARED_CACHE_PATH: str = os.getenv("SHARED_CACHE_PATH", "data/processed/shared_cache.db")  # Host-wide result cache used by all workers; empty disables
+    SHARED_CACHE_MAX_MB: int = int(os.getenv("SHARED_CACHE_MAX_MB", "256"))
+    SHARED_CACHE_TTL: int = int(os.getenv("SHARED_CACHE_TTL", "300"))  # Seconds
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -38,8 +90,21 @@ class Settings(BaseSettings):
     
     @property
     def DATABASE_URL(self) -> str:
+        if self.DATABASE_URL_OVERRIDE:
+            return self.DATABASE_URL_OVERRIDE
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
     
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        if self.DATABASE_URL_OVERRIDE:
+            url = self.DATABASE_URL_OVERRIDE
+            if url.startswith("sqlite:"):
+                return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+            if url.startswith(("postgresql:", "postgresql+psycopg2:")):
+                return "postgresql+asyncpg:" + url.split(":", 1)[1]
+            return url
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+    
     class Config:
         case_sensitive = True
 
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -6,21 +7,67 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# SQLite (used as a local stand-in, e.g. by the benchmarks) takes no pool sizing
+_pool_options = {} if settings.DATABASE_URL.startswith("sqlite") else {"pool_size": 10, "max_overflow": 20}
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **_pool_options
 )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and session factory for handlers that should not block the event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    echo=settings.DEBUG,
+    **_pool_options
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create base class for ORM models
 Base = declarative_base()
 
+def upsert(bind, table, rows, index_elements, update_columns):
+    """
+    Insert rows, updating update_columns of rows that already exist (INSERT ... ON CONFLICT
+    DO UPDATE), so concurrent writers of the same key never race into an IntegrityError
+
+    Args:
+        bind: Session or Connection to execute on
+        table: Table (or ORM model's __table__) to write
+        rows: List of column -> value dictionaries
+        index_elements: Columns of the unique constraint that identifies a row
+        update_columns: Columns overwritten when the row exists
+    """
+    if not rows:
+        return
+    dialect = bind.get_bind().dialect.name if hasattr(bind, 'get_bind') else bind.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert is not supported on {dialect}")
+    
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: statement.excluded[column] for column in update_columns}
+    )
+    bind.execute(statement, rows)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -29,6 +76,11 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Test connection
 def test_connection():
     try:
@@ -0,0 +1,248 @@
+import logging
+import os
+import re
+import time
+from collections import Counter as _Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Optional
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Route label for requests that match no route, so unknown paths cannot blow up cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_COUNT = Counter(
+    "cml_http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "cml_http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "cml_http_requests_in_progress", "HTTP requests being served", ["method"],
+    multiprocess_mode="livesum"
+)
+RESPONSE_SIZE = Histogram(
+    "cml_http_response_size_bytes", "HTTP response body size", ["method", "route"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+)
+DB_QUERIES = Histogram(
+    "cml_db_queries_per_request", "Database queries issued while serving a request", ["route"],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+)
+DB_TIME = Histogram(
+    "cml_db_seconds_per_request", "Time spent in database queries while serving a request", ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REPEATED_QUERIES = Counter(
+    "cml_db_repeated_queries_total",
+    "Requests that ran one statement shape at least SQL_REPEAT_THRESHOLD times (likely N+1)",
+    ["route"]
+)
+QUERY_BUDGET_EXCEEDED = Counter(
+    "cml_db_query_budget_exceeded_total", "Requests that issued more queries than their budget", ["route"]
+)
+ML_STAGE_LATENCY = Histogram(
+    "cml_ml_stage_duration_seconds", "Duration of ML and rendering stages", ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+SHARED_CACHE_REQUESTS = Counter(
+    "cml_shared_cache_requests_total", "Shared (host-wide) cache lookups", ["namespace", "result"]
+)
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a request issues more queries than its budget and SQL_QUERY_BUDGET_ENFORCE is set"""
+    pass
+
+# Per-route query budgets (route template -> max queries), overriding SQL_QUERY_BUDGET
+_route_budgets: Dict[str, int] = {}
+
+def set_query_budget(route: str, max_queries: Optional[int]):
+    """Set (or with None, clear) the query budget for a route template, e.g. /api/v1/cml/{cml_id}"""
+    if max_queries is None:
+        _route_budgets.pop(route, None)
+    else:
+        _route_budgets[route] = max_queries
+
+def query_budget(route: str) -> int:
+    """Query budget for a route; 0 means unlimited"""
+    return _route_budgets.get(route, settings.SQL_QUERY_BUDGET)
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)\s*\)")
+_LITERAL = re.compile(r"\b\d+\b|'(?:[^']|'')*'")
+_WHITESPACE = re.compile(r"\s+")
+_SELECT_LIST = re.compile(r"^SELECT .+? FROM ", re.DOTALL)
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Shape of a SQL statement: literals and IN-list lengths removed, whitespace collapsed"""
+    shape = _IN_LIST.sub("(?)", statement)
+    shape = _LITERAL.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+class RequestStats:
+    """Database activity of the request being served"""
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = _Counter()
+        self.budget_logged = False
+        self._route: Optional[str] = None
+
+    @property
+    def route(self) -> str:
+        # Labelled once, on the first query after routing; until then the template is unknown
+        if self._route is None:
+            if self.scope is None or "endpoint" not in self.scope:
+                return UNMATCHED_ROUTE
+            self._route = route_label(self.scope)
+        return self._route
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Statement shapes run at least threshold times"""
+        return {shape: count for shape, count in self.statements.items() if count >= threshold}
+
+# Set per request by the middleware; queries outside a request (startup, job threads) are not counted
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start"].pop()
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_seconds += time.perf_counter() - start
+    stats.statements[fingerprint(statement)] += 1
+
+    route = stats.route
+    budget = query_budget(route)
+    if budget and stats.queries > budget:
+        # Counted and logged once per request, but enforced on every query past the budget
+        if not stats.budget_logged:
+            stats.budget_logged = True
+            QUERY_BUDGET_EXCEEDED.labels(route=route).inc()
+            logger.error(f"Query budget exceeded on {route}: more than {budget} queries")
+        if settings.SQL_QUERY_BUDGET_ENFORCE:
+            raise QueryBudgetExceeded(f"{route} issued more than {budget} queries")
+
+def report_repeated_queries(method: str, stats: RequestStats):
+    """Log statement shapes a request ran SQL_REPEAT_THRESHOLD or more times, the usual sign of an N+1"""
+    threshold = settings.SQL_REPEAT_THRESHOLD
+    if not threshold or stats.queries < threshold:
+        return
+    repeated = stats.repeated(threshold)
+    if not repeated:
+        return
+    route = stats.route
+    REPEATED_QUERIES.labels(route=route).inc()
+    for shape, count in sorted(repeated.items(), key=lambda item: -item[1]):
+        # Column lists are long and say little; keep the FROM/WHERE part that identifies the query
+        logger.warning(f"Possible N+1 on {method} {route}: {count}x {_SELECT_LIST.sub('SELECT ... FROM ', shape)[:300]}")
+
+def instrument_engine(engine):
+    """Count queries and their time against the current request (pass async engines' .sync_engine)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+@contextmanager
+def track_stage(stage: str):
+    """Time an ML or rendering stage into the stage latency histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ML_STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
+
+def route_label(scope) -> str:
+    """
+    Route template of a routed request, e.g. /api/v1/cml/{cml_id}
+
+    Taken from the matched route's path_format, so it only works after the request has been
+    routed. Falls back to rebuilding the template from the path and the path parameters for
+    endpoints that record no route.
+    """
+    if "endpoint" not in scope:
+        return UNMATCHED_ROUTE
+    path_format = getattr(scope.get("route"), "path_format", None)
+    if path_format:
+        # Some FastAPI versions record the route without its include_router prefix; the prefix
+        # is whatever part of the path lies in front of the segments the template covers
+        return scope["path"].rsplit("/", path_format.count("/"))[0] + path_format
+    names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    if not names:
+        return scope["path"]
+    return "/".join("{" + names[segment] + "}" if segment in names else segment
+                    for segment in scope["path"].split("/"))
+
+def metrics_payload():
+    """
+    Prometheus text exposition of all metrics: (body, content type)
+
+    Under gunicorn (PROMETHEUS_MULTIPROC_DIR set) every worker writes its values to files in
+    that directory and this aggregates them, so a scrape sees the whole server whichever
+    worker answers it.
+    """
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight requests, response size and DB usage per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        status = {"code": 500}
+        size = {"bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                size["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            _request_stats.reset(token)
+
+            # The router has filled in the matched endpoint and path parameters by now
+            route = route_label(scope)
+            REQUEST_COUNT.labels(method=method, route=route, status=str(status["code"])).inc()
+            REQUEST_LATENCY.labels(method=method, route=route).observe(elapsed)
+            RESPONSE_SIZE.labels(method=method, route=route).observe(size["bytes"])
+            DB_QUERIES.labels(route=route).observe(stats.queries)
+            DB_TIME.labels(route=route).observe(stats.db_seconds)
+            report_repeated_queries(method, stats)
@@ -0,0 +1,55 @@
+import importlib
+import logging
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Heavy libraries the app only imports on first use, in the order requests tend to need them
+PREWARM_MODULES = [
+    "pandas",
+    "sklearn.preprocessing",
+    "xgboost",
+    "shap",
+    "statsmodels.tsa.arima.model",
+    "prophet",
+    "reportlab.platypus",
+    "openpyxl",
+]
+
+_thread: Optional[threading.Thread] = None
+
+def prewarm_imports(modules: Sequence[str] = PREWARM_MODULES) -> Dict[str, float]:
+    """
+    Import modules ahead of their first use
+
+    Returns:
+        Seconds taken per module; modules that fail to import (e.g. an optional
+        library that is not installed) are logged and left out
+    """
+    timings = {}
+    start = time.perf_counter()
+    for module in modules:
+        module_start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f"Prewarm skipped {module}: {e}")
+            continue
+        timings[module] = round(time.perf_counter() - module_start, 3)
+    logger.info(f"Prewarmed {len(timings)} modules in {time.perf_counter() - start:.2f}s: {timings}")
+    return timings
+
+def start_prewarm(modules: Sequence[str] = PREWARM_MODULES) -> threading.Thread:
+    """
+    Prewarm imports in a daemon thread so the worker starts serving immediately
+
+    A request that needs a module while it is still loading waits on the import
+    lock for the rest of that import rather than starting it over.
+    """
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=prewarm_imports, args=(modules,), name="import-prewarm", daemon=True)
+        _thread.start()
+    return _thread
@@ -0,0 +1,255 @@
+import asyncio
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+import types
+import uuid
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.core.metrics import current_request_stats, route_label
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Library stages reported in the breakdown, matched against each function's file (or, for
+# C functions, its name). Times are self time, so stages do not double count each other.
+STAGES = {
+    "import": ("importlib", "marshal", "_imp"),
+    "sql": ("sqlalchemy", "psycopg2", "asyncpg", "sqlite3", "aiosqlite"),
+    "pandas": ("pandas",),
+    "numpy": ("numpy",),
+    "xgboost": ("xgboost",),
+    "shap": ("shap",),
+    "reportlab": ("reportlab",),
+    "prophet": ("prophet", "cmdstanpy"),
+    "statsmodels": ("statsmodels",),
+    "sklearn": ("sklearn", "scipy"),
+    "app": ("app",),
+}
+TOP_FUNCTIONS = 40
+
+_PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+_STAGE_PATTERNS = {
+    stage: re.compile(r"[/\\<' ](?:%s)[/\\.']" % "|".join(re.escape(p) for p in packages))
+    for stage, packages in STAGES.items()
+}
+
+# cProfile hooks the whole interpreter thread, so one request is profiled at a time
+_profile_lock = Lock()
+
+def profile_path(profile_id: str, extension: str) -> str:
+    return os.path.join(settings.PROFILE_OUTPUT_DIR, f"{profile_id}.{extension}")
+
+def is_profile_id(profile_id: str) -> bool:
+    return bool(_PROFILE_ID.match(profile_id))
+
+def is_authorized(token: Optional[str]) -> bool:
+    """Whether a token grants profiling access; always False when no PROFILING_TOKEN is configured"""
+    return bool(settings.PROFILING_TOKEN and token and hmac.compare_digest(token, settings.PROFILING_TOKEN))
+
+def _requested_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER.encode():
+            return value.decode("latin-1")
+    return None
+
+def should_profile(scope) -> Optional[str]:
+    """Why a request should be profiled ('requested' or 'sampled'), or None"""
+    if is_authorized(_requested_token(scope)):
+        return "requested"
+    if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+def _stage_of(filename: str, function: str) -> str:
+    location = filename if filename != "~" else function
+    for stage, pattern in _STAGE_PATTERNS.items():
+        if pattern.search(location):
+            return stage
+    return "other"
+
+def summarize_profile(stats: pstats.Stats) -> Dict[str, Any]:
+    """
+    Self-time breakdown per library stage plus the hottest functions by cumulative time
+
+    Returns:
+        Dictionary with 'profiled_seconds', 'stages' (stage -> seconds) and 'top_functions'
+    """
+    stages: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+    stages["other"] = 0.0
+    functions = []
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        stages[_stage_of(filename, function)] += tottime
+        functions.append({
+            "function": function,
+            "location": f"{filename}:{line}",
+            "calls": calls,
+            "self_seconds": round(tottime, 6),
+            "cumulative_seconds": round(cumtime, 6)
+        })
+    functions.sort(key=lambda f: f["cumulative_seconds"], reverse=True)
+    return {
+        "profiled_seconds": round(stats.total_tt, 6),
+        "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        "top_functions": functions[:TOP_FUNCTIONS]
+    }
+
+def save_profile(profiler: cProfile.Profile, profile_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Write the raw call tree (.prof, readable by pstats/snakeviz) and its JSON summary"""
+    os.makedirs(settings.PROFILE_OUTPUT_DIR, exist_ok=True)
+    profiler.dump_stats(profile_path(profile_id, "prof"))
+
+    summary = dict(metadata, **summarize_profile(pstats.Stats(profiler)))
+    tmp_path = profile_path(profile_id, "json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_path, profile_path(profile_id, "json"))
+
+    _prune_profiles()
+    logger.info(f"Profile {profile_id} saved for {metadata['method']} {metadata['route']} "
+                f"({metadata['duration_seconds']:.3f}s)")
+    return summary
+
+def _prune_profiles():
+    """Keep only the newest PROFILE_KEEP profiles"""
+    summaries = sorted(
+        name[:-len(".json")] for name in os.listdir(settings.PROFILE_OUTPUT_DIR)
+        if name.endswith(".json") and is_profile_id(name[:-len(".json")])
+    )
+    for profile_id in summaries[:max(len(summaries) - settings.PROFILE_KEEP, 0)]:
+        for extension in ("json", "prof"):
+            try:
+                os.remove(profile_path(profile_id, extension))
+            except FileNotFoundError:
+                pass
+
+def list_profiles(route: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """Stored profile summaries, newest first, optionally for one route template"""
+    if not os.path.isdir(settings.PROFILE_OUTPUT_DIR):
+        return []
+    ids = sorted(
+        (name[:-len(".json")] for name in os.listdir(settings.PROFILE_OUTPUT_DIR)
+         if name.endswith(".json") and is_profile_id(name[:-len(".json")])),
+        reverse=True
+    )
+    results = []
+    for profile_id in ids:
+        summary = load_profile(profile_id)
+        if summary is None or (route and summary["route"] != route):
+            continue
+        results.append({k: summary[k] for k in ("profile_id", "route", "method", "status", "reason",
+                                                 "started_at", "duration_seconds")})
+        if len(results) >= limit:
+            break
+    return results
+
+def load_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    if not is_profile_id(profile_id):
+        return None
+    try:
+        with open(profile_path(profile_id, "json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+@types.coroutine
+def _profiled(coro, profiler: cProfile.Profile):
+    """
+    Await a coroutine with the profiler enabled only while that coroutine runs
+
+    Each step of the coroutine (and of everything it awaits directly) runs between
+    enable() and disable(), so coroutines of other requests scheduled on the same event
+    loop in between are left out of the profile.
+    """
+    value, error = None, None
+    while True:
+        profiler.enable()
+        try:
+            yielded = coro.throw(error) if error is not None else coro.send(value)
+        except StopIteration as e:
+            return e.value
+        finally:
+            profiler.disable()
+
+        value, error = None, None
+        try:
+            value = yield yielded
+        except GeneratorExit:
+            coro.close()
+            raise
+        except BaseException as e:
+            error = e
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware running opted-in requests under cProfile
+
+    A request is profiled when it carries the PROFILING_TOKEN in the X-Profile header (never
+    the URL, which access logs record), or is picked by PROFILING_SAMPLE_RATE. The response
+    carries X-Profile-Id; the stored call tree is served under /api/v1/profiles.
+
+    Only the request's own steps on the event loop are profiled; other requests interleaved
+    on the loop are not. Code run in thread or process pools (sync dependencies, report
+    rendering, parallel forecasts) and in tasks the request spawns shows up as time spent
+    waiting for it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        reason = should_profile(scope)
+        if reason is None or not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER, profile_id.encode())
+                ])
+            await send(message)
+
+        profiler = cProfile.Profile()
+        started_at = datetime.now()
+        start = time.perf_counter()
+        try:
+            await _profiled(self.app(scope, receive, send_wrapper), profiler)
+        finally:
+            _profile_lock.release()
+
+            request_stats = current_request_stats()
+            metadata = {
+                "profile_id": profile_id,
+                "route": route_label(scope),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status["code"],
+                "reason": reason,
+                "started_at": started_at.isoformat(),
+                "duration_seconds": round(time.perf_counter() - start, 6),
+                "sql_queries": request_stats.queries if request_stats else None,
+                "sql_seconds": round(request_stats.db_seconds, 6) if request_stats else None
+            }
+            try:
+                await asyncio.to_thread(save_profile, profiler, profile_id, metadata)
+            except Exception as e:
+                logger.error(f"Could not save profile {profile_id}: {e}")
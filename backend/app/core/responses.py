@@ -0,0 +1,232 @@
+import json
+import logging
+import zlib
+from contextvars import ContextVar
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Optional, Sequence
+from uuid import UUID
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Set per request by ContentNegotiationMiddleware when the client accepts MessagePack
+_wants_msgpack: ContextVar[bool] = ContextVar("wants_msgpack", default=False)
+
+def header_qualities(value: str) -> Dict[str, float]:
+    """
+    Tokens of an Accept-style header with their q-values, e.g. "gzip;q=0.5, br" ->
+    {'gzip': 0.5, 'br': 1.0}; a malformed q-value counts as 0 (not acceptable)
+    """
+    qualities = {}
+    for part in value.split(","):
+        token, *params = part.split(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, q = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(q)
+                except ValueError:
+                    quality = 0.0
+        qualities[token] = quality
+    return qualities
+
+def select_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported content coding the client accepts (brotli over gzip on equal q), or None"""
+    qualities = header_qualities(accept_encoding)
+    # "*" stands for any coding not listed explicitly
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if hasattr(value, "tolist"):
+        # NumPy arrays and scalars
+        return value.tolist()
+    raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+
+class APIResponse(JSONResponse):
+    """
+    Default response class: JSON serialized with orjson, or MessagePack when the client
+    sends `Accept: application/msgpack`
+
+    orjson serializes dates, enums and NumPy values natively and writes NaN as null.
+    Falls back to the standard library encoder when orjson is not installed.
+    """
+
+    def __init__(self, content: Any = None, *args, **kwargs):
+        self._msgpack = msgpack is not None and _wants_msgpack.get()
+        if self._msgpack:
+            self.media_type = MSGPACK_MEDIA_TYPES[0]
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self._msgpack:
+            return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+def columnar(rows: Sequence[Sequence[Any]], columns: Sequence[str]) -> Dict[str, Any]:
+    """
+    Column-oriented payload: one array per field instead of one object per row
+
+    Args:
+        rows: Row tuples (e.g. from a column select), values in the order of columns
+        columns: Field names
+
+    Returns:
+        Dictionary with 'count' and 'columns' (field -> list of values)
+    """
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return {
+        'count': len(rows),
+        'columns': {name: list(column) for name, column in zip(columns, values)}
+    }
+
+class ContentNegotiationMiddleware:
+    """Record whether the client accepts MessagePack, for APIResponse to pick its format"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = header_qualities(Headers(scope=scope).get("accept", ""))
+        token = _wants_msgpack.set(any(accept.get(media_type, 0.0) > 0 for media_type in MSGPACK_MEDIA_TYPES))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _wants_msgpack.reset(token)
+
+# Already compressed formats, not worth compressing again
+_INCOMPRESSIBLE = (
+    "application/pdf", "application/zip", "application/gzip", "application/vnd.apache.parquet",
+    "application/vnd.openxmlformats", "image/", "text/event-stream"
+)
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli (preferred, if installed) or gzip, per the q-values of
+    Accept-Encoding
+
+    Complete responses smaller than minimum_size are sent as they are. Streamed responses
+    (exports, NDJSON batches) are compressed chunk by chunk and flushed after each, so
+    clients still receive rows as they are produced.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _CompressingSend(send, encoding, self))
+
+class _CompressingSend:
+    def __init__(self, send, encoding: str, options: CompressionMiddleware):
+        self.send = send
+        self.encoding = encoding
+        self.options = options
+        self.start_message: Optional[dict] = None
+        self.compressor = None
+        self.passthrough = False
+
+    def _new_compressor(self):
+        if self.encoding == "br":
+            return brotli.Compressor(quality=self.options.brotli_quality)
+        return zlib.compressobj(self.options.gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def _compress(self, body: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.process(body) + (self.compressor.finish() if final else self.compressor.flush())
+        return self.compressor.compress(body) + self.compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = "content-encoding" in headers or content_type.startswith(_INCOMPRESSIBLE)
+            if self.passthrough:
+                await self.send(message)
+            else:
+                # Held until the first body chunk shows whether the response is worth compressing
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if not more_body and len(body) < self.options.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressor = self._new_compressor()
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            del headers["Content-Length"]
+            body = self._compress(body, final=not more_body)
+            if not more_body:
+                headers["Content-Length"] = str(len(body))
+            await self.send(start)
+        else:
+            body = self._compress(body, final=not more_body)
+
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -0,0 +1,83 @@
+import gc
+import logging
+import os
+import resource
+from typing import Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SMAPS_FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_mb",
+    "Shared_Dirty": "shared_mb",
+    "Private_Clean": "private_mb",
+    "Private_Dirty": "private_mb",
+    "Swap": "swap_mb",
+}
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, float]:
+    """
+    Memory of a process in MB
+
+    RSS counts pages shared with the master and other workers in full; PSS splits
+    them between the processes mapping them, so summing PSS over the workers gives
+    the real footprint. Falls back to RSS only where /proc/<pid>/smaps_rollup is
+    unavailable (e.g. macOS, or older kernels).
+    """
+    pid = pid or os.getpid()
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                field = _SMAPS_FIELDS.get(name)
+                if field:
+                    memory[field] = memory.get(field, 0.0) + int(value.split()[0]) / 1024
+        return {field: round(mb, 1) for field, mb in memory.items()}
+    except (FileNotFoundError, PermissionError):
+        pass
+
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return {"rss_mb": round(int(line.split()[1]) / 1024, 1)}
+    except (FileNotFoundError, PermissionError):
+        pass
+
+    # Peak rather than current RSS, and only for this process
+    return {"rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+def preload_for_workers():
+    """
+    Load read-only state in the master before workers are forked
+
+    Imports the ML libraries and builds the elimination model and its SHAP explainer
+    once, then freezes the garbage collector so the workers' collections do not touch
+    (and so copy) the inherited objects. Each step is best-effort: a master without a
+    trained model yet still serves, and workers load the model on first use.
+    """
+    if settings.PREWARM_IMPORTS:
+        from app.core.prewarm import prewarm_imports
+        prewarm_imports()
+
+    try:
+        from app.services.explanation_service import ExplanationService
+        ExplanationService()._get_explainer()
+    except ValueError as e:
+        logger.info(f"Explainer not preloaded: {e}")
+    except Exception as e:
+        logger.warning(f"Explainer preload failed: {e}")
+
+    gc.collect()
+    gc.freeze()
+    logger.info(f"✅ Master preloaded (pid {os.getpid()}): {process_memory()}")
+
+def reset_after_fork():
+    """Drop connections inherited from the master so workers never share a socket"""
+    from app.core.database import async_engine, engine
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
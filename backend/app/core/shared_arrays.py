@@ -0,0 +1,68 @@
+import logging
+import os
+from typing import Iterable
+import numpy as np
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Array attributes of a SHAP TreeEnsemble (the stacked per-node tree arrays and background data)
+TREE_ARRAYS = (
+    "children_left", "children_right", "children_default", "features", "thresholds",
+    "threshold_types", "values", "node_sample_weight", "data", "data_missing"
+)
+
+def sharing_enabled() -> bool:
+    return bool(settings.SHARED_ARRAY_DIR)
+
+def share_array(array: np.ndarray, name: str) -> np.ndarray:
+    """
+    Back an array by a .npy file in SHARED_ARRAY_DIR, mapped copy-on-write
+
+    Every process mapping the same file shares its pages through the page cache, whether
+    it was forked from the loading process or not; a process that writes to the array
+    gets private copies of just the pages it touches. The file is written once
+    (atomically) and reused by later callers with the same name.
+
+    Returns:
+        The memory-mapped array, with the same dtype, shape and contents
+    """
+    os.makedirs(settings.SHARED_ARRAY_DIR, exist_ok=True)
+    path = os.path.join(settings.SHARED_ARRAY_DIR, f"{name}.npy")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(tmp_path, path)
+    return np.load(path, mmap_mode="c")
+
+def share_attributes(obj, attributes: Iterable[str], prefix: str) -> int:
+    """
+    Replace an object's large NumPy array attributes with shared memory-mapped copies
+
+    Arrays smaller than SHARED_ARRAY_MIN_BYTES, and anything that is not a plain
+    numeric array, are left alone.
+
+    Returns:
+        Bytes now backed by shared files
+    """
+    shared = 0
+    for attribute in attributes:
+        array = getattr(obj, attribute, None)
+        if (not isinstance(array, np.ndarray) or isinstance(array, np.memmap) or array.dtype.hasobject
+                or array.nbytes < settings.SHARED_ARRAY_MIN_BYTES):
+            continue
+        setattr(obj, attribute, share_array(array, f"{prefix}-{attribute}"))
+        shared += array.nbytes
+    return shared
+
+def prune_shared_arrays(keep_prefix: str):
+    """Delete shared array files of other model versions (processes still mapping them keep their pages)"""
+    if not os.path.isdir(settings.SHARED_ARRAY_DIR):
+        return
+    for name in os.listdir(settings.SHARED_ARRAY_DIR):
+        if name.endswith(".npy") and not name.startswith(f"{keep_prefix}-"):
+            try:
+                os.remove(os.path.join(settings.SHARED_ARRAY_DIR, name))
+            except FileNotFoundError:
+                pass
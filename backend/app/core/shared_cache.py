@@ -0,0 +1,291 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.metrics import SHARED_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS counters (
+    namespace TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS totals (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (name, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries;
+"""
+
+_COUNT = """
+INSERT INTO counters (namespace, hits, misses) VALUES (?, ?, ?)
+ON CONFLICT (namespace) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses
+"""
+
+_ADD_BYTES = "UPDATE totals SET value = value + ? WHERE name = 'bytes'"
+
+# Access times and hit/miss counts are buffered per process and written in one transaction
+# at most this often (or once this many keys are pending), so reads never write
+FLUSH_SECONDS = 5.0
+FLUSH_MAX_PENDING = 256
+
+class SharedCache:
+    """
+    Host-wide cache of JSON-serializable results in a SQLite database in WAL mode
+
+    Every worker process on the host opens the same file, so a result computed by one
+    worker is served by all of them. Entries expire after their TTL; when the stored
+    values exceed max_bytes the least recently used are evicted. Each write is a single
+    transaction, so readers see either the old value or the new one, never part of one.
+
+    Reads are read-only: access times (for LRU) and hit/miss counters are buffered in the
+    process and flushed in one batch every FLUSH_SECONDS, so recency is approximate. The
+    stored size is kept as a running total, adjusted by each write. Counters are kept per
+    namespace both in the database (host totals, see stats()) and as the
+    cml_shared_cache_requests_total metric (this process).
+
+    Cache errors (a locked or unwritable file) are logged and treated as misses, so
+    requests fall back to computing their result.
+    """
+
+    def __init__(self, path: str, max_bytes: int, default_ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._schema_ready = False
+        self._pending_lock = threading.Lock()
+        self._reset_pending()
+
+    def _reset_pending(self):
+        self._pending_pid = os.getpid()
+        self._accessed: Dict[Tuple[str, str], float] = {}
+        self._counts: Dict[str, List[int]] = {}
+        self._flushed_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and per process: connections must not cross a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            conn.executescript(_SCHEMA)
+            self._schema_ready = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Get a cached value, or None on a miss (or when the cache is disabled)"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed ({namespace}): {e}")
+            row = None
+
+        self._record(namespace, key if row is not None else None, now)
+        SHARED_CACHE_REQUESTS.labels(namespace=namespace, result='hit' if row is not None else 'miss').inc()
+        return json.loads(row[0]) if row is not None else None
+
+    def _record(self, namespace: str, hit_key: Optional[str], now: float):
+        """Buffer a hit (with the key's access time) or a miss, flushing when due"""
+        with self._pending_lock:
+            if self._pending_pid != os.getpid():
+                # Buffered in the parent before a fork; the parent flushes its own
+                self._reset_pending()
+            counts = self._counts.setdefault(namespace, [0, 0])
+            if hit_key is not None:
+                counts[0] += 1
+                self._accessed[(namespace, hit_key)] = now
+            else:
+                counts[1] += 1
+            due = (len(self._accessed) >= FLUSH_MAX_PENDING
+                   or time.monotonic() - self._flushed_at >= FLUSH_SECONDS)
+        if due:
+            self.flush()
+
+    def _take_pending(self):
+        with self._pending_lock:
+            if self._pending_pid != os.getpid():
+                self._reset_pending()
+            accessed, counts = self._accessed, self._counts
+            self._accessed, self._counts = {}, {}
+            self._flushed_at = time.monotonic()
+        return accessed, counts
+
+    def _write_pending(self, conn: sqlite3.Connection, accessed, counts):
+        conn.executemany(
+            "UPDATE entries SET accessed_at = MAX(accessed_at, ?) WHERE namespace = ? AND key = ?",
+            [(at, namespace, key) for (namespace, key), at in accessed.items()]
+        )
+        conn.executemany(_COUNT, [(namespace, hits, misses) for namespace, (hits, misses) in counts.items()])
+
+    def flush(self):
+        """Write buffered access times and hit/miss counts"""
+        if not self.enabled:
+            return
+        accessed, counts = self._take_pending()
+        if not accessed and not counts:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                self._write_pending(conn, accessed, counts)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache access flush failed: {e}")
+
+    def put(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting expired and least recently used entries when over max_bytes"""
+        if not self.enabled:
+            return
+
+        data = json.dumps(value, separators=(',', ':'), default=str).encode()
+        if len(data) > self.max_bytes:
+            logger.info(f"Not caching {namespace} value of {len(data)} bytes (over SHARED_CACHE_MAX_MB)")
+            return
+
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.default_ttl)
+        accessed, counts = self._take_pending()
+        try:
+            conn = self._connect()
+            with conn:
+                # Take the write lock up front so the size delta matches the row replaced
+                conn.execute("BEGIN IMMEDIATE")
+                old = conn.execute(
+                    "SELECT size FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (namespace, key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, key, data, len(data), expires_at, now)
+                )
+                conn.execute(_ADD_BYTES, (len(data) - (old[0] if old else 0),))
+                # Buffered accesses ride along with the write instead of a transaction of their own
+                self._write_pending(conn, accessed, counts)
+                total = conn.execute("SELECT value FROM totals WHERE name = 'bytes'").fetchone()[0]
+                if total > self.max_bytes:
+                    self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache write failed ({namespace}): {e}")
+
+    async def get_async(self, namespace: str, key: str) -> Optional[Any]:
+        """get() for async handlers: the sqlite3 calls run in the threadpool, off the event loop"""
+        if not self.enabled:
+            return None
+        return await run_in_threadpool(self.get, namespace, key)
+
+    async def put_async(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        """put() for async handlers: waiting on the write lock must not block the event loop"""
+        if not self.enabled:
+            return
+        await run_in_threadpool(self.put, namespace, key, value, ttl)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        # Eviction is rare, so resynchronize the running total here
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            # Evict down to 90% so the next few writes do not each trigger another pass
+            excess = total - int(self.max_bytes * 0.9)
+            evicted = 0
+            rows = conn.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at").fetchall()
+            for namespace, key, size in rows:
+                if excess <= 0:
+                    break
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                excess -= size
+                total -= size
+                evicted += 1
+            logger.info(f"Shared cache evicted {evicted} entries")
+        conn.execute("UPDATE totals SET value = ? WHERE name = 'bytes'", (total,))
+
+    def invalidate(self, namespace: Optional[str] = None):
+        """Drop all entries, or those of one namespace"""
+        if not self.enabled:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if namespace is None:
+                    conn.execute("DELETE FROM entries")
+                    conn.execute("UPDATE totals SET value = 0 WHERE name = 'bytes'")
+                else:
+                    size = conn.execute(
+                        "SELECT COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?", (namespace,)
+                    ).fetchone()[0]
+                    conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+                    conn.execute(_ADD_BYTES, (-size,))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache invalidation failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get host-wide size and hit/miss counters per namespace"""
+        if not self.enabled:
+            return {'enabled': False}
+
+        self.flush()
+        conn = self._connect()
+        namespaces = {
+            namespace: {'entries': entries, 'bytes': size, 'hits': 0, 'misses': 0}
+            for namespace, entries, size in conn.execute(
+                "SELECT namespace, COUNT(*), SUM(size) FROM entries WHERE expires_at > ? GROUP BY namespace",
+                (time.time(),)
+            )
+        }
+        for namespace, hits, misses in conn.execute("SELECT namespace, hits, misses FROM counters"):
+            counters = namespaces.setdefault(namespace, {'entries': 0, 'bytes': 0})
+            counters.update(hits=hits, misses=misses)
+
+        return {
+            'enabled': True,
+            'path': self.path,
+            'max_bytes': self.max_bytes,
+            'bytes': sum(n['bytes'] for n in namespaces.values()),
+            'namespaces': namespaces
+        }
+
+shared_cache = SharedCache(
+    settings.SHARED_CACHE_PATH,
+    max_bytes=settings.SHARED_CACHE_MAX_MB * 1024 * 1024,
+    default_ttl=settings.SHARED_CACHE_TTL
+)
+# Counts buffered since the last flush would otherwise be lost when a worker exits
+atexit.register(shared_cache.flush)
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 import logging
 from datetime import datetime
 import os
@@ -8,7 +8,7 @@ import os
 try:
     from app.core.config import settings
     from app.core.database import engine, Base
-    from app.api import routes_cml, routes_forecast, routes_report, routes_dashboard
+    from app.api import routes_cml, routes_forecast, routes_report, routes_dashboard, routes_profiling
 except ImportError:
     # Fallback for initial setup
     settings = type('obj', (object,), {'ALLOWED_ORIGINS': 'http://localhost:3000,http://localhost:8000', 'DEBUG': True})()
@@ -25,13 +25,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create FastAPI app
+# Create FastAPI app; responses are serialized with orjson, or MessagePack on request
+try:
+    from app.core.responses import APIResponse, CompressionMiddleware, ContentNegotiationMiddleware
+except ImportError:
+    APIResponse = JSONResponse
+    CompressionMiddleware = ContentNegotiationMiddleware = None
+
 app = FastAPI(
     title="Wood AI CML Optimization",
     description="Machine Learning system for Condition Monitoring Location optimization",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=APIResponse
 )
 
 # CORS middleware
@@ -43,6 +50,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Content negotiation (JSON or MessagePack) and gzip/brotli compression of large bodies;
+# inside the metrics middleware, so response sizes are recorded as sent
+if ContentNegotiationMiddleware is not None:
+    app.add_middleware(ContentNegotiationMiddleware)
+if CompressionMiddleware is not None and getattr(settings, 'COMPRESSION_ENABLED', False):
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+
+# Opt-in request profiling; added before the metrics middleware so it runs inside it
+# and can read the request's SQL totals
+if engine is not None and (settings.PROFILING_TOKEN or settings.PROFILING_SAMPLE_RATE > 0):
+    from app.core.profiling import ProfilingMiddleware
+    
+    app.add_middleware(ProfilingMiddleware)
+
+# Request metrics, exposed for Prometheus at /metrics
+if engine is not None and settings.METRICS_ENABLED:
+    from app.core.metrics import MetricsMiddleware, instrument_engine, metrics_payload
+    from app.core.database import async_engine
+    
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+    app.add_middleware(MetricsMiddleware)
+    
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        body, content_type = metrics_payload()
+        return Response(content=body, media_type=content_type)
+
 # Create database tables on startup
 @app.on_event("startup")
 async def startup_event():
@@ -55,6 +90,19 @@ async def startup_event():
             logger.error(f"Error creating database tables: {e}")
     else:
         logger.warning("Database not configured - running in standalone mode")
+    
+    # ML and reporting libraries load on first use; optionally pull them in now, off the event loop
+    if engine is not None and settings.PREWARM_IMPORTS:
+        from app.core.prewarm import start_prewarm
+        start_prewarm()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.services.report_jobs import shutdown_report_workers
+    shutdown_report_workers()
+    if engine:
+        from app.core.database import async_engine
+        await async_engine.dispose()
 
 # Include API routers (with error handling for initial setup)
 try:
@@ -62,6 +110,7 @@ try:
     app.include_router(routes_forecast.router, prefix="/api/v1/forecast", tags=["Forecasting"])
     app.include_router(routes_report.router, prefix="/api/v1/report", tags=["Reports"])
     app.include_router(routes_dashboard.router, prefix="/api/v1/dashboard", tags=["Dashboard"])
+    app.include_router(routes_profiling.router, prefix="/api/v1/profiles", tags=["Profiling"])
     logger.info("API routes loaded successfully")
 except Exception as e:
     logger.warning(f"Some routes not available yet: {e}")
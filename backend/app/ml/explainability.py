@@ -1,7 +1,6 @@
-import shap
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Sequence
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,22 +13,51 @@ class ModelExplainer:
         self.preprocessor = preprocessor
         self.explainer = None
     
-    def initialize(self, background_data: pd.DataFrame):
-        """Initialize SHAP explainer with background data"""
+    def initialize(
+        self,
+        background_data: Optional[pd.DataFrame] = None,
+        weights: Optional[np.ndarray] = None
+    ):
+        """Initialize SHAP explainer with background data, optionally weighted"""
+        import shap
+        
         try:
-            # Use TreeExplainer for XGBoost
+            if background_data is not None and weights is not None:
+                background_data = expand_weighted_background(background_data, weights)
+            
+            # Use TreeExplainer for XGBoost (tree-path dependent when no background is given)
             self.explainer = shap.TreeExplainer(self.model, background_data)
-            logger.info("SHAP explainer initialized")
+            logger.info(
+                f"SHAP explainer initialized with "
+                f"{len(background_data) if background_data is not None else 0} background rows"
+            )
         except Exception as e:
             logger.error(f"Failed to initialize SHAP explainer: {e}")
     
-    def explain_prediction(self, X: pd.DataFrame, feature_names: List[str]) -> Dict[str, Any]:
+    def shap_matrix(self, X: pd.DataFrame) -> np.ndarray:
+        """SHAP values of the positive class, one row per prediction"""
+        shap_values = self.explainer.shap_values(X)
+        
+        # If binary classification, take positive class
+        if isinstance(shap_values, list):
+            shap_values = shap_values[1]
+        return np.asarray(shap_values)
+    
+    def explain_prediction(
+        self,
+        X: pd.DataFrame,
+        feature_names: List[str],
+        top_k: int = 5,
+        include_shap_values: bool = False
+    ) -> Dict[str, Any]:
         """
         Generate SHAP explanations for predictions
         
         Args:
             X: Feature matrix
             feature_names: List of feature names
+            top_k: Number of top contributing features per prediction
+            include_shap_values: Also emit the full per-feature SHAP dict for each row
         
         Returns:
             Dictionary with SHAP values and explanations
@@ -39,37 +67,43 @@ class ModelExplainer:
             return {}
         
         try:
-            # Calculate SHAP values
-            shap_values = self.explainer.shap_values(X)
-            
-            # If binary classification, take positive class
-            if isinstance(shap_values, list):
-                shap_values = shap_values[1]
+            shap_values = self.shap_matrix(X)
             
             # Get base value
             base_value = self.explainer.expected_value
             if isinstance(base_value, np.ndarray):
                 base_value = base_value[1]
+            base_value = float(base_value)
+            
+            # Select top-k features for every row at once, then order only those k
+            top_idx, top_vals = self._top_k_contributions(shap_values, top_k)
+            names = list(feature_names)
+            
+            # Rows sharing the same top features and signs reuse one explanation string
+            text_templates = {}
+            all_values = shap_values.tolist() if include_shap_values else None
             
             explanations = []
-            for i in range(len(X)):
-                # Get top contributing features
-                feature_contributions = list(zip(feature_names, shap_values[i]))
-                feature_contributions.sort(key=lambda x: abs(x[1]), reverse=True)
-                
-                # Create human-readable explanation
-                top_features = feature_contributions[:5]
-                explanation_text = self._create_explanation(top_features)
+            for i, (idx_row, val_row) in enumerate(zip(top_idx.tolist(), top_vals.tolist())):
+                template_key = (tuple(idx_row), tuple((v > 0) - (v < 0) for v in val_row))
+                explanation_text = text_templates.get(template_key)
+                if explanation_text is None:
+                    explanation_text = self._create_explanation(
+                        [(names[j], v) for j, v in zip(idx_row, val_row)]
+                    )
+                    text_templates[template_key] = explanation_text
                 
-                explanations.append({
-                    'shap_values': dict(zip(feature_names, shap_values[i].tolist())),
+                explanation = {
                     'top_features': [
-                        {'feature': f, 'impact': float(v)} 
-                        for f, v in top_features
+                        {'feature': names[j], 'impact': v}
+                        for j, v in zip(idx_row, val_row)
                     ],
                     'explanation': explanation_text,
-                    'base_value': float(base_value)
-                })
+                    'base_value': base_value
+                }
+                if include_shap_values:
+                    explanation['shap_values'] = dict(zip(names, all_values[i]))
+                explanations.append(explanation)
             
             return {
                 'explanations': explanations,
@@ -80,6 +114,22 @@ class ModelExplainer:
             logger.error(f"SHAP explanation failed: {e}")
             return {}
     
+    @staticmethod
+    def _top_k_contributions(shap_values: np.ndarray, top_k: int):
+        """Get indices and values of the top-k features by |SHAP| per row, largest first"""
+        n_rows, n_features = shap_values.shape
+        k = max(0, min(top_k, n_features))
+        abs_values = np.abs(shap_values)
+        
+        if 0 < k < n_features:
+            top_idx = np.argpartition(-abs_values, k - 1, axis=1)[:, :k]
+        else:
+            top_idx = np.broadcast_to(np.arange(k), (n_rows, k))
+        
+        order = np.argsort(-np.take_along_axis(abs_values, top_idx, axis=1), axis=1, kind='stable')
+        top_idx = np.take_along_axis(top_idx, order, axis=1)
+        return top_idx, np.take_along_axis(shap_values, top_idx, axis=1)
+    
     def _create_explanation(self, top_features: List[tuple]) -> str:
         """Create human-readable explanation from SHAP values"""
         positive_factors = []
@@ -106,3 +156,202 @@ class ModelExplainer:
         # Mean absolute SHAP value per feature
         importance = np.abs(shap_values).mean(axis=0)
         return dict(zip(feature_names, importance.tolist()))
+
+
+class ImportanceAccumulator:
+    """
+    Running |SHAP| statistics per feature, sliced by facility, for one model version
+    
+    Each slice holds the statistics of a sample of a facility's CMLs and the number of
+    CMLs the facility actually has, so fleet-wide importance weights every facility by
+    its population rather than by the size of its sample.
+    """
+    
+    def __init__(self, feature_names: List[str], model_version: str = None):
+        self.feature_names = list(feature_names)
+        self.model_version = model_version
+        # facility -> {'count': int, 'population': int, 'abs_sum': ndarray, 'abs_sum_sq': ndarray}
+        self.slices: Dict[str, Dict[str, Any]] = {}
+    
+    def _slice(self, facility: str) -> Dict[str, Any]:
+        stats = self.slices.get(facility)
+        if stats is None:
+            n_features = len(self.feature_names)
+            stats = {'count': 0, 'population': 0, 'abs_sum': np.zeros(n_features), 'abs_sum_sq': np.zeros(n_features)}
+            self.slices[facility] = stats
+        return stats
+    
+    def update(self, shap_values: np.ndarray, facilities: Optional[Sequence[str]] = None):
+        """Add a batch of SHAP values, one row per prediction"""
+        abs_values = np.abs(np.asarray(shap_values, dtype=float))
+        if facilities is None:
+            facilities = ['Unknown'] * len(abs_values)
+        
+        codes, uniques = pd.factorize(pd.Series(facilities, dtype=object).fillna('Unknown'))
+        sums = np.zeros((len(uniques), abs_values.shape[1]))
+        sums_sq = np.zeros_like(sums)
+        np.add.at(sums, codes, abs_values)
+        np.add.at(sums_sq, codes, abs_values ** 2)
+        counts = np.bincount(codes, minlength=len(uniques))
+        
+        for j, facility in enumerate(uniques):
+            self.add_stats(facility, int(counts[j]), sums[j], sums_sq[j])
+    
+    def add_stats(
+        self,
+        facility: str,
+        count: int,
+        abs_sum: Sequence[float],
+        abs_sum_sq: Sequence[float],
+        population: Optional[int] = None
+    ):
+        """Add pre-aggregated statistics for a facility slice, and set its population if given"""
+        stats = self._slice(facility)
+        stats['count'] += count
+        stats['abs_sum'] += np.asarray(abs_sum, dtype=float)
+        stats['abs_sum_sq'] += np.asarray(abs_sum_sq, dtype=float)
+        if population is not None:
+            stats['population'] = population
+    
+    def importance(self, facility: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get mean |SHAP| and its variance per feature, for one facility or all of them
+        
+        Across facilities, each slice's moments are weighted by its population (its
+        sample count where no population was recorded).
+        """
+        if facility is None:
+            slices = [s for s in self.slices.values() if s['count'] > 0]
+        else:
+            slices = [self.slices[facility]] if self.slices.get(facility, {}).get('count') else []
+        if not slices:
+            return {'count': 0, 'population': 0, 'features': {}}
+        
+        weights = np.array([s['population'] or s['count'] for s in slices], dtype=float)
+        weights /= weights.sum()
+        mean = sum(w * s['abs_sum'] / s['count'] for w, s in zip(weights, slices))
+        second_moment = sum(w * s['abs_sum_sq'] / s['count'] for w, s in zip(weights, slices))
+        variance = np.maximum(second_moment - mean ** 2, 0.0)
+        
+        return {
+            'count': sum(s['count'] for s in slices),
+            'population': sum(s['population'] or s['count'] for s in slices),
+            'features': {
+                name: {'importance': m, 'variance': v}
+                for name, m, v in zip(self.feature_names, mean.tolist(), variance.tolist())
+            }
+        }
+
+def summarize_background(
+    X: pd.DataFrame,
+    size: int = 100,
+    method: str = 'kmeans',
+    strata: Optional[pd.Series] = None,
+    random_state: int = 42
+) -> Dict[str, Any]:
+    """
+    Summarize a background set so SHAP cost stays bounded by `size`
+    
+    Args:
+        X: Full background feature matrix (typically the training set)
+        size: Maximum number of summary rows
+        method: 'kmeans' for weighted centroids, 'stratified' for a sample stratified by `strata`
+        strata: Stratum label per row of X (e.g. risk level), used by the stratified method
+        random_state: Seed for reproducible summaries
+    
+    Returns:
+        Dictionary with summary 'data', per-row 'weights' (summing to 1), 'method' and 'source_rows'
+    """
+    n_rows = len(X)
+    if n_rows <= size:
+        return {
+            'data': X.reset_index(drop=True),
+            'weights': np.full(n_rows, 1.0 / max(n_rows, 1)),
+            'method': 'full',
+            'source_rows': n_rows
+        }
+    
+    if method == 'kmeans':
+        from sklearn.cluster import MiniBatchKMeans
+        
+        values = X.to_numpy(dtype=float)
+        kmeans = MiniBatchKMeans(n_clusters=size, random_state=random_state, n_init=3)
+        labels = kmeans.fit_predict(values)
+        counts = np.bincount(labels, minlength=size)
+        occupied = counts > 0
+        data = pd.DataFrame(kmeans.cluster_centers_[occupied], columns=X.columns)
+        weights = counts[occupied] / n_rows
+    elif method == 'stratified':
+        if strata is None:
+            strata = pd.Series(0, index=X.index)
+        strata = pd.Series(np.asarray(strata), index=X.index)
+        rng = np.random.default_rng(random_state)
+        
+        picked = []
+        weights = []
+        for _, members in strata.groupby(strata).groups.items():
+            # Proportional allocation, at least one row per stratum
+            n_take = max(1, int(round(size * len(members) / n_rows)))
+            n_take = min(n_take, len(members))
+            chosen = rng.choice(np.asarray(members), size=n_take, replace=False)
+            picked.extend(chosen)
+            weights.extend([len(members) / n_rows / n_take] * n_take)
+        data = X.loc[picked].reset_index(drop=True)
+        weights = np.asarray(weights)
+    else:
+        raise ValueError(f"Unknown background summarization method: {method}")
+    
+    return {
+        'data': data,
+        'weights': weights / weights.sum(),
+        'method': method,
+        'source_rows': n_rows
+    }
+
+def expand_weighted_background(data: pd.DataFrame, weights: np.ndarray, size: Optional[int] = None) -> pd.DataFrame:
+    """
+    Turn a weighted background into an unweighted one of `size` rows
+    
+    TreeExplainer averages over background rows uniformly, so rows are repeated in
+    proportion to their weight (largest-remainder rounding) instead.
+    """
+    size = size or len(data)
+    weights = np.asarray(weights, dtype=float)
+    if np.allclose(weights, weights[0]) and size == len(data):
+        return data
+    
+    exact = weights / weights.sum() * size
+    repeats = np.floor(exact).astype(int)
+    remainder = size - repeats.sum()
+    if remainder > 0:
+        repeats[np.argsort(exact - repeats)[::-1][:remainder]] += 1
+    
+    return data.loc[data.index.repeat(repeats)].reset_index(drop=True)
+
+def background_fidelity(
+    model,
+    X_eval: pd.DataFrame,
+    full_background: pd.DataFrame,
+    summary: Dict[str, Any]
+) -> Dict[str, float]:
+    """Compare SHAP values under a summarized background against the full background"""
+    import shap
+    
+    full_shap = shap.TreeExplainer(model, full_background).shap_values(X_eval)
+    summary_data = expand_weighted_background(summary['data'], summary['weights'])
+    summary_shap = shap.TreeExplainer(model, summary_data).shap_values(X_eval)
+    
+    if isinstance(full_shap, list):
+        full_shap, summary_shap = full_shap[1], summary_shap[1]
+    
+    error = np.abs(np.asarray(full_shap) - np.asarray(summary_shap))
+    scale = np.abs(full_shap).mean()
+    
+    return {
+        'eval_rows': len(X_eval),
+        'full_background_rows': len(full_background),
+        'summary_rows': len(summary_data),
+        'max_abs_error': float(error.max()),
+        'mean_abs_error': float(error.mean()),
+        'relative_error': float(error.mean() / scale) if scale > 0 else 0.0
+    }
@@ -0,0 +1,257 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Sequence, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Matches the 30-day step and 95% band of CMLForecastModel._linear_forecast
+FORECAST_STEP_DAYS = 30
+Z_95 = 1.96
+
+# Crossings further out than this are reported as never reached
+MAX_CROSSING_DAYS = 365 * 500
+
+def pack_histories(dates: Sequence[str], measurements: Sequence[str], min_points: int = 3) -> Dict[str, np.ndarray]:
+    """
+    Pack pipe-delimited inspection histories into flat (ragged) NumPy arrays
+
+    Args:
+        dates: Pipe-delimited inspection dates per CML ('YYYY-MM-DD|...')
+        measurements: Pipe-delimited thickness measurements per CML
+        min_points: Histories with fewer valid points are marked invalid
+
+    Returns:
+        Dictionary with per-CML 'valid', 'offsets', 'lengths' and flat 'day' (days since epoch)
+        and 'value' arrays holding only the valid histories, in order
+    """
+    n = len(dates)
+    date_parts = [(d or '').replace(' ', '').split('|') for d in dates]
+    value_parts = [(m or '').replace(' ', '').split('|') for m in measurements]
+
+    lengths = np.fromiter((len(d) for d in date_parts), dtype=np.int64, count=n)
+    value_lengths = np.fromiter((len(v) for v in value_parts), dtype=np.int64, count=n)
+    valid = (lengths == value_lengths) & (lengths >= min_points)
+
+    flat_dates = [p for d, ok in zip(date_parts, valid) if ok for p in d]
+    flat_values = [p for v, ok in zip(value_parts, valid) if ok for p in v]
+
+    # Vectorized parsing; unparseable entries become NaT/NaN and invalidate their history
+    parsed = pd.to_datetime(pd.Series(flat_dates, dtype=object), format='%Y-%m-%d', errors='coerce')
+    day = parsed.to_numpy(dtype='datetime64[D]').astype(np.int64).astype(float)
+    day[parsed.isna().to_numpy()] = np.nan
+    value = pd.to_numeric(pd.Series(flat_values, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+    valid_lengths = lengths[valid]
+    group = np.repeat(np.arange(len(valid_lengths)), valid_lengths)
+    bad = np.bincount(group, weights=(np.isnan(day) | np.isnan(value)).astype(float), minlength=len(valid_lengths)) > 0
+
+    if bad.any():
+        keep_points = ~bad[group]
+        valid_idx = np.flatnonzero(valid)
+        valid[valid_idx[bad]] = False
+        day, value = day[keep_points], value[keep_points]
+        valid_lengths = valid_lengths[~bad]
+
+    offsets = np.concatenate([[0], np.cumsum(valid_lengths)[:-1]]).astype(np.int64)
+
+    return {
+        'valid': valid,
+        'lengths': valid_lengths,
+        'offsets': offsets,
+        'day': day,
+        'value': value
+    }
+
+class FleetLinearForecaster:
+    """Closed-form least-squares thickness trends for many CMLs at once"""
+
+    def __init__(self, periods: int = 24):
+        self.periods = periods
+        self.slope = None
+        self.intercept = None
+        self.residual_std = None
+        self.first_day = None
+        self.last_day = None
+        self.n_points = None
+        self.x_mean = None
+        self.sxx = None
+
+    def fit(self, packed: Dict[str, np.ndarray]) -> 'FleetLinearForecaster':
+        """Fit y = intercept + slope * (days since first measurement) for every packed history"""
+        lengths = packed['lengths']
+        offsets = packed['offsets']
+        n = len(lengths)
+
+        if n == 0:
+            self.slope = self.intercept = self.residual_std = np.zeros(0)
+            self.first_day = self.last_day = np.zeros(0)
+            self.x_mean = self.sxx = np.zeros(0)
+            self.n_points = lengths
+            return self
+
+        group = np.repeat(np.arange(n), lengths)
+        counts = lengths.astype(float)
+
+        self.first_day = np.minimum.reduceat(packed['day'], offsets)
+        self.last_day = np.maximum.reduceat(packed['day'], offsets)
+        x = packed['day'] - self.first_day[group]
+        y = packed['value']
+
+        # Centered sums keep the normal equations well conditioned
+        x_mean = np.bincount(group, weights=x, minlength=n) / counts
+        y_mean = np.bincount(group, weights=y, minlength=n) / counts
+        dx = x - x_mean[group]
+        dy = y - y_mean[group]
+        sxx = np.bincount(group, weights=dx * dx, minlength=n)
+        sxy = np.bincount(group, weights=dx * dy, minlength=n)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.slope = np.where(sxx > 0, sxy / sxx, 0.0)
+        self.intercept = y_mean - self.slope * x_mean
+
+        residuals = y - (self.intercept[group] + self.slope[group] * x)
+        self.residual_std = np.sqrt(np.bincount(group, weights=residuals ** 2, minlength=n) / counts)
+        self.n_points = lengths
+        self.x_mean = x_mean
+        self.sxx = sxx
+
+        logger.info(f"Fitted linear thickness trends for {n} CMLs")
+        return self
+
+    def forecast(self, periods: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Forecast every fitted CML on the same monthly grid as the single-CML linear model
+
+        Returns:
+            Dictionary of (n_cmls, periods) arrays: 'ds' (datetime64[D]), 'yhat', 'yhat_lower', 'yhat_upper'
+        """
+        periods = periods or self.periods
+        steps = FORECAST_STEP_DAYS * np.arange(1, periods + 1)
+
+        future_day = self.last_day[:, None] + steps[None, :]
+        future_x = future_day - self.first_day[:, None]
+        yhat = self.intercept[:, None] + self.slope[:, None] * future_x
+        margin = (Z_95 * self.residual_std)[:, None]
+
+        return {
+            'ds': future_day.astype('datetime64[D]'),
+            'yhat': yhat,
+            'yhat_lower': yhat - margin,
+            'yhat_upper': yhat + margin
+        }
+
+    def crossing_dates(self, min_allowable: np.ndarray) -> np.ndarray:
+        """Date each fitted trend reaches the minimum allowable thickness (NaT when it never does)"""
+        min_allowable = np.asarray(min_allowable, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = (min_allowable - self.intercept) / self.slope
+
+        horizon = x_cross - (self.last_day - self.first_day)
+        with np.errstate(invalid='ignore'):
+            reaches = (self.slope < 0) & np.isfinite(x_cross) & (horizon < MAX_CROSSING_DAYS) & (x_cross > -MAX_CROSSING_DAYS)
+        crossing = np.full(len(self.slope), np.datetime64('NaT'), dtype='datetime64[D]')
+        crossing[reaches] = (self.first_day[reaches] + np.floor(x_cross[reaches])).astype('datetime64[D]')
+        return crossing
+
+    def crossing_bounds(self, min_allowable: np.ndarray, z: float = Z_95) -> Dict[str, np.ndarray]:
+        """
+        Solve when each trend and its prediction band reach the minimum allowable thickness
+        
+        The band is the regression prediction interval, which widens away from the data:
+        yhat(x) +/- z * s * sqrt(1 + 1/n + (x - x_mean)^2 / Sxx). Setting yhat - m = +/-w
+        and squaring gives one quadratic per CML whose roots are the band crossings.
+        
+        Returns:
+            Dictionary of datetime64[D] arrays 'earliest' (lower band reaches the minimum),
+            'expected' (trend reaches it) and 'latest' (upper band reaches it); NaT where the
+            crossing is never reached, or for 'latest' when the wall-loss trend is not
+            significant enough for the upper band to ever come down to the minimum
+        """
+        min_allowable = np.asarray(min_allowable, dtype=float)
+        b = self.slope
+        d = self.intercept - min_allowable
+        var = (z * self.residual_std) ** 2
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_expected = np.where(b < 0, -d / b, np.nan)
+            
+            k0 = var * (1 + 1 / self.n_points)
+            k1 = np.where(self.sxx > 0, var / self.sxx, np.inf)
+            qa = b * b - k1
+            qb = 2 * b * d + 2 * k1 * self.x_mean
+            qc = d * d - k0 - k1 * self.x_mean ** 2
+            root = np.sqrt(qb * qb - 4 * qa * qc)
+            roots = np.stack([(-qb - root) / (2 * qa), (-qb + root) / (2 * qa)])
+        
+        roots[~np.isfinite(roots)] = np.nan
+        # yhat is above the minimum where the lower band crosses, below it where the upper band does
+        above = d + b * roots
+        lower_roots = np.where(above >= 0, roots, np.nan)
+        upper_roots = np.where(above <= 0, roots, np.nan)
+        
+        with np.errstate(invalid='ignore'):
+            # The concave lower band falls away to the right unless the thickness is significantly
+            # growing; it reaches the minimum at its right-most root, and when it never rises above
+            # the minimum at all the CML may already be there
+            falls = b < np.sqrt(k1)
+            x_earliest = np.nanmax(np.where(np.isnan(lower_roots), -np.inf, lower_roots), axis=0)
+            x_earliest = np.where(np.isinf(x_earliest), self.last_day - self.first_day, x_earliest)
+            x_earliest = np.where(falls & np.isfinite(d) & np.isfinite(k1), x_earliest, np.nan)
+            # The upper band only comes down to the minimum when the wall-loss trend dominates its growth
+            x_latest = np.nanmin(np.where(np.isnan(upper_roots), np.inf, upper_roots), axis=0)
+            x_latest = np.where((b < 0) & (qa > 0) & np.isfinite(x_latest), x_latest, np.nan)
+        
+        return {
+            'earliest': self._to_dates(x_earliest),
+            'expected': self._to_dates(x_expected),
+            'latest': self._to_dates(x_latest)
+        }
+    
+    def _to_dates(self, x: np.ndarray) -> np.ndarray:
+        """Convert days since each CML's first measurement to dates, NaT beyond MAX_CROSSING_DAYS either way"""
+        horizon = x - (self.last_day - self.first_day)
+        with np.errstate(invalid='ignore'):
+            reached = np.isfinite(x) & (horizon < MAX_CROSSING_DAYS) & (x > -MAX_CROSSING_DAYS)
+        dates = np.full(len(x), np.datetime64('NaT'), dtype='datetime64[D]')
+        dates[reached] = (self.first_day[reached] + np.floor(x[reached])).astype('datetime64[D]')
+        return dates
+    
+    def corrosion_rate_per_year(self) -> np.ndarray:
+        """Fitted wall loss rate in mm/year (positive when thinning)"""
+        return -self.slope * 365.25
+
+def forecast_fleet(
+    cml_ids: Sequence[str],
+    min_allowable: Sequence[float],
+    dates: Sequence[str],
+    measurements: Sequence[str],
+    periods: int = 24
+) -> Dict[str, object]:
+    """
+    Linear forecast for a whole fleet in one vectorized pass
+
+    Returns:
+        Dictionary with a per-CML 'summary' DataFrame, the (n_cmls, periods) 'forecast' arrays
+        aligned with the summary rows, and the 'skipped' CML IDs lacking usable history
+    """
+    packed = pack_histories(dates, measurements)
+    model = FleetLinearForecaster(periods).fit(packed)
+    valid = packed['valid']
+
+    cml_ids = np.asarray(cml_ids, dtype=object)
+    min_allowable = np.asarray(min_allowable, dtype=float)
+
+    summary = pd.DataFrame({
+        'cml_id': cml_ids[valid],
+        'n_points': model.n_points,
+        'corrosion_rate_mm_per_year': model.corrosion_rate_per_year(),
+        'residual_std': model.residual_std,
+        'estimated_failure_date': model.crossing_dates(min_allowable[valid])
+    })
+
+    return {
+        'summary': summary,
+        'forecast': model.forecast(),
+        'skipped': cml_ids[~valid].tolist()
+    }
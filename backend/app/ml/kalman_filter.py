@@ -0,0 +1,149 @@
+import numpy as np
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_YEAR = 365.25
+
+# State arrays: thickness level (mm), thickness slope (mm/year, negative when thinning)
+# and the symmetric 2x2 covariance [[p00, p01], [p01, p11]]
+STATE_FIELDS = ('level', 'rate', 'p00', 'p01', 'p11')
+
+class ThicknessKalmanFilter:
+    """
+    Local linear trend Kalman filter for wall thickness, vectorized over many CMLs
+
+    Each CML carries a two-element state (thickness, thickness slope) and its covariance,
+    so a new measurement is an O(1) update regardless of how long the history is. The
+    slope follows a random walk, letting the corrosion rate drift slowly over the years.
+    """
+
+    def __init__(
+        self,
+        measurement_std: Optional[float] = None,
+        rate_drift_std: Optional[float] = None,
+        initial_rate_std: Optional[float] = None
+    ):
+        from app.core.config import settings
+
+        self.measurement_var = (measurement_std or settings.KALMAN_MEASUREMENT_STD) ** 2
+        self.rate_drift_var = (rate_drift_std or settings.KALMAN_RATE_DRIFT_STD) ** 2
+        self.initial_rate_var = (initial_rate_std or settings.KALMAN_INITIAL_RATE_STD) ** 2
+
+    def initialize(self, y: np.ndarray) -> Dict[str, np.ndarray]:
+        """State from each CML's first measurement: known thickness, unknown slope"""
+        y = np.asarray(y, dtype=float)
+        return {
+            'level': y.copy(),
+            'rate': np.zeros_like(y),
+            'p00': np.full_like(y, self.measurement_var),
+            'p01': np.zeros_like(y),
+            'p11': np.full_like(y, self.initial_rate_var)
+        }
+
+    def predict(self, state: Dict[str, np.ndarray], dt: np.ndarray) -> Dict[str, np.ndarray]:
+        """Propagate states dt years ahead (transition [[1, dt], [0, 1]] plus slope drift)"""
+        dt = np.asarray(dt, dtype=float)
+        q = self.rate_drift_var
+        p00, p01, p11 = state['p00'], state['p01'], state['p11']
+        return {
+            'level': state['level'] + state['rate'] * dt,
+            'rate': state['rate'].copy(),
+            'p00': p00 + 2 * dt * p01 + dt * dt * p11 + q * dt ** 3 / 3,
+            'p01': p01 + dt * p11 + q * dt * dt / 2,
+            'p11': p11 + q * dt
+        }
+
+    def update(self, state: Dict[str, np.ndarray], dt: np.ndarray, y: np.ndarray) -> Dict[str, np.ndarray]:
+        """Fold one new measurement per CML, taken dt years after its last, into the states"""
+        prior = self.predict(state, dt)
+        innovation_var = prior['p00'] + self.measurement_var
+        gain_level = prior['p00'] / innovation_var
+        gain_rate = prior['p01'] / innovation_var
+        innovation = np.asarray(y, dtype=float) - prior['level']
+
+        return {
+            'level': prior['level'] + gain_level * innovation,
+            'rate': prior['rate'] + gain_rate * innovation,
+            'p00': (1 - gain_level) * prior['p00'],
+            'p01': (1 - gain_level) * prior['p01'],
+            'p11': prior['p11'] - gain_rate * prior['p01']
+        }
+
+    def forecast(self, state: Dict[str, np.ndarray], horizons: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Thickness mean and standard deviation at future horizons, without refitting
+
+        Args:
+            state: Current states of n CMLs
+            horizons: Years ahead of each CML's last measurement, shape (periods,) or (n, periods)
+
+        Returns:
+            Dictionary of (n, periods) arrays 'mean' and 'std'
+        """
+        h = np.broadcast_to(np.asarray(horizons, dtype=float), (len(state['level']), np.shape(horizons)[-1]))
+        column = {k: v[:, None] for k, v in state.items()}
+        prior = self.predict(column, h)
+        return {'mean': prior['level'], 'std': np.sqrt(np.maximum(prior['p00'], 0))}
+
+    def filter(
+        self,
+        group: np.ndarray,
+        day: np.ndarray,
+        value: np.ndarray,
+        n: int,
+        state: Optional[Dict[str, np.ndarray]] = None,
+        last_day: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Run the filter over many CMLs' measurements, one vectorized update per round
+
+        Args:
+            group: CML index (0..n-1) of each measurement
+            day: Measurement dates as days since epoch
+            value: Measured thickness
+            n: Number of CMLs
+            state: Current states to continue from; CMLs whose level is NaN start fresh
+            last_day: Day of the last measurement already in each state
+
+        Returns:
+            Dictionary of updated state arrays plus 'last_day' and 'n_updates' (measurements applied)
+        """
+        if state is None:
+            state = {k: np.full(n, np.nan) for k in STATE_FIELDS}
+            last_day = np.full(n, np.nan)
+        state = {k: np.array(state[k], dtype=float) for k in STATE_FIELDS}
+        last_day = np.array(last_day, dtype=float)
+        applied = np.zeros(n, dtype=np.int64)
+
+        # Apply each CML's measurements in date order; round k takes every CML's k-th one
+        order = np.lexsort((day, group))
+        group, day, value = group[order], day[order], value[order]
+        starts = np.searchsorted(group, np.arange(n))
+        rank = np.arange(len(group)) - starts[group]
+
+        for k in range(int(rank.max()) + 1 if len(rank) else 0):
+            at = rank == k
+            idx, d, y = group[at], day[at], value[at]
+
+            fresh = np.isnan(state['level'][idx])
+            if fresh.any():
+                init = self.initialize(y[fresh])
+                for key in STATE_FIELDS:
+                    state[key][idx[fresh]] = init[key]
+
+            step = ~fresh
+            if step.any():
+                cur = idx[step]
+                dt = np.maximum(d[step] - last_day[cur], 0) / DAYS_PER_YEAR
+                updated = self.update({key: state[key][cur] for key in STATE_FIELDS}, dt, y[step])
+                for key in STATE_FIELDS:
+                    state[key][cur] = updated[key]
+
+            last_day[idx] = d
+            applied[idx] += 1
+
+        state['last_day'] = last_day
+        state['n_updates'] = applied
+        return state
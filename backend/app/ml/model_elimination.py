@@ -2,10 +2,8 @@ import os
 import pickle
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
-import xgboost as xgb
 import logging
+from datetime import datetime
 from typing import List, Dict, Any
 from app.ml.preprocess import CMLPreprocessor
 from app.core.config import settings
@@ -21,6 +19,8 @@ class CMLEliminationModel:
         self.preprocessor = CMLPreprocessor()
         self.feature_columns = None
         self.metrics = {}
+        self.model_version = None
+        self.background = None
         
         # Try to load existing model
         if os.path.exists(self.model_path):
@@ -28,13 +28,19 @@ class CMLEliminationModel:
     
     def train(self, cmls: List[Any], test_size: float = 0.2):
         """Train the elimination model"""
+        import xgboost as xgb
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+        
         logger.info(f"Training elimination model on {len(cmls)} CMLs...")
         
         # Preprocess data
         df = self.preprocessor.fit_transform(cmls)
         
         # Prepare features and target
-        feature_cols = [c for c in df.columns if c not in ['cml_id', 'elimination_candidate']]
+        # Categorical columns enter the model through their *_encoded versions
+        excluded = ['cml_id', 'elimination_candidate'] + self.preprocessor.categorical_features
+        feature_cols = [c for c in df.columns if c not in excluded]
         X = df[feature_cols]
         y = df['elimination_candidate'].astype(int)
         
@@ -75,7 +81,13 @@ class CMLEliminationModel:
             'test_samples': len(X_test)
         }
         
-        logger.info(f"Model trained. Metrics: {self.metrics}")
+        # Summarized SHAP background is persisted with this model version
+        self.background = self._build_background(
+            X_train, X_test, df.loc[X_train.index, 'risk_level'] if 'risk_level' in df.columns else None
+        )
+        
+        self.model_version = datetime.now().strftime('%Y%m%d%H%M%S')
+        logger.info(f"Model {self.model_version} trained. Metrics: {self.metrics}")
         
         # Save model
         self.save_model()
@@ -105,6 +117,30 @@ class CMLEliminationModel:
         
         return results
     
+    def _build_background(self, X_train: pd.DataFrame, X_test: pd.DataFrame, strata: pd.Series = None):
+        """Summarize the training set into a bounded SHAP background and check its fidelity"""
+        from app.ml.explainability import summarize_background, background_fidelity
+        
+        try:
+            summary = summarize_background(
+                X_train,
+                size=settings.SHAP_BACKGROUND_SIZE,
+                method=settings.SHAP_BACKGROUND_METHOD,
+                strata=strata
+            )
+            
+            if settings.SHAP_FIDELITY_SAMPLES > 0 and summary['method'] != 'full':
+                fidelity = background_fidelity(
+                    self.model, X_test.head(settings.SHAP_FIDELITY_SAMPLES), X_train, summary
+                )
+                self.metrics['shap_background_fidelity'] = fidelity
+                logger.info(f"SHAP background fidelity: {fidelity}")
+            
+            return summary
+        except Exception as e:
+            logger.warning(f"Failed to summarize SHAP background: {e}")
+            return None
+    
     def get_feature_importance(self) -> Dict[str, float]:
         """Get feature importance scores"""
         if self.model is None or self.feature_columns is None:
@@ -125,7 +161,9 @@ class CMLEliminationModel:
             'model': self.model,
             'preprocessor': self.preprocessor,
             'feature_columns': self.feature_columns,
-            'metrics': self.metrics
+            'metrics': self.metrics,
+            'model_version': self.model_version,
+            'background': self.background
         }
         
         with open(self.model_path, 'wb') as f:
@@ -143,6 +181,11 @@ class CMLEliminationModel:
             self.preprocessor = model_data['preprocessor']
             self.feature_columns = model_data['feature_columns']
             self.metrics = model_data.get('metrics', {})
+            self.background = model_data.get('background')
+            # Models saved before versioning fall back to the file timestamp
+            self.model_version = model_data.get('model_version') or datetime.fromtimestamp(
+                os.path.getmtime(self.model_path)
+            ).strftime('%Y%m%d%H%M%S')
             
             logger.info(f"Model loaded from {self.model_path}")
         except Exception as e:
@@ -1,17 +1,46 @@
 import pandas as pd
 import numpy as np
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from typing import Literal
+from typing import Dict, Hashable, Iterator, Literal, Optional, Tuple
 import logging
+from threading import Lock
 
 logger = logging.getLogger(__name__)
 
+# Bump when forecasting code changes so cached forecasts are recomputed
+FORECAST_CODE_VERSION = "3"
+
+def history_to_frame(dates_str: str, measurements_str: str) -> pd.DataFrame:
+    """Parse pipe-delimited inspection history into a 'ds'/'y' DataFrame sorted by date"""
+    dates = [datetime.strptime(d.strip(), '%Y-%m-%d') for d in dates_str.split('|')]
+    measurements = [float(m.strip()) for m in measurements_str.split('|')]
+    
+    if len(dates) != len(measurements):
+        raise ValueError("Inspection history dates and measurements have different lengths")
+    
+    df = pd.DataFrame({'ds': pd.to_datetime(dates), 'y': measurements})
+    return df.sort_values('ds').reset_index(drop=True)
+
 class CMLForecastModel:
     """Time-series forecasting for CML thickness"""
     
-    def __init__(self, model_type: Literal['prophet', 'linear', 'arima'] = 'prophet'):
+    # Integrated MA(1) with drift: a noisy linear wall-loss trend on a monthly grid
+    ARIMA_ORDER = (0, 1, 1)
+    
+    def __init__(
+        self,
+        model_type: Literal['prophet', 'linear', 'arima', 'kalman'] = 'prophet',
+        start_params: Optional[np.ndarray] = None
+    ):
         self.model_type = model_type
         self.model = None
+        # ARIMA warm-start parameters in, fitted parameters out
+        self.start_params = start_params
+        self.params = None
     
     def predict(self, historical_data: pd.DataFrame, periods: int = 24) -> pd.DataFrame:
         """
@@ -26,41 +55,101 @@ class CMLForecastModel:
         """
         if self.model_type == 'prophet':
             return self._prophet_forecast(historical_data, periods)
-        elif self.model_type == 'linear':
-            return self._linear_forecast(historical_data, periods)
+        elif self.model_type == 'arima':
+            return self._arima_forecast(historical_data, periods)
+        elif self.model_type == 'kalman':
+            return self._kalman_forecast(historical_data, periods)
         else:
             return self._linear_forecast(historical_data, periods)
     
     def _prophet_forecast(self, df: pd.DataFrame, periods: int) -> pd.DataFrame:
         """Forecast using Facebook Prophet"""
         try:
-            from prophet import Prophet
-            
-            # Create and fit model
-            model = Prophet(
-                daily_seasonality=False,
-                weekly_seasonality=False,
-                yearly_seasonality=True,
-                changepoint_prior_scale=0.05,
-                interval_width=0.95
-            )
-            
-            model.fit(df)
-            
-            # Make future dataframe
-            future = model.make_future_dataframe(periods=periods, freq='M')
-            forecast = model.predict(future)
-            
-            # Return only future predictions
-            forecast = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
-            forecast = forecast[forecast['ds'] > df['ds'].max()]
-            
-            return forecast
-            
+            return self._fit_prophet(df, periods)
         except Exception as e:
             logger.warning(f"Prophet forecast failed: {e}. Falling back to linear model.")
             return self._linear_forecast(df, periods)
     
+    @staticmethod
+    def _fit_prophet(df: pd.DataFrame, periods: int) -> pd.DataFrame:
+        """Fit Prophet and forecast, raising on failure"""
+        from prophet import Prophet
+        
+        # Create and fit model
+        model = Prophet(
+            daily_seasonality=False,
+            weekly_seasonality=False,
+            yearly_seasonality=True,
+            changepoint_prior_scale=0.05,
+            interval_width=0.95
+        )
+        
+        model.fit(df)
+        
+        # Make future dataframe
+        future = model.make_future_dataframe(periods=periods, freq='M')
+        forecast = model.predict(future)
+        
+        # Return only future predictions
+        forecast = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+        forecast = forecast[forecast['ds'] > df['ds'].max()]
+        
+        return forecast
+    
+    def _arima_forecast(self, df: pd.DataFrame, periods: int) -> pd.DataFrame:
+        """Forecast using a statsmodels state-space ARIMA"""
+        try:
+            return self._fit_arima(df, periods)
+        except Exception as e:
+            logger.warning(f"ARIMA forecast failed: {e}. Falling back to linear model.")
+            return self._linear_forecast(df, periods)
+    
+    def _fit_arima(self, df: pd.DataFrame, periods: int) -> pd.DataFrame:
+        """Fit ARIMA on a monthly grid and forecast, raising on failure"""
+        import warnings
+        from statsmodels.tsa.arima.model import ARIMA
+        
+        # Irregular inspections go on a monthly grid; months without a reading are
+        # missing observations, which the Kalman filter skips
+        monthly = df.set_index(pd.to_datetime(df['ds']))['y'].resample('MS').mean()
+        
+        model = ARIMA(monthly, order=self.ARIMA_ORDER, trend='t')
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = model.fit(start_params=self.start_params)
+        self.model = result
+        self.params = np.asarray(result.params)
+        
+        prediction = result.get_forecast(steps=periods)
+        intervals = prediction.conf_int(alpha=0.05)
+        
+        return pd.DataFrame({
+            'ds': prediction.predicted_mean.index,
+            'yhat': prediction.predicted_mean.to_numpy(),
+            'yhat_lower': intervals.iloc[:, 0].to_numpy(),
+            'yhat_upper': intervals.iloc[:, 1].to_numpy()
+        })
+    
+    def _kalman_forecast(self, df: pd.DataFrame, periods: int) -> pd.DataFrame:
+        """Forecast by filtering the history with a local linear trend Kalman filter"""
+        from app.ml.kalman_filter import DAYS_PER_YEAR, ThicknessKalmanFilter
+        
+        kalman = ThicknessKalmanFilter()
+        day = pd.to_datetime(df['ds']).to_numpy(dtype='datetime64[D]').astype(np.int64).astype(float)
+        state = kalman.filter(np.zeros(len(df), dtype=np.int64), day, df['y'].to_numpy(dtype=float), 1)
+        self.model = state
+        
+        steps = 30 * np.arange(1, periods + 1)
+        forecast = kalman.forecast(state, steps / DAYS_PER_YEAR)
+        mean, std = forecast['mean'][0], forecast['std'][0]
+        
+        return pd.DataFrame({
+            'ds': pd.Timestamp(df['ds'].max()) + pd.to_timedelta(steps, unit='D'),
+            'yhat': mean,
+            'yhat_lower': mean - 1.96 * std,
+            'yhat_upper': mean + 1.96 * std
+        })
+    
     def _linear_forecast(self, df: pd.DataFrame, periods: int) -> pd.DataFrame:
         """Simple linear regression forecast"""
         from sklearn.linear_model import LinearRegression
@@ -97,3 +186,188 @@ class CMLForecastModel:
         })
         
         return forecast
+
+
+class FitTimeout(Exception):
+    """A forecast fit ran past its time limit"""
+
+def _raise_fit_timeout(signum, frame):
+    raise FitTimeout()
+
+def _init_forecast_worker():
+    """Import Prophet once per worker process and arm fit timeouts"""
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    signal.signal(signal.SIGALRM, _raise_fit_timeout)
+    try:
+        import prophet  # noqa: F401
+    except Exception as e:
+        logger.warning(f"Prophet unavailable in forecast worker: {e}")
+
+# Worker processes shared by every forecast batch of this process, started on first use
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key: Optional[Tuple[int, int]] = None
+_pool_lock = Lock()
+
+def _forecast_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Get the forecast process pool, (re)creating it after a fork, a resize or a crash"""
+    global _pool, _pool_key
+    
+    with _pool_lock:
+        key = (os.getpid(), max_workers)
+        if _pool is None or _pool_key != key:
+            if _pool is not None and _pool_key[0] == os.getpid():
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_forecast_worker)
+            _pool_key = key
+        return _pool
+
+def _discard_forecast_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next batch starts a fresh one"""
+    global _pool
+    
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _prophet_worker(cml_id: str, df: pd.DataFrame, periods: int, timeout: float) -> Tuple[str, pd.DataFrame]:
+    # The clock runs in the worker, so it covers only this fit and not time spent queued
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return cml_id, CMLForecastModel._fit_prophet(df, periods)
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+def forecast_batch_prophet(
+    histories: Dict[str, pd.DataFrame],
+    periods: int = 24,
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> Iterator[Tuple[str, pd.DataFrame, str]]:
+    """
+    Fit Prophet for many CMLs across the forecast process pool
+    
+    Args:
+        histories: Mapping of cml_id to a 'ds'/'y' history DataFrame
+        periods: Number of months to forecast
+        max_workers: Worker processes (defaults to FORECAST_WORKERS)
+        timeout: Seconds a single fit may run before falling back (defaults to PROPHET_FIT_TIMEOUT)
+    
+    Yields:
+        (cml_id, forecast DataFrame, model used) as each fit finishes; failed or timed-out
+        fits fall back to the linear model
+    """
+    from app.core.config import settings
+    
+    max_workers = max_workers or settings.FORECAST_WORKERS
+    timeout = timeout if timeout is not None else settings.PROPHET_FIT_TIMEOUT
+    linear = CMLForecastModel(model_type='linear')
+    
+    executor = _forecast_pool(max_workers)
+    pending = {
+        executor.submit(_prophet_worker, cml_id, df, periods, timeout): cml_id
+        for cml_id, df in histories.items()
+    }
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                cml_id = pending.pop(future)
+                try:
+                    _, forecast = future.result()
+                    yield cml_id, forecast, 'prophet'
+                    continue
+                except FitTimeout:
+                    logger.warning(f"Prophet fit timed out for CML {cml_id}. Falling back to linear model.")
+                except BrokenProcessPool as e:
+                    _discard_forecast_pool(executor)
+                    logger.warning(f"Forecast worker died fitting CML {cml_id}: {e}. Falling back to linear model.")
+                except Exception as e:
+                    logger.warning(f"Prophet fit failed for CML {cml_id}: {e}. Falling back to linear model.")
+                yield cml_id, linear.predict(histories[cml_id], periods), 'linear'
+    finally:
+        # A client that disconnects mid-stream leaves nothing queued behind it
+        for future in pending:
+            future.cancel()
+
+
+def _arima_worker(cml_id: str, df: pd.DataFrame, periods: int, start_params: Optional[np.ndarray]):
+    model = CMLForecastModel(model_type='arima', start_params=start_params)
+    forecast = model._fit_arima(df, periods)
+    return cml_id, forecast, model.params
+
+def forecast_batch_arima(
+    histories: Dict[str, pd.DataFrame],
+    groups: Dict[str, Hashable],
+    periods: int = 24,
+    max_workers: Optional[int] = None
+) -> Iterator[Tuple[str, pd.DataFrame, str]]:
+    """
+    Fit ARIMA for many CMLs across the forecast process pool, warm-starting within groups
+    
+    The longest history of each group (e.g. commodity/material) is fitted first; its
+    parameters then seed the optimizer for the rest of that group.
+    
+    Args:
+        histories: Mapping of cml_id to a 'ds'/'y' history DataFrame
+        groups: Mapping of cml_id to its warm-start group key
+        periods: Number of months to forecast
+        max_workers: Worker processes (defaults to FORECAST_WORKERS)
+    
+    Yields:
+        (cml_id, forecast DataFrame, model used) as each fit finishes; failed fits fall
+        back to the linear model
+    """
+    from app.core.config import settings
+    
+    max_workers = max_workers or settings.FORECAST_WORKERS
+    linear = CMLForecastModel(model_type='linear')
+    
+    members: Dict[Hashable, list] = {}
+    for cml_id in histories:
+        members.setdefault(groups.get(cml_id), []).append(cml_id)
+    for group_ids in members.values():
+        group_ids.sort(key=lambda c: len(histories[c]), reverse=True)
+    
+    executor = _forecast_pool(max_workers)
+    # Seed fits: the longest history per group, started cold
+    pending = {
+        executor.submit(_arima_worker, group_ids[0], histories[group_ids[0]], periods, None): (group, group_ids[0])
+        for group, group_ids in members.items()
+    }
+    broken = False
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                group, cml_id = pending.pop(future)
+                params = None
+                try:
+                    _, forecast, params = future.result()
+                    yield cml_id, forecast, 'arima'
+                except BrokenProcessPool as e:
+                    if not broken:
+                        broken = True
+                        _discard_forecast_pool(executor)
+                    logger.warning(f"Forecast worker died fitting CML {cml_id}: {e}. Falling back to linear model.")
+                    yield cml_id, linear.predict(histories[cml_id], periods), 'linear'
+                except Exception as e:
+                    logger.warning(f"ARIMA fit failed for CML {cml_id}: {e}. Falling back to linear model.")
+                    yield cml_id, linear.predict(histories[cml_id], periods), 'linear'
+                
+                # Once a group's seed is fitted, the rest of the group starts from its parameters
+                if cml_id == members[group][0]:
+                    for member_id in members[group][1:]:
+                        if broken:
+                            yield member_id, linear.predict(histories[member_id], periods), 'linear'
+                            continue
+                        pending[executor.submit(
+                            _arima_worker, member_id, histories[member_id], periods, params
+                        )] = (group, member_id)
+    finally:
+        for future in pending:
+            future.cancel()
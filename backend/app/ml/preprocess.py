@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, LabelEncoder
 from typing import List, Dict, Any
 import logging
 
@@ -10,6 +9,8 @@ class CMLPreprocessor:
     """Preprocessing pipeline for CML data"""
     
     def __init__(self):
+        from sklearn.preprocessing import StandardScaler
+        
         self.scaler = StandardScaler()
         self.label_encoders = {}
         self.categorical_features = [
@@ -23,6 +24,8 @@ class CMLPreprocessor:
     
     def fit_transform(self, cmls: List[Any]) -> pd.DataFrame:
         """Fit preprocessor and transform CML data"""
+        from sklearn.preprocessing import LabelEncoder
+        
         df = self._cmls_to_dataframe(cmls)
         
         # Handle missing values
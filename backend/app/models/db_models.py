@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean, Text, DateTime, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, String, Float, Date, Boolean, Text, DateTime, ForeignKey, Enum, JSON, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -29,6 +29,8 @@ class CML(Base):
     corrosion_allowance_mm = Column(Float)
     current_thickness_mm = Column(Float)
     average_corrosion_rate = Column(Float)
+    short_term_corrosion_rate = Column(Float)
+    long_term_corrosion_rate = Column(Float)
     years_in_service = Column(Integer)
     number_of_inspections = Column(Integer)
     last_inspection_date = Column(Date)
@@ -57,6 +59,9 @@ class CML(Base):
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     measurements = relationship("Measurement", back_populates="cml", cascade="all, delete-orphan")
     forecasts = relationship("Forecast", back_populates="cml", cascade="all, delete-orphan")
+    forecast_runs = relationship("ForecastRun", back_populates="cml", cascade="all, delete-orphan")
+    remaining_life = relationship("RemainingLife", back_populates="cml", uselist=False, cascade="all, delete-orphan")
+    thickness_state = relationship("ThicknessState", back_populates="cml", uselist=False, cascade="all, delete-orphan")
 
 class Measurement(Base):
     __tablename__ = "measurements"
@@ -70,10 +75,24 @@ class Measurement(Base):
     created_at = Column(DateTime, server_default=func.now())
     cml = relationship("CML", back_populates="measurements")
 
+class ForecastRun(Base):
+    """One forecast generation for a CML; its points are the Forecast rows"""
+    __tablename__ = "forecast_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    cml_id = Column(Integer, ForeignKey("cmls.id", ondelete="CASCADE"), nullable=False, index=True)
+    model_used = Column(String)
+    periods = Column(Integer)
+    confidence_level = Column(Float)
+    created_at = Column(DateTime, server_default=func.now(), index=True)
+    cml = relationship("CML", back_populates="forecast_runs")
+    points = relationship("Forecast", back_populates="run", cascade="all, delete-orphan", passive_deletes=True)
+
 class Forecast(Base):
     __tablename__ = "forecasts"
+    __table_args__ = (Index("ix_forecasts_cml_run", "cml_id", "run_id"),)
     id = Column(Integer, primary_key=True, index=True)
     cml_id = Column(Integer, ForeignKey("cmls.id"), nullable=False)
+    run_id = Column(Integer, ForeignKey("forecast_runs.id", ondelete="CASCADE"))
     forecast_date = Column(Date, nullable=False)
     predicted_thickness_mm = Column(Float, nullable=False)
     lower_bound = Column(Float)
@@ -82,6 +101,45 @@ class Forecast(Base):
     model_used = Column(String)
     created_at = Column(DateTime, server_default=func.now())
     cml = relationship("CML", back_populates="forecasts")
+    run = relationship("ForecastRun", back_populates="points")
+
+class ForecastCacheEntry(Base):
+    """Persistent tier of the forecast result cache"""
+    __tablename__ = "forecast_cache"
+    cache_key = Column(String(64), primary_key=True)
+    cml_id = Column(Integer, ForeignKey("cmls.id", ondelete="CASCADE"), nullable=False, index=True)
+    model_type = Column(String)
+    periods = Column(Integer)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+class RemainingLife(Base):
+    """Analytic dates at which a CML's thickness trend reaches its minimum allowable thickness"""
+    __tablename__ = "remaining_life"
+    id = Column(Integer, primary_key=True, index=True)
+    cml_id = Column(Integer, ForeignKey("cmls.id", ondelete="CASCADE"), nullable=False, unique=True)
+    n_points = Column(Integer)
+    corrosion_rate_mm_per_year = Column(Float)
+    earliest_date = Column(Date, index=True)
+    expected_date = Column(Date, index=True)
+    latest_date = Column(Date, index=True)
+    computed_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    cml = relationship("CML", back_populates="remaining_life")
+
+class ThicknessState(Base):
+    """Kalman filter state (thickness, thickness slope and covariance) after a CML's latest measurement"""
+    __tablename__ = "thickness_states"
+    id = Column(Integer, primary_key=True, index=True)
+    cml_id = Column(Integer, ForeignKey("cmls.id", ondelete="CASCADE"), nullable=False, unique=True)
+    level_mm = Column(Float, nullable=False)
+    rate_mm_per_year = Column(Float, nullable=False)
+    p00 = Column(Float, nullable=False)
+    p01 = Column(Float, nullable=False)
+    p11 = Column(Float, nullable=False)
+    last_date = Column(Date, nullable=False)
+    n_updates = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    cml = relationship("CML", back_populates="thickness_state")
 
 class UploadHistory(Base):
     __tablename__ = "upload_history"
@@ -108,3 +166,17 @@ class ModelTrainingRun(Base):
     hyperparameters = Column(JSON)
     metrics = Column(JSON)
     status = Column(String)
+
+class FeatureImportanceStats(Base):
+    """Running |SHAP| statistics per feature, sliced by facility and model version"""
+    __tablename__ = "feature_importance_stats"
+    __table_args__ = (UniqueConstraint("facility", "model_version", name="uq_feature_importance_slice"),)
+    id = Column(Integer, primary_key=True, index=True)
+    facility = Column(String, nullable=False)
+    model_version = Column(String, nullable=False, index=True)
+    feature_names = Column(JSON, nullable=False)
+    count = Column(Integer, default=0)
+    population = Column(Integer, default=0)
+    abs_sum = Column(JSON, nullable=False)
+    abs_sum_sq = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
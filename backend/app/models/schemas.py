@@ -23,6 +23,8 @@ class CMLBase(BaseModel):
     min_allowable_thickness_mm: Optional[float] = None
     current_thickness_mm: Optional[float] = None
     average_corrosion_rate: Optional[float] = None
+    short_term_corrosion_rate: Optional[float] = None
+    long_term_corrosion_rate: Optional[float] = None
     remaining_life_years: Optional[float] = None
     risk_level: Optional[RiskLevelEnum] = None
 
@@ -67,7 +69,7 @@ class AnalysisResponse(BaseModel):
 class ForecastRequest(BaseModel):
     cml_id: str
     periods: int = Field(default=24, ge=1, le=120, description="Months to forecast")
-    model_type: str = Field(default="prophet", pattern="^(prophet|linear|arima)$")
+    model_type: str = Field(default="prophet", pattern="^(prophet|linear|arima|kalman)$")
     
 class ForecastPoint(BaseModel):
     date: date
@@ -81,8 +83,88 @@ class ForecastResponse(BaseModel):
     min_allowable: float
     forecast_points: List[ForecastPoint]
     estimated_failure_date: Optional[date] = None
+    earliest_failure_date: Optional[date] = None
+    latest_failure_date: Optional[date] = None
     confidence: float
     
+class FeatureContribution(BaseModel):
+    feature: str
+    impact: float
+
+class CMLExplanation(BaseModel):
+    cml_id: str
+    model_version: str
+    base_value: float
+    top_features: List[FeatureContribution]
+    explanation: str
+    shap_values: Optional[Dict[str, float]] = None
+
+class ExplanationBatchRequest(BaseModel):
+    cml_ids: List[str] = Field(..., min_length=1, max_length=5000)
+    top_k: int = Field(default=5, ge=1, le=50)
+    include_shap_values: bool = False
+
+class ExplanationBatchResponse(BaseModel):
+    explanations: List[CMLExplanation]
+    not_found: List[str]
+    
+class BatchForecastRequest(BaseModel):
+    cml_ids: Optional[List[str]] = None
+    facility: Optional[str] = None
+    periods: int = Field(default=24, ge=1, le=120, description="Months to forecast")
+    model_type: str = Field(default="prophet", pattern="^(prophet|arima)$")
+
+class FleetForecastRequest(BaseModel):
+    facility: Optional[str] = None
+    periods: int = Field(default=24, ge=1, le=120, description="Months to forecast")
+    include_points: bool = False
+
+class FleetForecastResult(BaseModel):
+    cml_id: str
+    corrosion_rate_mm_per_year: float
+    residual_std: float
+    estimated_failure_date: Optional[date] = None
+    forecast_points: Optional[List[ForecastPoint]] = None
+
+class FleetForecastResponse(BaseModel):
+    total_cmls: int
+    forecasted: int
+    skipped: List[str]
+    processing_time: float
+    results: List[FleetForecastResult]
+    
+class MeasurementCreate(BaseModel):
+    inspection_date: date
+    measured_thickness_mm: float = Field(..., gt=0)
+    technique: Optional[str] = None
+    inspector: Optional[str] = None
+    notes: Optional[str] = None
+
+class ThicknessStateResponse(BaseModel):
+    cml_id: str
+    thickness_mm: float
+    thickness_std: float
+    corrosion_rate_mm_per_year: float
+    corrosion_rate_std: float
+    last_measurement_date: date
+    measurements_applied: int
+    estimated_failure_date: Optional[date] = None
+
+class RemainingLifeResult(BaseModel):
+    cml_id: str
+    facility: Optional[str] = None
+    min_allowable: Optional[float] = None
+    corrosion_rate_mm_per_year: Optional[float] = None
+    earliest_failure_date: Optional[date] = None
+    estimated_failure_date: Optional[date] = None
+    latest_failure_date: Optional[date] = None
+
+class RemainingLifeResponse(BaseModel):
+    bound: str
+    before: Optional[date] = None
+    after: Optional[date] = None
+    results: List[RemainingLifeResult]
+    
 class SMEOverride(BaseModel):
     cml_id: str
     decision: str = Field(..., pattern="^(keep|eliminate)$")
@@ -96,6 +178,31 @@ class ReportRequest(BaseModel):
     include_forecasts: bool = True
     include_shap: bool = True
 
+class BatchReportRequest(BaseModel):
+    facilities: Optional[List[str]] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    include_forecasts: bool = True
+    include_shap: bool = True
+    output: str = Field(default="manifest", pattern="^(manifest|zip)$")
+
+class BatchReportEntry(BaseModel):
+    facility: str
+    job_id: str
+    cml_count: int
+    cached: bool
+    pages: Optional[int] = None
+    seconds: Optional[float] = None
+    download_url: str
+
+class BatchReportResponse(BaseModel):
+    total_facilities: int
+    rendered: int
+    cached: int
+    load_seconds: float
+    total_seconds: float
+    reports: List[BatchReportEntry]
+
 class UploadResponse(BaseModel):
     message: str
     total_rows: int
@@ -0,0 +1,31 @@
+from typing import Optional
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.db_models import CML
+
+# Change whenever a CML is added, removed, updated, re-predicted or overridden
+CML_VERSION_COLUMNS = (
+    func.count(CML.id),
+    func.max(CML.updated_at),
+    func.max(CML.ml_prediction_date),
+    func.max(CML.sme_timestamp)
+)
+
+def cml_version_statement(facility: Optional[str] = None) -> Select:
+    """One aggregate row describing the current state of the CML table (or one facility)"""
+    statement = select(*CML_VERSION_COLUMNS)
+    if facility:
+        statement = statement.where(CML.facility == facility)
+    return statement
+
+def _version(row) -> str:
+    return "|".join(str(value) for value in row)
+
+def cml_version(db: Session, facility: Optional[str] = None) -> str:
+    """Version string for keying cached results computed from the CML table"""
+    return _version(db.execute(cml_version_statement(facility)).one())
+
+async def cml_version_async(db: AsyncSession, facility: Optional[str] = None) -> str:
+    """cml_version for async sessions"""
+    return _version((await db.execute(cml_version_statement(facility))).one())
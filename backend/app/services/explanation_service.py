@@ -0,0 +1,226 @@
+import os
+import logging
+from threading import Lock
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.database import upsert
+from app.core.metrics import track_stage
+from app.models.db_models import CML, FeatureImportanceStats
+
+logger = logging.getLogger(__name__)
+
+# Explanations keyed by (cml_id, feature fingerprint, model version, top_k, include_shap_values)
+_explanation_cache = LRUCache(maxsize=settings.EXPLANATION_CACHE_SIZE)
+
+# Loaded model and SHAP explainer per model file, rebuilt when the file changes
+_explainers: Dict[str, Tuple[float, Any, Any]] = {}
+_explainers_lock = Lock()
+
+def _share_explainer_arrays(explainer, model_version: str):
+    """Move the SHAP tree and background arrays into shared memory-mapped files, if enabled"""
+    from app.core.shared_arrays import TREE_ARRAYS, prune_shared_arrays, share_attributes, sharing_enabled
+
+    if not sharing_enabled() or explainer.explainer is None:
+        return
+    try:
+        prefix = f"explainer-{model_version}"
+        shared = share_attributes(explainer.explainer.model, TREE_ARRAYS, prefix)
+        shared += share_attributes(explainer.explainer, ["data"], f"{prefix}-background")
+        prune_shared_arrays(keep_prefix=prefix)
+        logger.info(f"Shared {shared / 1024 / 1024:.1f} MB of explainer arrays for model version {model_version}")
+    except Exception as e:
+        logger.warning(f"Explainer arrays left in process memory: {e}")
+
+class ExplanationService:
+    """On-demand, cached SHAP explanations for individual CMLs"""
+
+    def __init__(self, model_path: str = None):
+        self.model_path = model_path or settings.MODEL_PATH
+
+    def _get_explainer(self):
+        """Get the elimination model and its explainer, initializing once per model version"""
+        from app.ml.model_elimination import CMLEliminationModel
+        from app.ml.explainability import ModelExplainer
+
+        if not os.path.exists(self.model_path):
+            raise ValueError("Model not trained or loaded")
+
+        mtime = os.path.getmtime(self.model_path)
+        with _explainers_lock:
+            entry = _explainers.get(self.model_path)
+            if entry is None or entry[0] != mtime:
+                model = CMLEliminationModel(model_path=self.model_path)
+                if model.model is None:
+                    raise ValueError("Model not trained or loaded")
+
+                explainer = ModelExplainer(model.model, model.preprocessor)
+                if model.background is not None:
+                    explainer.initialize(model.background['data'], weights=model.background['weights'])
+                else:
+                    explainer.initialize()
+                _share_explainer_arrays(explainer, model.model_version)
+                entry = (mtime, model, explainer)
+                _explainers[self.model_path] = entry
+                logger.info(f"Explainer initialized for model version {model.model_version}")
+
+        return entry[1], entry[2]
+
+    def explain(
+        self,
+        cmls: List[Any],
+        top_k: int = 5,
+        include_shap_values: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Explain predictions for CMLs, computing SHAP values only for cache misses
+
+        Args:
+            cmls: CML objects to explain
+            top_k: Number of top contributing features per CML
+            include_shap_values: Also return the full per-feature SHAP dict
+
+        Returns:
+            Dictionary mapping cml_id to its explanation
+        """
+        model, explainer = self._get_explainer()
+
+        with track_stage('preprocess'):
+            df = model.preprocessor.transform(cmls)
+        X = df[model.feature_columns]
+        fingerprints = pd.util.hash_pandas_object(X, index=False).to_numpy()
+
+        results = {}
+        misses = []
+        for i, cml in enumerate(cmls):
+            key = (cml.cml_id, int(fingerprints[i]), model.model_version, top_k, include_shap_values)
+            cached = _explanation_cache.get(key)
+            if cached is not None:
+                results[cml.cml_id] = cached
+            else:
+                misses.append(i)
+
+        if misses:
+            # Explain all cache misses in one vectorized SHAP call
+            with track_stage('shap_explain'):
+                explained = explainer.explain_prediction(
+                    X.iloc[misses], model.feature_columns,
+                    top_k=top_k, include_shap_values=include_shap_values
+                )
+            for i, explanation in zip(misses, explained.get('explanations', [])):
+                cml_id = cmls[i].cml_id
+                explanation = dict(explanation, cml_id=cml_id, model_version=model.model_version)
+                _explanation_cache.put(
+                    (cml_id, int(fingerprints[i]), model.model_version, top_k, include_shap_values),
+                    explanation
+                )
+                results[cml_id] = explanation
+
+        logger.info(f"Explained {len(cmls)} CMLs ({len(misses)} computed, {len(cmls) - len(misses)} cached)")
+        return results
+
+    def refresh_importance_stats(self, db: Session, facilities: Sequence[Optional[str]]) -> int:
+        """
+        Recompute fleet |SHAP| statistics for facilities, replacing their persisted slices
+
+        Each facility's slice is built from one random sample of its CMLs (at most
+        IMPORTANCE_SAMPLE_SIZE) and records the facility's CML count, which weights the
+        slice in fleet-wide importance. Run after an analyze pass, not from the
+        explanation endpoints.
+
+        Returns:
+            Number of CMLs explained
+        """
+        from app.ml.explainability import ImportanceAccumulator
+
+        model, explainer = self._get_explainer()
+        if explainer.explainer is None:
+            return 0
+
+        accumulator = ImportanceAccumulator(model.feature_columns, model.model_version)
+        for facility in set(facilities):
+            query = db.query(CML).filter(CML.facility == facility if facility is not None else CML.facility.is_(None))
+            sample = query.order_by(func.random()).limit(settings.IMPORTANCE_SAMPLE_SIZE).all()
+            if not sample:
+                continue
+            population = len(sample) if len(sample) < settings.IMPORTANCE_SAMPLE_SIZE else query.count()
+            with track_stage('preprocess'):
+                X = model.preprocessor.transform(sample)[model.feature_columns]
+            with track_stage('shap_explain'):
+                accumulator.update(explainer.shap_matrix(X), [facility or 'Unknown'] * len(sample))
+            accumulator.slices[facility or 'Unknown']['population'] = population
+
+        save_importance_stats(db, accumulator)
+        return sum(stats['count'] for stats in accumulator.slices.values())
+
+    @staticmethod
+    def cache_stats() -> Dict[str, int]:
+        """Get explanation cache statistics"""
+        return _explanation_cache.stats()
+
+
+def save_importance_stats(db: Session, accumulator):
+    """Replace the persisted per-facility slices with an accumulator's statistics, atomically per row"""
+    now = datetime.now()
+    upsert(
+        db,
+        FeatureImportanceStats.__table__,
+        [
+            {
+                'facility': facility,
+                'model_version': accumulator.model_version,
+                'feature_names': accumulator.feature_names,
+                'count': stats['count'],
+                'population': stats['population'],
+                'abs_sum': stats['abs_sum'].tolist(),
+                'abs_sum_sq': stats['abs_sum_sq'].tolist(),
+                'updated_at': now
+            }
+            for facility, stats in accumulator.slices.items()
+        ],
+        index_elements=['facility', 'model_version'],
+        update_columns=['feature_names', 'count', 'population', 'abs_sum', 'abs_sum_sq', 'updated_at']
+    )
+    db.commit()
+
+def load_importance_stats(db: Session, model_version: str = None):
+    """Load persisted |SHAP| statistics for a model version (latest when not given)"""
+    from app.ml.explainability import ImportanceAccumulator
+
+    if model_version is None:
+        latest = db.query(FeatureImportanceStats).order_by(
+            FeatureImportanceStats.updated_at.desc(), FeatureImportanceStats.id.desc()
+        ).first()
+        if latest is None:
+            return None
+        model_version = latest.model_version
+
+    rows = db.query(FeatureImportanceStats).filter(
+        FeatureImportanceStats.model_version == model_version
+    ).all()
+    if not rows:
+        return None
+
+    accumulator = ImportanceAccumulator(rows[0].feature_names, model_version)
+    for row in rows:
+        if row.feature_names == accumulator.feature_names:
+            accumulator.add_stats(row.facility, row.count, row.abs_sum, row.abs_sum_sq, population=row.population)
+    return accumulator
+
+def refresh_importance_stats_task(facilities: Sequence[Optional[str]]):
+    """Refresh importance statistics in a session of its own, e.g. as a background task after analyze"""
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        with track_stage('importance_stats'):
+            explained = ExplanationService().refresh_importance_stats(db, facilities)
+        logger.info(f"Feature importance statistics refreshed from {explained} CMLs")
+    except Exception as e:
+        logger.warning(f"Feature importance statistics not refreshed: {e}")
+    finally:
+        db.close()
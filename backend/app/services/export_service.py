@@ -0,0 +1,152 @@
+import csv
+import io
+import logging
+import os
+import tempfile
+from typing import Any, Iterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.db_models import CML
+
+logger = logging.getLogger(__name__)
+
+# Export layout: (header, CML column)
+EXPORT_COLUMNS = [
+    ('CML ID', CML.cml_id),
+    ('Facility', CML.facility),
+    ('System', CML.system),
+    ('Commodity', CML.commodity),
+    ('Material', CML.material_type),
+    ('Feature Type', CML.feature_type),
+    ('Current Thickness (mm)', CML.current_thickness_mm),
+    ('Min Allowable (mm)', CML.min_allowable_thickness_mm),
+    ('Corrosion Rate (mm/yr)', CML.average_corrosion_rate),
+    ('Remaining Life (years)', CML.remaining_life_years),
+    ('Risk Level', CML.risk_level),
+    ('Elimination Candidate', CML.elimination_candidate),
+    ('ML Probability', CML.ml_elimination_probability),
+    ('ML Confidence', CML.ml_confidence),
+    ('SME Override', CML.sme_override),
+    ('SME Decision', CML.sme_decision),
+    ('Last Inspection', CML.last_inspection_date)
+]
+EXPORT_HEADERS = [header for header, _ in EXPORT_COLUMNS]
+
+_RISK = EXPORT_HEADERS.index('Risk Level')
+_YES_NO = [EXPORT_HEADERS.index('Elimination Candidate'), EXPORT_HEADERS.index('SME Override')]
+
+def iter_export_chunks(db: Session, facility: Optional[str] = None, chunk_size: Optional[int] = None) -> Iterator[List[List[Any]]]:
+    """
+    Read export rows in chunks from a server-side cursor
+
+    Yields:
+        Lists of export rows (values in EXPORT_HEADERS order), at most chunk_size long
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    statement = select(*[column for _, column in EXPORT_COLUMNS]).order_by(CML.id)
+    if facility:
+        statement = statement.where(CML.facility == facility)
+
+    result = db.execute(statement.execution_options(stream_results=True, yield_per=chunk_size))
+    for partition in result.partitions():
+        rows = []
+        for row in partition:
+            row = list(row)
+            row[_RISK] = row[_RISK].value if row[_RISK] else None
+            for i in _YES_NO:
+                row[i] = 'Yes' if row[i] else 'No'
+            rows.append(row)
+        yield rows
+
+def stream_csv(db: Session, facility: Optional[str] = None) -> Iterator[bytes]:
+    """CSV export, yielded one encoded chunk per cursor partition"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+
+    for rows in iter_export_chunks(db, facility):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Header only, when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose written bytes are drained by the streaming generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_parquet(db: Session, facility: Optional[str] = None) -> Iterator[bytes]:
+    """Parquet export, one row group per cursor partition, yielded as each is written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (header, pa.float64() if _is_float(column) else pa.date32() if header == 'Last Inspection' else pa.string())
+        for header, column in EXPORT_COLUMNS
+    ])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in iter_export_chunks(db, facility):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def _is_float(column) -> bool:
+    return column.type.python_type is float
+
+def write_xlsx(db: Session, facility: Optional[str] = None) -> str:
+    """
+    Write the export to a temporary xlsx file with a write-only workbook
+
+    Rows go straight from the cursor to the workbook's on-disk sheet, so memory stays
+    flat with fleet size. The caller owns (and removes) the returned file.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('CML Data')
+    sheet.append(EXPORT_HEADERS)
+
+    count = 0
+    for rows in iter_export_chunks(db, facility):
+        for row in rows:
+            sheet.append(row)
+        count += len(rows)
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='cml_export_')
+    os.close(fd)
+    workbook.save(path)
+
+    logger.info(f"Excel export written for {count} CMLs")
+    return path
@@ -0,0 +1,140 @@
+import hashlib
+import logging
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import delete, event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.database import upsert
+from app.models.db_models import CML, Measurement, ForecastCacheEntry
+from app.services.remaining_life import IN_CHUNK_SIZE
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_STALE_KEY = 'forecast_cache_stale'
+
+def _forget(key: str, entry: Tuple[int, Dict[str, Any]]):
+    """Drop an evicted key from its CML's key set"""
+    cml_pk = entry[0]
+    with _keys_lock:
+        keys = _keys_by_cml.get(cml_pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del _keys_by_cml[cml_pk]
+
+# In-process tier, backed by the forecast_cache table: key -> (cml pk, payload)
+_memory = LRUCache(maxsize=settings.FORECAST_CACHE_SIZE, on_evict=_forget)
+_keys_by_cml: Dict[int, Set[str]] = {}
+_keys_lock = Lock()
+
+def forecast_cache_key(history: 'pd.DataFrame', model_type: str, periods: int) -> str:
+    """Key a forecast by its input history, model type, horizon and forecasting code version"""
+    from app.ml.model_forecast import FORECAST_CODE_VERSION
+
+    digest = hashlib.sha256()
+    digest.update(history['ds'].to_numpy(dtype='datetime64[D]').astype('int64').tobytes())
+    digest.update(history['y'].to_numpy(dtype=float).tobytes())
+    digest.update(f"|{model_type}|{periods}|{FORECAST_CODE_VERSION}".encode())
+    return digest.hexdigest()
+
+class ForecastCache:
+    """Two-tier (memory LRU + database) cache of forecast results"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, cml_pk: int, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached forecast payload, promoting database hits into memory"""
+        entry = _memory.get(key)
+        if entry is not None:
+            return entry[1]
+
+        entry = self.db.query(ForecastCacheEntry).filter(ForecastCacheEntry.cache_key == key).first()
+        if entry is None:
+            return None
+
+        self._remember(cml_pk, key, entry.payload)
+        return entry.payload
+
+    def put(self, cml_pk: int, key: str, model_type: str, periods: int, payload: Dict[str, Any]):
+        """Store a forecast payload in both tiers"""
+        self._remember(cml_pk, key, payload)
+
+        # Concurrent requests may compute the same forecast; the key is content-addressed,
+        # so whichever write lands last stores an identical payload
+        upsert(
+            self.db,
+            ForecastCacheEntry.__table__,
+            [{
+                'cache_key': key,
+                'cml_id': cml_pk,
+                'model_type': model_type,
+                'periods': periods,
+                'payload': payload
+            }],
+            index_elements=['cache_key'],
+            update_columns=['payload']
+        )
+
+    @staticmethod
+    def _remember(cml_pk: int, key: str, payload: Dict[str, Any]):
+        # Registered before it enters the LRU, so an eviction always finds the key to forget
+        with _keys_lock:
+            _keys_by_cml.setdefault(cml_pk, set()).add(key)
+        _memory.put(key, (cml_pk, payload))
+
+    @staticmethod
+    def invalidate(cml_pks: Sequence[int], connection=None):
+        """Drop all cached forecasts for CMLs (memory tier, and database tier when a connection is given)"""
+        with _keys_lock:
+            keys = [key for cml_pk in cml_pks for key in _keys_by_cml.pop(cml_pk, ())]
+        for key in keys:
+            _memory.pop(key)
+
+        if connection is not None:
+            cml_pks = list(cml_pks)
+            for i in range(0, len(cml_pks), IN_CHUNK_SIZE):
+                chunk = cml_pks[i:i + IN_CHUNK_SIZE]
+                connection.execute(delete(ForecastCacheEntry).where(ForecastCacheEntry.cml_id.in_(chunk)))
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        """Get memory tier statistics"""
+        return _memory.stats()
+
+def payload_from_points(forecast_points: List[Any], model_used: str) -> Dict[str, Any]:
+    """Build a JSON-serializable cache payload from forecast points"""
+    return {
+        'model_used': model_used,
+        'points': [p.model_dump(mode='json') for p in forecast_points]
+    }
+
+# Keys already include the history hash, so stale entries are never served;
+# invalidation frees them as soon as new measurements arrive.
+def _mark_stale(target, cml_pk: int):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_STALE_KEY, set()).add(cml_pk)
+
+@event.listens_for(CML, "after_update")
+def _invalidate_on_history_change(mapper, connection, target):
+    state = inspect(target)
+    if (state.attrs.inspection_history_dates.history.has_changes()
+            or state.attrs.inspection_history_measurements.history.has_changes()):
+        _mark_stale(target, target.id)
+
+@event.listens_for(Measurement, "after_insert")
+def _invalidate_on_new_measurement(mapper, connection, target):
+    _mark_stale(target, target.cml_id)
+
+# CMLs touched by a flush are invalidated together at its end, a chunk of keys per DELETE
+@event.listens_for(Session, "after_flush_postexec")
+def _invalidate_stale(session, flush_context):
+    stale = session.info.pop(_STALE_KEY, None)
+    if stale:
+        ForecastCache.invalidate(sorted(stale), session.connection())
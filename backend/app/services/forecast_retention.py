@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import logging
+from sqlalchemy import and_, delete, exists, func, or_, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.db_models import Forecast, ForecastRun
+
+logger = logging.getLogger(__name__)
+
+def compact_forecast_runs(
+    db: Session,
+    keep_runs: Optional[int] = None,
+    max_age_days: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Delete superseded forecast runs and their points
+
+    The newest `keep_runs` runs per CML are kept; older ones are dropped, as are runs older
+    than `max_age_days` unless they are the CML's latest. Legacy points written before runs
+    existed are dropped for CMLs that now have a run.
+
+    Returns:
+        Counts of deleted runs, run points and legacy points
+    """
+    keep_runs = keep_runs if keep_runs is not None else settings.FORECAST_RUNS_TO_KEEP
+    max_age_days = max_age_days if max_age_days is not None else settings.FORECAST_RUN_MAX_AGE_DAYS
+
+    ranked = select(
+        ForecastRun.id,
+        ForecastRun.created_at,
+        func.row_number().over(
+            partition_by=ForecastRun.cml_id,
+            order_by=ForecastRun.id.desc()
+        ).label('run_rank')
+    ).subquery()
+
+    condition = ranked.c.run_rank > keep_runs
+    if max_age_days:
+        cutoff = datetime.now() - timedelta(days=max_age_days)
+        condition = or_(condition, and_(ranked.c.run_rank > 1, ranked.c.created_at < cutoff))
+    stale_runs = select(ranked.c.id).where(condition)
+
+    run_points = db.execute(
+        delete(Forecast).where(Forecast.run_id.in_(stale_runs)).execution_options(synchronize_session=False)
+    ).rowcount
+    runs = db.execute(
+        delete(ForecastRun).where(ForecastRun.id.in_(stale_runs)).execution_options(synchronize_session=False)
+    ).rowcount
+    legacy_points = db.execute(
+        delete(Forecast).where(
+            Forecast.run_id.is_(None),
+            exists().where(ForecastRun.cml_id == Forecast.cml_id)
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+
+    db.commit()
+
+    result = {'runs': runs, 'run_points': run_points, 'legacy_points': legacy_points}
+    logger.info(f"Compacted forecast runs: {result}")
+    return result
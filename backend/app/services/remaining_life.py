@@ -0,0 +1,194 @@
+import logging
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session
+from app.models.db_models import CML, RemainingLife
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Keys per statement for IN lists, well under SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+_STALE_KEY = 'remaining_life_stale'
+
+BOUND_COLUMNS = {
+    'earliest': RemainingLife.earliest_date,
+    'expected': RemainingLife.expected_date,
+    'latest': RemainingLife.latest_date
+}
+
+def compute_remaining_life(
+    cml_pks: Sequence[int],
+    min_allowable: Sequence[float],
+    dates: Sequence[str],
+    measurements: Sequence[str]
+) -> 'pd.DataFrame':
+    """
+    Solve earliest/expected/latest minimum-thickness dates for many CMLs in one pass
+
+    Returns:
+        DataFrame with one row per CML with usable history: cml_id (as passed in), n_points,
+        corrosion_rate_mm_per_year and earliest/expected/latest_date (datetime64, NaT if never)
+    """
+    import pandas as pd
+    from app.ml.fleet_forecast import pack_histories, FleetLinearForecaster
+
+    packed = pack_histories(dates, measurements)
+    model = FleetLinearForecaster().fit(packed)
+    valid = packed['valid']
+
+    min_allowable = np.array([m if m is not None else np.nan for m in min_allowable], dtype=float)
+    bounds = model.crossing_bounds(min_allowable[valid])
+
+    return pd.DataFrame({
+        'cml_id': np.asarray(cml_pks)[valid],
+        'n_points': model.n_points,
+        'corrosion_rate_mm_per_year': model.corrosion_rate_per_year(),
+        'earliest_date': bounds['earliest'],
+        'expected_date': bounds['expected'],
+        'latest_date': bounds['latest']
+    })
+
+def refresh_remaining_life(db: Session, facility: Optional[str] = None, cml_ids: Optional[List[str]] = None) -> int:
+    """
+    Recompute and bulk-store the remaining-life rows for a set of CMLs (all when unfiltered)
+
+    Returns:
+        Number of CMLs with a stored remaining-life row
+    """
+    query = db.query(
+        CML.id,
+        CML.min_allowable_thickness_mm,
+        CML.inspection_history_dates,
+        CML.inspection_history_measurements
+    )
+    if facility:
+        query = query.filter(CML.facility == facility)
+    if cml_ids:
+        rows = []
+        for i in range(0, len(cml_ids), IN_CHUNK_SIZE):
+            rows.extend(query.filter(CML.cml_id.in_(cml_ids[i:i + IN_CHUNK_SIZE])).all())
+    else:
+        rows = query.all()
+    if not rows:
+        return 0
+
+    cml_pks, min_allowable, dates, measurements = zip(*rows)
+    result = compute_remaining_life(cml_pks, min_allowable, dates, measurements)
+
+    if cml_ids:
+        _delete_rows(db, cml_pks)
+    elif facility:
+        db.execute(delete(RemainingLife).where(
+            RemainingLife.cml_id.in_(select(CML.id).where(CML.facility == facility))
+        ))
+    else:
+        db.execute(delete(RemainingLife))
+    if len(result):
+        db.execute(insert(RemainingLife), _to_records(result))
+    db.commit()
+
+    logger.info(f"Remaining life refreshed for {len(result)} of {len(rows)} CMLs")
+    return len(result)
+
+def _delete_rows(bind, cml_pks: Sequence[int]):
+    """Delete the remaining-life rows of CMLs, a chunk of keys per statement"""
+    for i in range(0, len(cml_pks), IN_CHUNK_SIZE):
+        bind.execute(delete(RemainingLife).where(RemainingLife.cml_id.in_(cml_pks[i:i + IN_CHUNK_SIZE])))
+
+def _to_records(result: 'pd.DataFrame') -> List[Dict]:
+    """Convert computed remaining-life rows to insert parameters"""
+    records = []
+    for row in result.itertuples(index=False):
+        records.append({
+            'cml_id': int(row.cml_id),
+            'n_points': int(row.n_points),
+            'corrosion_rate_mm_per_year': float(row.corrosion_rate_mm_per_year),
+            'earliest_date': _to_date(row.earliest_date),
+            'expected_date': _to_date(row.expected_date),
+            'latest_date': _to_date(row.latest_date),
+            'computed_at': datetime.now()
+        })
+    return records
+
+def _to_date(value) -> Optional[date]:
+    import pandas as pd
+
+    # Via NumPy: crossings centuries out are valid dates but outside pandas' Timestamp range
+    return None if pd.isna(value) else pd.Timestamp(value).to_datetime64().astype('datetime64[D]').astype(object)
+
+def get_remaining_life(db: Session, cml: CML) -> Optional[RemainingLife]:
+    """Get a CML's remaining-life row, computing it if missing"""
+    row = db.query(RemainingLife).filter(RemainingLife.cml_id == cml.id).first()
+    if row is None:
+        refresh_remaining_life(db, cml_ids=[cml.cml_id])
+        row = db.query(RemainingLife).filter(RemainingLife.cml_id == cml.id).first()
+    return row
+
+def query_remaining_life(
+    db: Session,
+    before: Optional[date] = None,
+    after: Optional[date] = None,
+    bound: str = 'expected',
+    facility: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List[tuple]:
+    """
+    Range query over the remaining-life index
+
+    Returns:
+        (CML, RemainingLife) pairs whose chosen bound date falls in [after, before),
+        soonest first
+    """
+    column = BOUND_COLUMNS[bound]
+    query = db.query(CML, RemainingLife).join(RemainingLife, RemainingLife.cml_id == CML.id)
+    query = query.filter(column.isnot(None))
+    if before:
+        query = query.filter(column < before)
+    if after:
+        query = query.filter(column >= after)
+    if facility:
+        query = query.filter(CML.facility == facility)
+    return query.order_by(column, CML.cml_id).offset(skip).limit(limit).all()
+
+# Rows computed from an old history would be wrong, so CMLs whose history changes are
+# recomputed together at the end of the flush, in the same transaction
+@event.listens_for(CML, "after_update")
+def _invalidate_on_history_change(mapper, connection, target):
+    state = inspect(target)
+    if (state.session is not None and (
+            state.attrs.inspection_history_dates.history.has_changes()
+            or state.attrs.inspection_history_measurements.history.has_changes()
+            or state.attrs.min_allowable_thickness_mm.history.has_changes())):
+        state.session.info.setdefault(_STALE_KEY, {})[target.id] = target
+
+@event.listens_for(Session, "after_flush_postexec")
+def _recompute_stale(session, flush_context):
+    stale = session.info.pop(_STALE_KEY, None)
+    if not stale:
+        return
+
+    cmls = list(stale.values())
+    cml_pks = [cml.id for cml in cmls]
+    try:
+        records = _to_records(compute_remaining_life(
+            cml_pks,
+            [cml.min_allowable_thickness_mm for cml in cmls],
+            [cml.inspection_history_dates for cml in cmls],
+            [cml.inspection_history_measurements for cml in cmls]
+        ))
+    except Exception as e:
+        # Dropped rows are recomputed on the next read or refresh
+        logger.warning(f"Remaining life not recomputed for {len(cmls)} updated CMLs: {e}")
+        records = []
+
+    connection = session.connection()
+    _delete_rows(connection, cml_pks)
+    if records:
+        connection.execute(insert(RemainingLife), records)
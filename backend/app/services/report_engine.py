@@ -0,0 +1,419 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import schemas
+from app.models.db_models import CML, RemainingLife
+
+logger = logging.getLogger(__name__)
+
+TOP_IMPORTANCE_FEATURES = 10
+TOP_CML_DRIVERS = 3
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = Lock()
+_styles: Optional[Dict[str, Any]] = None
+
+def load_report_data(
+    db: Session,
+    request: schemas.ReportRequest,
+    facilities: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Fetch everything a report needs in bulk: CMLs with their precomputed remaining-life
+    dates in one joined query, per-facility SHAP importance in one more, and the top SHAP
+    drivers of the elimination candidates from the explanation service
+
+    Args:
+        facilities: Restrict to these facilities (in addition to request.facility)
+
+    Returns:
+        Dictionary with 'facilities' (facility -> list of plain row dicts, picklable for
+        worker processes) and 'importance' (facility -> [(feature, importance), ...])
+    """
+    from app.services.report_jobs import report_query
+    from app.services.explanation_service import load_importance_stats
+
+    query = report_query(db, request).outerjoin(RemainingLife, RemainingLife.cml_id == CML.id).with_entities(
+        CML.cml_id,
+        CML.facility,
+        CML.system,
+        CML.risk_level,
+        CML.current_thickness_mm,
+        CML.min_allowable_thickness_mm,
+        CML.average_corrosion_rate,
+        CML.remaining_life_years,
+        CML.elimination_candidate,
+        CML.requires_engineering_review,
+        CML.ml_confidence,
+        RemainingLife.earliest_date,
+        RemainingLife.expected_date,
+        RemainingLife.latest_date
+    ).order_by(CML.facility, CML.cml_id)
+    if facilities:
+        query = query.filter(CML.facility.in_(facilities))
+
+    drivers = _candidate_drivers(db, request, facilities) if request.include_shap else {}
+
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for row in query:
+        data = row._asdict()
+        data['risk_level'] = row.risk_level.value if row.risk_level else None
+        data['drivers'] = drivers.get(row.cml_id)
+        grouped.setdefault(row.facility or 'Unassigned', []).append(data)
+
+    importance = {}
+    if request.include_shap:
+        accumulator = load_importance_stats(db)
+        if accumulator is not None:
+            for facility in grouped:
+                if facility not in accumulator.slices:
+                    continue
+                features = accumulator.importance(facility)['features']
+                ranked = sorted(features.items(), key=lambda item: item[1]['importance'], reverse=True)
+                importance[facility] = [(name, stats['importance']) for name, stats in ranked[:TOP_IMPORTANCE_FEATURES]]
+
+    return {'facilities': grouped, 'importance': importance}
+
+def _candidate_drivers(
+    db: Session,
+    request: schemas.ReportRequest,
+    facilities: Optional[List[str]] = None
+) -> Dict[str, List[Tuple[str, float]]]:
+    """Top SHAP drivers (feature, impact) of every elimination candidate a report covers"""
+    from app.services.report_jobs import report_query
+    from app.services.explanation_service import ExplanationService
+
+    query = report_query(db, request).filter(CML.elimination_candidate.is_(True))
+    if facilities:
+        query = query.filter(CML.facility.in_(facilities))
+    cmls = query.all()
+    if not cmls:
+        return {}
+
+    try:
+        explanations = ExplanationService().explain(cmls, top_k=TOP_CML_DRIVERS)
+    except ValueError as e:
+        logger.info(f"Report without per-CML drivers: {e}")
+        return {}
+    return {
+        cml_id: [(f['feature'], f['impact']) for f in explanation['top_features']]
+        for cml_id, explanation in explanations.items()
+    }
+
+def _get_styles() -> Dict[str, Any]:
+    """Paragraph and table styles, built once per process"""
+    global _styles
+    if _styles is None:
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.platypus import TableStyle
+
+        sample = getSampleStyleSheet()
+        _styles = {
+            'title': ParagraphStyle(
+                'CustomTitle',
+                parent=sample['Heading1'],
+                fontSize=24,
+                textColor=colors.HexColor('#667eea'),
+                spaceAfter=30,
+                alignment=TA_CENTER
+            ),
+            'heading': sample['Heading2'],
+            'subheading': sample['Heading3'],
+            'normal': sample['Normal'],
+            'summary_table': TableStyle([
+                ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
+                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 12),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ]),
+            'data_table': TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 9),
+                ('FONTSIZE', (0, 1), (-1, -1), 8),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+            ])
+        }
+    return _styles
+
+def _document(path: str):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate
+
+    return SimpleDocTemplate(
+        path,
+        pagesize=letter,
+        rightMargin=0.75*inch,
+        leftMargin=0.75*inch,
+        topMargin=1*inch,
+        bottomMargin=0.75*inch
+    )
+
+def _long_table(rows: List[List[Any]], col_widths: List[float]):
+    """Full-length table split across pages with its header row repeated"""
+    from reportlab.platypus import LongTable
+
+    table = LongTable(rows, colWidths=col_widths, repeatRows=1)
+    table.setStyle(_get_styles()['data_table'])
+    return table
+
+def _format(value, spec: str = '.1f', default: str = 'N/A') -> str:
+    if value is None:
+        return default
+    return format(value, spec)
+
+def render_cover(summary: Dict[str, Any], path: str) -> int:
+    """Render the report cover (executive summary and recommendations); returns its page count"""
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, Spacer, Table, PageBreak
+
+    styles = _get_styles()
+    story = [
+        Paragraph("CML Optimization Analysis Report", styles['title']),
+        Paragraph(f"Generated: {summary['generated']}", styles['normal']),
+        Spacer(1, 0.3*inch),
+        Paragraph("Executive Summary", styles['heading'])
+    ]
+
+    summary_table = Table([
+        ['Total CMLs', str(summary['total'])],
+        ['Facilities', str(summary['facilities'])],
+        ['Elimination Candidates', str(summary['eliminations'])],
+        ['Critical Risk CMLs', str(summary['critical'])],
+        ['Potential Cost Savings', f"${summary['eliminations'] * 1500:,.0f}"],
+    ], colWidths=[3*inch, 2*inch])
+    summary_table.setStyle(styles['summary_table'])
+    story += [summary_table, Spacer(1, 0.3*inch), PageBreak(), Paragraph("Recommendations", styles['heading'])]
+
+    recommendations = [
+        "1. Prioritize elimination of low-risk CMLs with high remaining life",
+        "2. Conduct engineering review for CMLs flagged for review",
+        "3. Monitor critical risk CMLs with enhanced inspection frequency",
+        "4. Implement SME override process for final approval",
+        "5. Schedule re-analysis annually or after major process changes"
+    ]
+    for rec in recommendations:
+        story += [Paragraph(rec, styles['normal']), Spacer(1, 0.1*inch)]
+
+    doc = _document(path)
+    doc.build(story)
+    return doc.page
+
+def render_facility_section(
+    facility: str,
+    rows: List[Dict[str, Any]],
+    importance: Optional[List[tuple]],
+    path: str,
+    include_forecasts: bool = True,
+    include_shap: bool = True
+) -> int:
+    """Render one facility's section to its own PDF; returns its page count"""
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, Spacer, Table, PageBreak
+
+    styles = _get_styles()
+    candidates = [r for r in rows if r['elimination_candidate']]
+    critical = sum(1 for r in rows if r['risk_level'] == 'Critical')
+
+    story = [Paragraph(f"Facility: {facility}", styles['heading'])]
+    summary_table = Table([
+        ['CMLs', str(len(rows))],
+        ['Elimination Candidates', str(len(candidates))],
+        ['Critical Risk CMLs', str(critical)],
+        ['Requires Engineering Review', str(sum(1 for r in rows if r['requires_engineering_review']))]
+    ], colWidths=[3*inch, 2*inch])
+    summary_table.setStyle(styles['summary_table'])
+    story += [summary_table, Spacer(1, 0.2*inch), Paragraph("Elimination Candidates", styles['subheading'])]
+
+    if candidates:
+        table_data = [['CML ID', 'System', 'Risk', 'Remaining Life (yrs)', 'Confidence']]
+        for r in candidates:
+            table_data.append([
+                r['cml_id'],
+                r['system'] or 'N/A',
+                r['risk_level'] or 'N/A',
+                _format(r['remaining_life_years']),
+                f"{r['ml_confidence']*100:.0f}%" if r['ml_confidence'] else 'N/A'
+            ])
+        story.append(_long_table(table_data, [1.4*inch, 1.2*inch, 1*inch, 1.4*inch, 1*inch]))
+    else:
+        story.append(Paragraph("No elimination candidates identified.", styles['normal']))
+
+    if include_forecasts:
+        forecasted = [r for r in rows if r['expected_date'] or r['earliest_date']]
+        story += [PageBreak(), Paragraph("Minimum Thickness Forecast", styles['subheading'])]
+        if forecasted:
+            forecasted.sort(key=lambda r: r['earliest_date'] or r['expected_date'])
+            table_data = [['CML ID', 'Current (mm)', 'Min (mm)', 'Rate (mm/yr)', 'Earliest', 'Expected', 'Latest']]
+            for r in forecasted:
+                table_data.append([
+                    r['cml_id'],
+                    _format(r['current_thickness_mm'], '.2f'),
+                    _format(r['min_allowable_thickness_mm'], '.2f'),
+                    _format(r['average_corrosion_rate'], '.3f'),
+                    _format(r['earliest_date'], ''),
+                    _format(r['expected_date'], ''),
+                    _format(r['latest_date'], '', default='Not reached')
+                ])
+            story.append(_long_table(table_data, [1.2*inch, 0.9*inch, 0.8*inch, 0.9*inch, 0.9*inch, 0.9*inch, 0.9*inch]))
+        else:
+            story.append(Paragraph("No remaining-life forecasts available.", styles['normal']))
+
+    if include_shap:
+        story += [Spacer(1, 0.2*inch), Paragraph("Elimination Model Drivers (mean |SHAP|)", styles['subheading'])]
+        if importance:
+            table_data = [['Feature', 'Importance']] + [[name, f"{value:.4f}"] for name, value in importance]
+            story.append(_long_table(table_data, [3*inch, 1.5*inch]))
+        else:
+            story.append(Paragraph("No SHAP statistics recorded for this facility.", styles['normal']))
+
+        explained = [r for r in candidates if r['drivers']]
+        if explained:
+            table_data = [['CML ID', 'Top Drivers']]
+            for r in explained:
+                table_data.append([
+                    r['cml_id'],
+                    ', '.join(f"{name} ({value:+.3f})" for name, value in r['drivers'])
+                ])
+            story += [Spacer(1, 0.2*inch), _long_table(table_data, [1.4*inch, 5.4*inch])]
+
+    doc = _document(path)
+    doc.build(story)
+    return doc.page
+
+def _render_section_task(args: tuple) -> int:
+    return render_facility_section(*args)
+
+def _init_render_worker():
+    # Styles are built once per worker and shared by every section it renders
+    _get_styles()
+
+def _get_executor() -> ProcessPoolExecutor:
+    # Report jobs run on several threads; the first ones must not each start a pool
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.REPORT_WORKERS, initializer=_init_render_worker)
+        return _executor
+
+def shutdown_render_workers():
+    """Stop the section rendering pool"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def build_report(
+    data: Dict[str, Any],
+    output_path: str,
+    include_forecasts: bool = True,
+    include_shap: bool = True,
+    parallel: bool = True
+) -> Dict[str, Any]:
+    """
+    Render a full report: cover plus one section per facility, sections in parallel
+    processes, merged into output_path
+
+    Returns:
+        Dictionary with 'pages', 'sections' and 'seconds'
+    """
+    from pypdf import PdfWriter
+
+    start_time = time.time()
+    facilities = data['facilities']
+    all_rows = [r for rows in facilities.values() for r in rows]
+
+    workdir = tempfile.mkdtemp(prefix='cml_report_')
+    try:
+        cover_path = os.path.join(workdir, 'cover.pdf')
+        tasks = [
+            (facility, rows, data['importance'].get(facility), os.path.join(workdir, f"section_{i}.pdf"),
+             include_forecasts, include_shap)
+            for i, (facility, rows) in enumerate(facilities.items())
+        ]
+
+        if parallel and len(tasks) > 1:
+            pages = _get_executor().map(_render_section_task, tasks)
+        else:
+            pages = map(_render_section_task, tasks)
+
+        # The cover renders here while the workers take the sections
+        cover_pages = render_cover({
+            'generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'total': len(all_rows),
+            'facilities': len(facilities),
+            'eliminations': sum(1 for r in all_rows if r['elimination_candidate']),
+            'critical': sum(1 for r in all_rows if r['risk_level'] == 'Critical')
+        }, cover_path)
+        total_pages = cover_pages + sum(pages)
+
+        writer = PdfWriter()
+        for path in [cover_path] + [task[3] for task in tasks]:
+            writer.append(path)
+        with open(output_path, 'wb') as f:
+            writer.write(f)
+        writer.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    elapsed = time.time() - start_time
+    logger.info(f"PDF report built: {total_pages} pages, {len(tasks)} facility sections in {elapsed:.2f}s")
+    return {'pages': total_pages, 'sections': len(tasks), 'seconds': elapsed}
+
+def _render_facility_report(args: tuple) -> Dict[str, Any]:
+    facility, rows, importance, path, include_forecasts, include_shap = args
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    stats = build_report(
+        {'facilities': {facility: rows}, 'importance': {facility: importance} if importance else {}},
+        tmp_path,
+        include_forecasts=include_forecasts,
+        include_shap=include_shap,
+        parallel=False
+    )
+    os.replace(tmp_path, path)
+    return stats
+
+def render_facility_reports(
+    data: Dict[str, Any],
+    paths: Dict[str, str],
+    include_forecasts: bool = True,
+    include_shap: bool = True
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Render one complete report per facility in the worker pool
+
+    Args:
+        data: Report data from load_report_data
+        paths: Output path per facility to render; facilities not listed are skipped
+
+    Yields:
+        (facility, stats) as each report finishes, stats as returned by build_report
+    """
+    executor = _get_executor()
+    futures = {
+        executor.submit(_render_facility_report, (
+            facility, data['facilities'][facility], data['importance'].get(facility), path,
+            include_forecasts, include_shap
+        )): facility
+        for facility, path in paths.items()
+    }
+    for future in as_completed(futures):
+        yield futures[future], future.result()
@@ -0,0 +1,369 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session, Query
+from app.core.config import settings
+from app.core.metrics import track_stage
+from app.models import schemas
+from app.models.db_models import CML, FeatureImportanceStats, RemainingLife
+from app.services.data_version import CML_VERSION_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Bump when the report layout changes so cached PDFs are regenerated
+REPORT_FORMAT_VERSION = "2"
+
+_executor: Optional[ThreadPoolExecutor] = None
+_jobs: Dict[str, Dict[str, Any]] = {}
+_jobs_lock = Lock()
+
+def report_query(db: Session, request: schemas.ReportRequest) -> Query:
+    """CMLs covered by a report request"""
+    query = db.query(CML)
+    if request.facility:
+        query = query.filter(CML.facility == request.facility)
+    if request.start_date:
+        query = query.filter(CML.last_inspection_date >= request.start_date)
+    if request.end_date:
+        query = query.filter(CML.last_inspection_date <= request.end_date)
+    return query
+
+_VERSION_COLUMNS = CML_VERSION_COLUMNS
+
+# Remaining-life rows are recomputed apart from their CML, so forecast tables version them too
+_REMAINING_LIFE_COLUMNS = (func.count(RemainingLife.id), func.max(RemainingLife.computed_at))
+
+def _version_query(query: Query, request) -> Query:
+    columns = list(_VERSION_COLUMNS)
+    if request.include_forecasts:
+        query = query.outerjoin(RemainingLife, RemainingLife.cml_id == CML.id)
+        columns += _REMAINING_LIFE_COLUMNS
+    return query.with_entities(*columns)
+
+def _extra_version(db: Session, request) -> str:
+    """Version of the fleet-wide (not per-CML) data a report includes"""
+    if request.include_shap:
+        return f"|{db.query(func.max(FeatureImportanceStats.updated_at)).scalar()}"
+    return ""
+
+def _version_string(values: tuple, extra: str) -> str:
+    return "|".join(str(value) for value in values) + extra
+
+def data_version(db: Session, request: schemas.ReportRequest) -> Optional[str]:
+    """Version of the data behind a report: changes whenever a covered CML is added, removed or updated"""
+    values = _version_query(report_query(db, request), request).one()
+    if not values[0]:
+        return None
+    return _version_string(tuple(values), _extra_version(db, request))
+
+def facility_versions(
+    db: Session,
+    request: schemas.ReportRequest,
+    facilities: Optional[List[str]] = None
+) -> Dict[str, Tuple[int, str]]:
+    """
+    Data versions for every facility's report in one grouped query
+
+    Returns:
+        Dictionary of facility -> (CML count, data version), matching data_version for the
+        same request restricted to that facility
+    """
+    query = report_query(db, request).filter(CML.facility.isnot(None))
+    if facilities:
+        query = query.filter(CML.facility.in_(facilities))
+    query = _version_query(query, request)
+    rows = query.add_columns(CML.facility).group_by(CML.facility).order_by(CML.facility)
+    extra = _extra_version(db, request)
+
+    return {
+        row[-1]: (row[0], _version_string(tuple(row[:-1]), extra))
+        for row in rows
+    }
+
+def report_key(request: schemas.ReportRequest, version: str) -> str:
+    """Content address of a report: the request, its data version and the report format version"""
+    payload = json.dumps(request.model_dump(mode='json'), sort_keys=True)
+    digest = hashlib.sha256(f"{payload}|{version}|{REPORT_FORMAT_VERSION}".encode())
+    return digest.hexdigest()
+
+def report_path(key: str) -> str:
+    return os.path.join(settings.REPORT_OUTPUT_DIR, f"{key}.pdf")
+
+def _render_report(request_data: Dict[str, Any], path: str) -> Dict[str, Any]:
+    """
+    Build one report PDF: data is loaded here in one pass, facility sections render in the
+    report engine's process pool. Written to a temp file and renamed into place.
+    """
+    from app.core.database import SessionLocal
+    from app.services.report_engine import load_report_data, build_report
+
+    request = schemas.ReportRequest(**request_data)
+    db = SessionLocal()
+    try:
+        data = load_report_data(db, request)
+    finally:
+        db.close()
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with track_stage('report_render'):
+        stats = build_report(
+            data,
+            tmp_path,
+            include_forecasts=request.include_forecasts,
+            include_shap=request.include_shap
+        )
+    os.replace(tmp_path, path)
+    return stats
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Jobs only orchestrate (query, merge); the CPU-bound rendering goes to the engine's processes
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.REPORT_WORKERS, thread_name_prefix='report-job')
+    return _executor
+
+def submit_report(db: Session, request: schemas.ReportRequest) -> Optional[Dict[str, Any]]:
+    """
+    Get the job for a report request, starting it unless the PDF is cached or already being built
+
+    Returns:
+        Job dictionary (job_id, status, path, ...), or None when no CMLs match the request
+    """
+    version = data_version(db, request)
+    if version is None:
+        return None
+
+    key = report_key(request, version)
+    path = report_path(key)
+
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if os.path.exists(path):
+            if job is None or job['status'] != 'completed':
+                _prune_jobs()
+                job = _new_job(key, path, request, 'completed')
+                job['completed_at'] = datetime.now()
+                _jobs[key] = job
+            return job
+
+        if job is not None and job['status'] in ('pending', 'running'):
+            return job
+
+        os.makedirs(settings.REPORT_OUTPUT_DIR, exist_ok=True)
+        _prune_jobs()
+        job = _new_job(key, path, request, 'pending')
+        _jobs[key] = job
+        job['future'] = _get_executor().submit(_render_report, request.model_dump(mode='json'), path)
+
+    # Outside the lock: the callback takes it, and runs immediately if the job already finished
+    job['future'].add_done_callback(lambda future, key=key: _finish_job(key, future))
+    logger.info(f"Report job {key[:12]} submitted for facility {request.facility or 'All'}")
+    return job
+
+def run_report_batch(request: schemas.BatchReportRequest) -> Dict[str, Any]:
+    """
+    Build one report per facility: the fleet is loaded once, facilities whose report is
+    already cached are skipped and the rest render in parallel worker processes
+
+    Returns:
+        Manifest dictionary (see schemas.BatchReportResponse) plus each report's 'path'
+    """
+    from app.core.database import SessionLocal
+    from app.services.report_engine import load_report_data, render_facility_reports
+
+    start_time = time.time()
+    base = schemas.ReportRequest(
+        start_date=request.start_date,
+        end_date=request.end_date,
+        include_forecasts=request.include_forecasts,
+        include_shap=request.include_shap
+    )
+
+    db = SessionLocal()
+    try:
+        reports = {}
+        for facility, (count, version) in facility_versions(db, base, request.facilities).items():
+            key = report_key(base.model_copy(update={'facility': facility}), version)
+            path = report_path(key)
+            reports[facility] = {
+                'facility': facility,
+                'job_id': key,
+                'path': path,
+                'cml_count': count,
+                'cached': os.path.exists(path),
+                'pages': None,
+                'seconds': None,
+                'download_url': f"/api/v1/report/jobs/{key}/download"
+            }
+
+        pending = {facility: r['path'] for facility, r in reports.items() if not r['cached']}
+        data = load_report_data(db, base, facilities=list(pending)) if pending else None
+    finally:
+        db.close()
+    load_seconds = time.time() - start_time
+
+    if pending:
+        os.makedirs(settings.REPORT_OUTPUT_DIR, exist_ok=True)
+        with track_stage('report_batch_render'):
+            for facility, stats in render_facility_reports(data, pending, request.include_forecasts, request.include_shap):
+                reports[facility]['pages'] = stats['pages']
+                reports[facility]['seconds'] = round(stats['seconds'], 3)
+                logger.info(f"Report for {facility}: {stats['pages']} pages in {stats['seconds']:.2f}s")
+
+        prune_reports(keep=[r['path'] for r in reports.values()])
+
+    total_seconds = time.time() - start_time
+    logger.info(f"Batch report: {len(pending)} rendered, {len(reports) - len(pending)} cached in {total_seconds:.2f}s")
+    return {
+        'total_facilities': len(reports),
+        'rendered': len(pending),
+        'cached': len(reports) - len(pending),
+        'load_seconds': round(load_seconds, 3),
+        'total_seconds': round(total_seconds, 3),
+        'reports': list(reports.values())
+    }
+
+def submit_report_batch(request: schemas.BatchReportRequest) -> Future:
+    """Run a batch report on the report job threads"""
+    return _get_executor().submit(run_report_batch, request)
+
+def write_report_zip(manifest: Dict[str, Any], output) -> None:
+    """Write a batch's PDFs to a zip archive (path or binary stream), one file per facility"""
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for report in manifest['reports']:
+            name = re.sub(r'[^\w.-]+', '_', report['facility'])
+            archive.write(report['path'], arcname=f"CML_Report_{name}.pdf")
+
+def shutdown_report_workers():
+    """Stop the report job and rendering pools, abandoning queued jobs"""
+    from app.services.report_engine import shutdown_render_workers
+
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    shutdown_render_workers()
+
+def _new_job(key: str, path: str, request: schemas.ReportRequest, status: str) -> Dict[str, Any]:
+    return {
+        'job_id': key,
+        'status': status,
+        'path': path,
+        'facility': request.facility,
+        'created_at': datetime.now(),
+        'completed_at': None,
+        'error': None,
+        'future': None
+    }
+
+def _finish_job(key: str, future: Future):
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is None:
+            return
+        job['completed_at'] = datetime.now()
+        error = future.exception()
+        if error is None:
+            job['status'] = 'completed'
+        else:
+            job['status'] = 'failed'
+            job['error'] = str(error)
+            logger.error(f"Report job {key[:12]} failed: {error}")
+        path = job['path']
+    if error is None:
+        prune_reports(keep=[path])
+
+def _prune_jobs():
+    """Forget finished jobs older than REPORT_JOB_TTL, then the oldest beyond REPORT_MAX_JOBS (caller holds _jobs_lock)"""
+    now = datetime.now()
+    finished = sorted(
+        (job['completed_at'], key) for key, job in _jobs.items()
+        if job['status'] in ('completed', 'failed') and job['completed_at'] is not None
+    )
+    expired = [key for completed_at, key in finished if (now - completed_at).total_seconds() > settings.REPORT_JOB_TTL]
+    excess = len(_jobs) - len(expired) - settings.REPORT_MAX_JOBS + 1
+    if excess > 0:
+        expired += [key for _, key in finished[len(expired):len(expired) + excess]]
+    for key in expired:
+        del _jobs[key]
+
+def prune_reports(keep: Optional[List[str]] = None):
+    """
+    Delete stored PDFs older than REPORT_RETENTION_HOURS, then the oldest beyond REPORT_KEEP
+
+    Leftover temp files of renders that died are deleted with the same age limit. Paths in
+    keep (reports just built or about to be served) are never deleted.
+    """
+    if not os.path.isdir(settings.REPORT_OUTPUT_DIR):
+        return
+    keep = {os.path.abspath(path) for path in keep or []}
+    cutoff = time.time() - settings.REPORT_RETENTION_HOURS * 3600
+
+    reports = []
+    for entry in os.scandir(settings.REPORT_OUTPUT_DIR):
+        if not entry.is_file() or os.path.abspath(entry.path) in keep:
+            continue
+        try:
+            mtime = entry.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if entry.name.endswith('.tmp'):
+            if mtime < cutoff:
+                _remove_report(entry.path)
+        elif entry.name.endswith('.pdf'):
+            reports.append((mtime, entry.path))
+
+    reports.sort(reverse=True)
+    kept = max(settings.REPORT_KEEP - len(keep), 0)
+    for i, (mtime, path) in enumerate(reports):
+        if i >= kept or mtime < cutoff:
+            _remove_report(path)
+
+def _remove_report(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get a report job, including completed reports cached by another process"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None and job['status'] == 'completed' and not os.path.exists(job['path']):
+            # The PDF has been deleted by retention
+            del _jobs[job_id]
+            return None
+        if job is not None:
+            future = job['future']
+            if job['status'] == 'pending' and future is not None and future.running():
+                job['status'] = 'running'
+            return job
+
+    path = report_path(job_id)
+    if len(job_id) == 64 and all(c in '0123456789abcdef' for c in job_id) and os.path.exists(path):
+        return {'job_id': job_id, 'status': 'completed', 'path': path, 'facility': None,
+                'created_at': None, 'completed_at': None, 'error': None, 'future': None}
+    return None
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe view of a report job"""
+    return {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'facility': job['facility'],
+        'created_at': job['created_at'].isoformat() if job['created_at'] else None,
+        'completed_at': job['completed_at'].isoformat() if job['completed_at'] else None,
+        'error': job['error'],
+        'download_url': f"/api/v1/report/jobs/{job['job_id']}/download"
+                        if job['status'] == 'completed' else None
+    }
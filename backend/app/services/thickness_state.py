@@ -0,0 +1,181 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional
+import numpy as np
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.orm import Session
+from app.ml.kalman_filter import DAYS_PER_YEAR, STATE_FIELDS, ThicknessKalmanFilter
+from app.models.db_models import CML, Measurement, ThicknessState
+from app.services.remaining_life import IN_CHUNK_SIZE
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Matches the 30-day step of the linear and fleet forecasts
+FORECAST_STEP_DAYS = 30
+Z_95 = 1.96
+
+_EPOCH = date(1970, 1, 1)
+
+COLUMNS = {
+    'level': 'level_mm',
+    'rate': 'rate_mm_per_year',
+    'p00': 'p00',
+    'p01': 'p01',
+    'p11': 'p11'
+}
+
+def sync_thickness_states(db: Session, facility: Optional[str] = None, cml_ids: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Bring the persisted filter states of many CMLs up to date with their inspection history
+
+    Only measurements newer than a CML's state are applied. A state that does not account
+    for exactly the history up to its last date (e.g. the history was edited) is rebuilt.
+
+    Returns:
+        Dictionary with counts of 'updated' (incrementally) and 'rebuilt' CML states
+    """
+    from app.ml.fleet_forecast import pack_histories
+
+    query = db.query(CML.id, CML.inspection_history_dates, CML.inspection_history_measurements)
+    if facility:
+        query = query.filter(CML.facility == facility)
+    if cml_ids:
+        rows = []
+        for i in range(0, len(cml_ids), IN_CHUNK_SIZE):
+            rows.extend(query.filter(CML.cml_id.in_(cml_ids[i:i + IN_CHUNK_SIZE])).all())
+    else:
+        rows = query.all()
+    if not rows:
+        return {'updated': 0, 'rebuilt': 0}
+
+    cml_pks, dates, measurements = zip(*rows)
+    packed = pack_histories(dates, measurements, min_points=1)
+    pks = np.asarray(cml_pks)[packed['valid']]
+    n = len(pks)
+
+    existing = {}
+    for i in range(0, n, IN_CHUNK_SIZE):
+        chunk = pks[i:i + IN_CHUNK_SIZE].tolist()
+        existing.update((s.cml_id, s) for s in db.query(ThicknessState).filter(ThicknessState.cml_id.in_(chunk)).all())
+
+    state = {k: np.full(n, np.nan) for k in STATE_FIELDS}
+    last_day = np.full(n, np.nan)
+    n_prev = np.zeros(n, dtype=np.int64)
+    for i, pk in enumerate(pks.tolist()):
+        row = existing.get(pk)
+        if row is not None:
+            for key, column in COLUMNS.items():
+                state[key][i] = getattr(row, column)
+            last_day[i] = (row.last_date - _EPOCH).days
+            n_prev[i] = row.n_updates
+
+    group = np.repeat(np.arange(n), packed['lengths'])
+    day, value = packed['day'], packed['value']
+
+    with np.errstate(invalid='ignore'):
+        seen = day <= last_day[group]
+    seen_count = np.bincount(group, weights=seen, minlength=n).astype(np.int64)
+    rebuild = np.isnan(state['level']) | (seen_count != n_prev)
+    for key in STATE_FIELDS:
+        state[key][rebuild] = np.nan
+    last_day[rebuild] = np.nan
+    n_prev[rebuild] = 0
+
+    pending = ~seen | rebuild[group]
+    result = ThicknessKalmanFilter().filter(
+        group[pending], day[pending], value[pending], n, state=state, last_day=last_day
+    )
+
+    changed = result['n_updates'] > 0
+    if changed.any():
+        changed_pks = pks[changed].tolist()
+        for i in range(0, len(changed_pks), IN_CHUNK_SIZE):
+            chunk = changed_pks[i:i + IN_CHUNK_SIZE]
+            db.execute(delete(ThicknessState).where(ThicknessState.cml_id.in_(chunk)))
+        now = datetime.now()
+        db.execute(insert(ThicknessState), [
+            {
+                'cml_id': int(pk),
+                **{column: float(result[key][i]) for key, column in COLUMNS.items()},
+                'last_date': _EPOCH + timedelta(days=int(result['last_day'][i])),
+                'n_updates': int(n_prev[i] + result['n_updates'][i]),
+                'updated_at': now
+            }
+            for i, pk in zip(np.flatnonzero(changed), changed_pks)
+        ])
+    db.commit()
+
+    counts = {
+        'updated': int((changed & ~rebuild).sum()),
+        'rebuilt': int((changed & rebuild).sum())
+    }
+    logger.info(f"Thickness states synced for {n} CMLs ({counts['updated']} updated, {counts['rebuilt']} rebuilt)")
+    return counts
+
+def get_thickness_state(db: Session, cml: CML) -> Optional[ThicknessState]:
+    """Get a CML's filter state, building it from the inspection history if missing"""
+    row = db.query(ThicknessState).filter(ThicknessState.cml_id == cml.id).first()
+    if row is None:
+        sync_thickness_states(db, cml_ids=[cml.cml_id])
+        row = db.query(ThicknessState).filter(ThicknessState.cml_id == cml.id).first()
+    return row
+
+def _state_arrays(row) -> Dict[str, np.ndarray]:
+    return {key: np.array([getattr(row, column)], dtype=float) for key, column in COLUMNS.items()}
+
+def state_forecast(row: Optional[ThicknessState], periods: int = 24) -> Optional['pd.DataFrame']:
+    """Monthly thickness forecast read straight from a filter state, with a 95% band (None without a state)"""
+    import pandas as pd
+
+    if row is None:
+        return None
+
+    steps = FORECAST_STEP_DAYS * np.arange(1, periods + 1)
+    forecast = ThicknessKalmanFilter().forecast(_state_arrays(row), steps / DAYS_PER_YEAR)
+    mean, std = forecast['mean'][0], forecast['std'][0]
+
+    return pd.DataFrame({
+        'ds': pd.Timestamp(row.last_date) + pd.to_timedelta(steps, unit='D'),
+        'yhat': mean,
+        'yhat_lower': mean - Z_95 * std,
+        'yhat_upper': mean + Z_95 * std
+    })
+
+def state_failure_date(row: Optional[ThicknessState], min_allowable: Optional[float]) -> Optional[date]:
+    """Date the filtered thickness trend reaches the minimum allowable thickness"""
+    if row is None or min_allowable is None or row.rate_mm_per_year >= 0:
+        return None
+    years = (min_allowable - row.level_mm) / row.rate_mm_per_year
+    if years > 500:
+        return None
+    return row.last_date + timedelta(days=int(np.floor(years * DAYS_PER_YEAR)))
+
+# New measurements are folded into the persisted state in O(1); a CML without a state,
+# or a measurement older than its state, is (re)built from the history on next read
+@event.listens_for(Measurement, "after_insert")
+def _update_on_new_measurement(mapper, connection, target):
+    row = connection.execute(
+        select(ThicknessState).where(ThicknessState.cml_id == target.cml_id)
+    ).first()
+    if row is None:
+        return
+
+    if target.inspection_date <= row.last_date:
+        connection.execute(delete(ThicknessState).where(ThicknessState.cml_id == target.cml_id))
+        return
+
+    dt = (target.inspection_date - row.last_date).days / DAYS_PER_YEAR
+    updated = ThicknessKalmanFilter().update(_state_arrays(row), np.array([dt]), np.array([target.measured_thickness_mm]))
+    connection.execute(
+        update(ThicknessState)
+        .where(ThicknessState.cml_id == target.cml_id)
+        .values(
+            **{column: float(updated[key][0]) for key, column in COLUMNS.items()},
+            last_date=target.inspection_date,
+            n_updates=row.n_updates + 1,
+            updated_at=datetime.now()
+        )
+    )
@@ -0,0 +1,58 @@
+"""
+Production serving: a pre-fork gunicorn master with uvicorn workers
+
+    cd backend && gunicorn -c gunicorn.conf.py app.main:app
+
+The master imports the app, the ML libraries, the elimination model and its SHAP
+explainer before forking, so workers start warm and share those pages copy-on-write
+instead of each holding its own copy. The explainer's large NumPy arrays are also
+memory-mapped from SHARED_ARRAY_DIR, which keeps them shared even after a worker is
+recycled or the model is reloaded. Report per-worker memory with
+scripts/worker_memory.py.
+
+Prometheus metrics are written by each worker to PROMETHEUS_MULTIPROC_DIR and aggregated
+by /metrics, so a scrape covers every worker rather than whichever one answered it.
+"""
+
+import multiprocessing
+import os
+
+os.environ.setdefault("SHARED_ARRAY_DIR", "/dev/shm/cml-arrays" if os.path.isdir("/dev/shm") else "data/processed/shared")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/dev/shm/cml-metrics" if os.path.isdir("/dev/shm") else "data/processed/metrics")
+
+# Must exist before the app (and prometheus_client) is imported; values left by a previous
+# server would be counted again, so start from an empty directory
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+for name in os.listdir(os.environ["PROMETHEUS_MULTIPROC_DIR"]):
+    if name.endswith(".db"):
+        os.remove(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], name))
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers periodically so slow leaks (or pages dirtied after fork) do not accumulate
+max_requests = int(os.getenv("MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+pidfile = os.getenv("PIDFILE", "/tmp/cml-gunicorn.pid")
+accesslog = "-"
+
+def when_ready(server):
+    from app.core.serving import preload_for_workers
+    preload_for_workers()
+
+def post_fork(server, worker):
+    from app.core.serving import reset_after_fork
+    reset_after_fork()
+
+def post_worker_init(worker):
+    from app.core.serving import process_memory
+    worker.log.info(f"Worker {worker.pid} ready: {process_memory()}")
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (in-progress requests); its counters are kept
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
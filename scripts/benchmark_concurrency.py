@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Benchmark API throughput under concurrent clients
+
+Runs a fixed number of concurrent clients against a running server, each issuing
+requests back to back, and reports requests/sec and latency percentiles per endpoint.
+Run it against the server before and after a change, saving the first run with
+--output and passing it as --baseline to the second to print the speedup.
+
+Usage:
+    python scripts/benchmark_concurrency.py --url http://localhost:8000 --clients 50 --output before.json
+    python scripts/benchmark_concurrency.py --url http://localhost:8000 --clients 50 --baseline before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENDPOINTS = [
+    '/api/v1/dashboard/metrics',
+    '/api/v1/cml/summary',
+    '/api/v1/cml/list?limit=100',
+]
+
+async def run_endpoint(client: httpx.AsyncClient, path: str, clients: int, requests_per_client: int):
+    """Run `clients` concurrent loops of back-to-back GETs against one endpoint"""
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(clients)])
+    elapsed = time.perf_counter() - start_time
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 1),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 1),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 1)
+    }
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        # One warm-up request per endpoint so model/import costs are not measured
+        for path in args.endpoints:
+            await client.get(path)
+
+        results = {}
+        for path in args.endpoints:
+            results[path] = await run_endpoint(client, path, args.clients, args.requests)
+            logger.info(f"✅ {path}: {results[path]}")
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark API throughput under concurrent clients')
+    parser.add_argument('--url', type=str, default='http://localhost:8000', help='Server base URL')
+    parser.add_argument('--endpoints', type=str, nargs='+', default=DEFAULT_ENDPOINTS, help='GET paths to benchmark')
+    parser.add_argument('--clients', type=int, default=50, help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per client per endpoint')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Request timeout in seconds')
+    parser.add_argument('--baseline', type=str, help='Earlier results JSON to compare against')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    print(f"\n{'endpoint':<40}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'speedup':>10}")
+    for path, r in results.items():
+        speedup = ''
+        if path in baseline:
+            speedup = f"{r['requests_per_second'] / baseline[path]['requests_per_second']:.2f}x"
+        print(f"{path:<40}{r['requests_per_second']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+              f"{r['p99_ms']:>10}{r['errors']:>8}{speedup:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        logger.info(f"✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Benchmark forecasting models on synthetic wall-thickness series
+
+Generates irregularly inspected thickness histories with a known future, then
+reports per-model fit time, mean absolute error and 95% interval coverage on
+the held-out inspections.
+
+Usage:
+    python scripts/benchmark_forecast.py --cmls 200 --models linear arima prophet
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import json
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+from app.ml.model_forecast import CMLForecastModel, forecast_batch_arima
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+GROUPS = [('Crude', 'CS'), ('Gas', 'CS'), ('Water', 'SS'), ('Steam', 'Alloy')]
+
+def generate_series(n_cmls: int, holdout_years: float, seed: int = 42):
+    """
+    Generate synthetic inspection histories with a held-out future
+
+    Returns:
+        (histories, holdouts, groups) where histories and holdouts map cml_id to
+        'ds'/'y' DataFrames and groups maps cml_id to its (commodity, material) group
+    """
+    rng = np.random.default_rng(seed)
+    histories, holdouts, groups = {}, {}, {}
+
+    for i in range(n_cmls):
+        cml_id = f"BENCH-{i:05d}"
+        group = GROUPS[i % len(GROUPS)]
+        group_rate = 0.1 + 0.1 * (i % len(GROUPS))
+
+        n_points = int(rng.integers(6, 20))
+        # Irregular intervals of roughly 4 to 14 months
+        gaps = rng.uniform(120, 420, size=n_points + 6)
+        days = np.cumsum(gaps)
+        dates = pd.Timestamp('2005-01-01') + pd.to_timedelta(days.round(), unit='D')
+
+        rate = max(group_rate + rng.normal(0, 0.03), 0.01)
+        thickness = 12.0 - rate * days / 365.25 + rng.normal(0, 0.15, size=len(days))
+        df = pd.DataFrame({'ds': dates, 'y': thickness})
+
+        cutoff = df['ds'].iloc[n_points - 1] + pd.Timedelta(days=1)
+        future = df[df['ds'] > cutoff]
+        future = future[future['ds'] <= cutoff + pd.Timedelta(days=365.25 * holdout_years)]
+        if future.empty:
+            continue
+
+        histories[cml_id] = df.iloc[:n_points].reset_index(drop=True)
+        holdouts[cml_id] = future.reset_index(drop=True)
+        groups[cml_id] = group
+
+    return histories, holdouts, groups
+
+def score(forecast: pd.DataFrame, truth: pd.DataFrame):
+    """Interpolate a forecast at the held-out dates; returns (absolute errors, covered flags)"""
+    x = pd.to_datetime(forecast['ds']).to_numpy(dtype='datetime64[D]').astype(float)
+    t = pd.to_datetime(truth['ds']).to_numpy(dtype='datetime64[D]').astype(float)
+    yhat = np.interp(t, x, forecast['yhat'].to_numpy(dtype=float))
+    lower = np.interp(t, x, forecast['yhat_lower'].to_numpy(dtype=float))
+    upper = np.interp(t, x, forecast['yhat_upper'].to_numpy(dtype=float))
+    y = truth['y'].to_numpy(dtype=float)
+    return np.abs(yhat - y), (y >= lower) & (y <= upper)
+
+def run_model(model_type: str, histories, groups, periods: int, workers: int):
+    """Forecast every history with one model; returns (forecasts, models used, seconds)"""
+    start_time = time.time()
+    forecasts, used = {}, {}
+
+    if model_type == 'arima' and workers > 1:
+        for cml_id, forecast, model_used in forecast_batch_arima(
+            histories, groups, periods=periods, max_workers=workers
+        ):
+            forecasts[cml_id], used[cml_id] = forecast, model_used
+    else:
+        for cml_id, history in histories.items():
+            model = CMLForecastModel(model_type=model_type)
+            forecasts[cml_id] = model.predict(history, periods)
+            used[cml_id] = model_type
+
+    return forecasts, used, time.time() - start_time
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CML forecasting models')
+    parser.add_argument('--cmls', type=int, default=200, help='Number of synthetic CMLs')
+    parser.add_argument('--models', nargs='+', default=['linear', 'arima', 'prophet'],
+                        choices=['linear', 'arima', 'prophet'], help='Models to benchmark')
+    parser.add_argument('--periods', type=int, default=36, help='Months to forecast')
+    parser.add_argument('--holdout-years', type=float, default=3.0, help='Years of held-out inspections to score')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes for batched ARIMA')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    histories, holdouts, groups = generate_series(args.cmls, args.holdout_years, args.seed)
+    logger.info(f"Generated {len(histories)} synthetic CML histories")
+
+    results = {}
+    for model_type in args.models:
+        forecasts, used, elapsed = run_model(model_type, histories, groups, args.periods, args.workers)
+
+        errors, covered = [], []
+        for cml_id, forecast in forecasts.items():
+            abs_error, inside = score(forecast, holdouts[cml_id])
+            errors.append(abs_error)
+            covered.append(inside)
+        errors = np.concatenate(errors)
+        covered = np.concatenate(covered)
+
+        results[model_type] = {
+            'cmls': len(forecasts),
+            'fit_seconds': round(elapsed, 3),
+            'ms_per_cml': round(1000 * elapsed / max(len(forecasts), 1), 2),
+            'mae_mm': round(float(errors.mean()), 4),
+            'interval_coverage_95': round(float(covered.mean()), 4),
+            'fallbacks': sum(1 for m in used.values() if m != model_type)
+        }
+        logger.info(f"✅ {model_type}: {results[model_type]}")
+
+    print(f"\n{'model':<10}{'seconds':>10}{'ms/CML':>10}{'MAE mm':>10}{'cover95':>10}{'fallback':>10}")
+    for model_type, r in results.items():
+        print(f"{model_type:<10}{r['fit_seconds']:>10}{r['ms_per_cml']:>10}{r['mae_mm']:>10}"
+              f"{r['interval_coverage_95']:>10}{r['fallbacks']:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        logger.info(f"✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
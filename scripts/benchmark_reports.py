@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Benchmark PDF report rendering on a synthetic fleet
+
+Builds full reports (every candidate, forecast and SHAP table) without a database,
+serially and with each requested number of section workers, and reports pages/sec.
+
+Usage:
+    python scripts/benchmark_reports.py --cmls 20000 --facilities 8 --workers 1 2 4
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import json
+import tempfile
+import logging
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.report_engine import build_report, shutdown_render_workers
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+FEATURES = ['average_corrosion_rate', 'remaining_life_years', 'thickness_margin', 'number_of_inspections',
+            'commodity', 'material_type', 'feature_type', 'design_pressure_psi']
+RISK_LEVELS = ['Critical', 'High', 'Medium', 'Low']
+
+def generate_report_data(n_cmls: int, n_facilities: int, seed: int = 42):
+    """Synthetic report data in the shape returned by load_report_data"""
+    rng = np.random.default_rng(seed)
+    facilities = {}
+    today = date.today()
+
+    for i in range(n_cmls):
+        facility = f"Facility-{i % n_facilities:02d}"
+        rate = float(rng.uniform(0.01, 0.5))
+        remaining = float(rng.uniform(0.5, 40))
+        expected = today + timedelta(days=int(remaining * 365.25))
+        shap_values = zip(FEATURES, rng.normal(0, 0.2, len(FEATURES)).round(4).tolist())
+        drivers = sorted(shap_values, key=lambda item: abs(item[1]), reverse=True)[:3]
+        facilities.setdefault(facility, []).append({
+            'cml_id': f"BENCH-{i:06d}",
+            'facility': facility,
+            'system': f"SYS-{i % 17}",
+            'risk_level': RISK_LEVELS[min(int(remaining // 5), 3)],
+            'current_thickness_mm': float(rng.uniform(6, 14)),
+            'min_allowable_thickness_mm': 5.0,
+            'average_corrosion_rate': rate,
+            'remaining_life_years': remaining,
+            'elimination_candidate': bool(remaining > 15 and rng.random() < 0.6),
+            'requires_engineering_review': bool(rng.random() < 0.1),
+            'ml_confidence': float(rng.uniform(0.6, 0.99)),
+            'drivers': drivers,
+            'earliest_date': expected - timedelta(days=int(rng.uniform(30, 400))),
+            'expected_date': expected,
+            'latest_date': expected + timedelta(days=int(rng.uniform(30, 400)))
+        })
+
+    importance = {
+        facility: sorted(zip(FEATURES, rng.uniform(0, 0.5, len(FEATURES)).tolist()), key=lambda f: -f[1])
+        for facility in facilities
+    }
+    return {'facilities': facilities, 'importance': importance}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PDF report rendering')
+    parser.add_argument('--cmls', type=int, default=5000, help='Number of synthetic CMLs')
+    parser.add_argument('--facilities', type=int, default=4, help='Number of facilities (report sections)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4],
+                        help='Section worker counts to run (1 renders serially in-process)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    data = generate_report_data(args.cmls, args.facilities, args.seed)
+    logger.info(f"Generated {args.cmls} synthetic CMLs across {args.facilities} facilities")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for workers in args.workers:
+            shutdown_render_workers()
+            settings.REPORT_WORKERS = workers
+            path = os.path.join(workdir, f"report_{workers}.pdf")
+            stats = build_report(data, path, parallel=workers > 1)
+
+            results[workers] = {
+                'pages': stats['pages'],
+                'seconds': round(stats['seconds'], 3),
+                'pages_per_second': round(stats['pages'] / stats['seconds'], 1),
+                'megabytes': round(os.path.getsize(path) / 1e6, 2)
+            }
+            logger.info(f"✅ {workers} worker(s): {results[workers]}")
+        shutdown_render_workers()
+
+    print(f"\n{'workers':<10}{'pages':>10}{'seconds':>10}{'pages/s':>10}{'MB':>10}")
+    for workers, r in results.items():
+        print(f"{workers:<10}{r['pages']:>10}{r['seconds']:>10}{r['pages_per_second']:>10}{r['megabytes']:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        logger.info(f"✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Check the API's cold import time
+
+Imports app.main in a fresh interpreter under `python -X importtime` and reports the
+total plus the heaviest packages. Fails (exit code 1) when any library that should load
+lazily is imported at startup, when the total exceeds --max-ms, or when it regresses
+by more than --tolerance against a --baseline run. Run in CI or before merging changes
+to module-level imports.
+
+Usage:
+    python scripts/check_import_time.py --output import_time.json
+    python scripts/check_import_time.py --baseline import_time.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+# Libraries that must only be imported on first use, never by `import app.main`
+LAZY_PACKAGES = ['pandas', 'shap', 'xgboost', 'sklearn', 'prophet', 'statsmodels', 'reportlab', 'openpyxl', 'pyarrow']
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$')
+
+def measure(module: str) -> dict:
+    """Import a module in a fresh interpreter; returns total and per-package cumulative import times"""
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, DEBUG='False', PREWARM_IMPORTS='False')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    total_us = 0
+    packages = defaultdict(int)
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match[2]), len(match[3]) // 2, match[4]
+        if depth == 0:
+            total_us += cumulative
+        # The first import of a package's root covers everything it pulls in
+        root = name.split('.')[0]
+        if name == root and root not in packages:
+            packages[root] = cumulative
+
+    return {
+        'total_ms': round(total_us / 1000, 1),
+        'packages_ms': {name: round(us / 1000, 1) for name, us in sorted(packages.items(), key=lambda p: -p[1])}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the cold import time of the API')
+    parser.add_argument('--module', type=str, default='app.main', help='Module to import')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs to take the fastest of')
+    parser.add_argument('--max-ms', type=float, help='Fail when the import takes longer than this')
+    parser.add_argument('--baseline', type=str, help='Earlier results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown against the baseline')
+    parser.add_argument('--top', type=int, default=15, help='Packages to list')
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    result = min(runs, key=lambda r: r['total_ms'])
+    result['runs_ms'] = [r['total_ms'] for r in runs]
+
+    print(f"\nimport {args.module}: {result['total_ms']} ms (runs: {result['runs_ms']})")
+    print(f"\n{'package':<30}{'ms':>10}")
+    for name, ms in list(result['packages_ms'].items())[:args.top]:
+        print(f"{name:<30}{ms:>10}")
+
+    failures = []
+    eager = [name for name in LAZY_PACKAGES if name in result['packages_ms']]
+    if eager:
+        failures.append(f"imported at startup but should load lazily: {', '.join(eager)}")
+    if args.max_ms is not None and result['total_ms'] > args.max_ms:
+        failures.append(f"{result['total_ms']} ms exceeds the {args.max_ms} ms budget")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['total_ms']
+        print(f"\nbaseline: {baseline} ms ({result['total_ms'] / baseline:.2f}x)")
+        if result['total_ms'] > baseline * (1 + args.tolerance):
+            failures.append(f"{result['total_ms']} ms is more than {args.tolerance:.0%} slower than the baseline")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"✅ Results written to {args.output}")
+
+    for failure in failures:
+        logger.error(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    logger.info("✅ Import time check passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Compact stored forecasts, keeping only recent runs per CML
+
+Usage:
+    python scripts/compact_forecasts.py --keep-runs 3 --max-age-days 90
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import logging
+
+from app.core.database import SessionLocal
+from app.services.forecast_retention import compact_forecast_runs
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact stored forecast runs')
+    parser.add_argument('--keep-runs', type=int, help='Runs to keep per CML (default: FORECAST_RUNS_TO_KEEP)')
+    parser.add_argument('--max-age-days', type=int, help='Drop non-latest runs older than this (default: FORECAST_RUN_MAX_AGE_DAYS)')
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    
+    try:
+        result = compact_forecast_runs(db, keep_runs=args.keep_runs, max_age_days=args.max_age_days)
+        logger.info("✅ Forecast compaction completed!")
+        logger.info(f"   Runs deleted: {result['runs']}")
+        logger.info(f"   Run points deleted: {result['run_points']}")
+        logger.info(f"   Legacy points deleted: {result['legacy_points']}")
+    except Exception as e:
+        logger.error(f"Compaction failed: {e}", exc_info=True)
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
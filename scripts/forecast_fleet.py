@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Nightly linear wall-loss forecast for every CML
+
+Usage:
+    python scripts/forecast_fleet.py --periods 24 --output data/processed/
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import time
+from datetime import datetime
+import logging
+
+from app.core.database import SessionLocal
+from app.models.db_models import CML
+from app.ml.fleet_forecast import forecast_fleet
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description='Forecast wall loss for all CMLs')
+    parser.add_argument('--periods', type=int, default=24, help='Months to forecast')
+    parser.add_argument('--facility', type=str, help='Only forecast CMLs of this facility')
+    parser.add_argument('--output', type=str, default='data/processed/', help='Output directory for the CSV summary')
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    
+    try:
+        start_time = time.time()
+        
+        query = db.query(
+            CML.cml_id,
+            CML.min_allowable_thickness_mm,
+            CML.inspection_history_dates,
+            CML.inspection_history_measurements
+        )
+        if args.facility:
+            query = query.filter(CML.facility == args.facility)
+        
+        rows = query.all()
+        if not rows:
+            logger.error("No CML data found. Please upload data first.")
+            return
+        
+        cml_ids, min_allowable, dates, measurements = zip(*rows)
+        fleet = forecast_fleet(
+            cml_ids,
+            [m if m is not None else float('nan') for m in min_allowable],
+            dates,
+            measurements,
+            periods=args.periods
+        )
+        
+        os.makedirs(args.output, exist_ok=True)
+        output_file = os.path.join(args.output, f"fleet_forecast_{datetime.now().strftime('%Y%m%d')}.csv")
+        fleet['summary'].to_csv(output_file, index=False)
+        
+        logger.info(f"✅ Forecasted {len(fleet['summary'])} of {len(rows)} CMLs in {time.time() - start_time:.1f}s")
+        logger.info(f"   Skipped (insufficient history): {len(fleet['skipped'])}")
+        logger.info(f"   Summary written to: {output_file}")
+        
+    except Exception as e:
+        logger.error(f"Fleet forecast failed: {e}", exc_info=True)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+Generate a synthetic CML fleet for load testing
+
+Creates a CML master sheet with inspection histories for any number of CMLs spread
+over facilities, systems, commodities and materials. Corrosion rates depend on
+commodity, material and feature type; thickness readings follow each CML's rate with
+measurement noise, so corrosion metrics, remaining life and risk stay consistent with
+the history. Writes an Excel file in the upload format and/or loads the fleet
+straight into the configured database.
+
+Usage:
+    python scripts/generate_fleet.py --cmls 10000 --output data/raw/synthetic_10k.xlsx
+    python scripts/generate_fleet.py --cmls 1000000 --load
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import logging
+import time
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine
+from app.models.db_models import CML, RiskLevel
+from app.services.fleet_metrics import recompute_fleet_metrics
+from app.services.remaining_life import refresh_remaining_life
+from app.services.thickness_state import sync_thickness_states
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SHEET_NAME = 'CML_Master_Data'
+MAX_EXCEL_ROWS = 1_048_575
+MAX_INSPECTIONS = 15
+
+# Commodity: (typical corrosion rate in mm/year, share of the fleet)
+COMMODITIES = {
+    'Crude Oil': (0.06, 0.25),
+    'Natural Gas': (0.025, 0.20),
+    'Sour Gas': (0.15, 0.08),
+    'Produced Water': (0.18, 0.12),
+    'Condensate': (0.04, 0.15),
+    'Steam': (0.03, 0.10),
+    'Cooling Water': (0.10, 0.10),
+}
+# Material: (corrosion rate multiplier, share of the fleet)
+MATERIALS = {
+    'Carbon Steel': (1.0, 0.60),
+    'Low Alloy Steel': (0.7, 0.20),
+    'Stainless Steel 316': (0.15, 0.15),
+    'Duplex Stainless': (0.1, 0.05),
+}
+# Feature type: (corrosion rate multiplier, share of the fleet)
+FEATURE_TYPES = {
+    'Straight Pipe': (1.0, 0.40),
+    'Elbow': (1.4, 0.25),
+    'Tee': (1.3, 0.12),
+    'Reducer': (1.1, 0.08),
+    'Weld': (1.2, 0.10),
+    'Flange': (0.9, 0.05),
+}
+CML_SHAPES = ['Point', 'Band', 'Grid']
+TECHNIQUES = ['UT', 'PAUT', 'RT', 'GWUT']
+NOMINAL_THICKNESS_MM = [6.02, 7.11, 8.18, 9.27, 11.13, 12.70, 15.09]
+CORROSION_ALLOWANCE_MM = [1.5, 3.0, 3.0, 4.5]
+
+def _choice(rng: np.random.Generator, table: dict, n: int):
+    """Draw n keys of a {name: (multiplier, share)} table; returns (names, multipliers)"""
+    names = list(table)
+    shares = np.array([share for _, share in table.values()])
+    idx = rng.choice(len(names), size=n, p=shares / shares.sum())
+    return np.array(names, dtype=object)[idx], np.array([m for m, _ in table.values()])[idx]
+
+def _facility_name(i: int) -> str:
+    return f"Facility {chr(ord('A') + i)}" if i < 26 else f"Facility {i + 1:03d}"
+
+def _risk_level(remaining_life: np.ndarray) -> np.ndarray:
+    return np.select(
+        [remaining_life < settings.RISK_CRITICAL_YEARS,
+         remaining_life < settings.RISK_HIGH_YEARS,
+         remaining_life < settings.RISK_MEDIUM_YEARS],
+        [RiskLevel.CRITICAL.value, RiskLevel.HIGH.value, RiskLevel.MEDIUM.value],
+        default=RiskLevel.LOW.value
+    )
+
+def generate_fleet(
+    n_cmls: int,
+    n_facilities: int = 8,
+    seed: int = 42,
+    as_of: Optional[date] = None
+) -> pd.DataFrame:
+    """
+    Generate a synthetic CML master sheet
+
+    Args:
+        n_cmls: Number of CMLs
+        n_facilities: Number of facilities the CMLs are spread over
+        seed: Random seed; the same arguments always give the same fleet
+        as_of: Date the latest inspections lead up to (defaults to today)
+
+    Returns:
+        DataFrame with the upload columns (CML_ID, Facility, ..., Inspection_History_Measurements)
+    """
+    rng = np.random.default_rng(seed)
+    as_of = np.datetime64(as_of or date.today(), 'D')
+    n = n_cmls
+
+    # Plant hierarchy: facility -> system -> line -> equipment
+    facility_idx = rng.integers(0, n_facilities, size=n)
+    system_idx = rng.integers(1, 13, size=n)
+    line_idx = rng.integers(1, 41, size=n)
+    system = 'SYS-' + pd.Series(system_idx).astype(str).str.zfill(2)
+    line_id = ('F' + pd.Series(facility_idx + 1).astype(str).str.zfill(2) + '-' + system
+               + '-L' + pd.Series(line_idx).astype(str).str.zfill(3))
+    equipment_id = line_id + '-E' + pd.Series(rng.integers(1, 6, size=n)).astype(str)
+
+    commodity, base_rate = _choice(rng, COMMODITIES, n)
+    material, material_factor = _choice(rng, MATERIALS, n)
+    feature_type, feature_factor = _choice(rng, FEATURE_TYPES, n)
+    rate = base_rate * material_factor * feature_factor * rng.lognormal(0.0, 0.5, size=n)
+    rate = np.clip(rate, 0.001, settings.MAX_CORROSION_RATE)
+
+    design = rng.choice(NOMINAL_THICKNESS_MM, size=n)
+    allowance = rng.choice(CORROSION_ALLOWANCE_MM, size=n)
+    min_allowable = np.round(design - allowance, 2)
+    years_in_service = rng.integers(3, 41, size=n)
+    installed = as_of - (years_in_service * 365.25).astype('timedelta64[D]')
+
+    # Irregular inspection intervals from the first year of service up to a last inspection
+    # that is between a month and four years old
+    n_inspections = np.clip(2 + rng.poisson(years_in_service / 4), 2, MAX_INSPECTIONS)
+    last_age_days = rng.uniform(30, 4 * 365.25, size=n)
+    span_days = np.maximum((years_in_service - 1) * 365.25 - last_age_days, 180)
+    first_col = MAX_INSPECTIONS - n_inspections
+    used = np.arange(MAX_INSPECTIONS) >= first_col[:, None]
+    gaps = np.where(np.arange(MAX_INSPECTIONS) > first_col[:, None], rng.exponential(1.0, size=(n, MAX_INSPECTIONS)), 0.0)
+    offsets = np.cumsum(gaps, axis=1)
+    offsets /= offsets[:, -1:]
+    days_since_install = 365.25 + offsets * span_days[:, None]
+    dates = installed[:, None] + days_since_install.astype('timedelta64[D]')
+    readings = design[:, None] - rate[:, None] * days_since_install / 365.25 + rng.normal(0, 0.1, size=(n, MAX_INSPECTIONS))
+    # Corroded-through locations get repaired, so readings never fall far below minimum
+    readings = np.maximum(readings, min_allowable[:, None] * 0.85).round(2)
+
+    rows = np.arange(n)
+    first_date, last_date = dates[rows, first_col], dates[:, -1]
+    first_reading, current = readings[rows, first_col], readings[:, -1]
+    years_observed = np.maximum((last_date - first_date).astype(float) / 365.25, 0.1)
+    average_rate = np.clip((first_reading - current) / years_observed, 0.001, settings.MAX_CORROSION_RATE).round(4)
+    remaining_life = np.clip(
+        (current - min_allowable) / average_rate, settings.MIN_REMAINING_LIFE, settings.MAX_REMAINING_LIFE
+    ).round(2)
+    quality = np.clip(rng.beta(8, 2, size=n), 0.3, 1.0).round(2)
+
+    # Candidates: long remaining life, slow corrosion, good data, with some label noise
+    candidate = (remaining_life > 20) & (average_rate < 0.1) & (quality > 0.7)
+    candidate ^= rng.random(n) < 0.03
+
+    date_strings = np.datetime_as_string(dates, unit='D')
+    reading_strings = readings.astype(str)
+    history_dates = ['|'.join(d[m]) for d, m in zip(date_strings, used)]
+    history_measurements = ['|'.join(r[m]) for r, m in zip(reading_strings, used)]
+
+    logger.info(f"Generated {n} CMLs across {n_facilities} facilities")
+    return pd.DataFrame({
+        'CML_ID': [f"CML-{i + 1:07d}" for i in range(n)],
+        'Line_ID': line_id,
+        'Equipment_ID': equipment_id,
+        'Facility': np.array([_facility_name(i) for i in range(n_facilities)], dtype=object)[facility_idx],
+        'System': system,
+        'Commodity': commodity,
+        'Material_Type': material,
+        'Feature_Type': feature_type,
+        'CML_Shape': rng.choice(CML_SHAPES, size=n),
+        'Design_Thickness_mm': design,
+        'Min_Allowable_Thickness_mm': min_allowable,
+        'Corrosion_Allowance_mm': allowance,
+        'Current_Thickness_mm': current,
+        'Average_Corrosion_Rate_mm_per_year': average_rate,
+        'Years_In_Service': years_in_service,
+        'Number_of_Inspections': n_inspections,
+        'Last_Inspection_Date': pd.to_datetime(last_date).date,
+        'First_Inspection_Date': pd.to_datetime(first_date).date,
+        'Remaining_Life_Years': remaining_life,
+        'Risk_Level': _risk_level(remaining_life),
+        'Isometric_ID': 'ISO-' + line_id,
+        'Inspection_Technique': rng.choice(TECHNIQUES, size=n, p=[0.7, 0.15, 0.1, 0.05]),
+        'Data_Quality_Score': quality,
+        'Elimination_Candidate': candidate.astype(int),
+        'Requires_Engineering_Review': ((remaining_life < settings.RISK_HIGH_YEARS) | (quality < 0.5)).astype(int),
+        'Inspection_History_Dates': history_dates,
+        'Inspection_History_Measurements': history_measurements,
+        'Notes': ''
+    })
+
+def write_master_sheet(df: pd.DataFrame, path: str):
+    """Write the fleet as an upload-ready Excel workbook"""
+    if len(df) > MAX_EXCEL_ROWS:
+        raise ValueError(f"{len(df)} CMLs do not fit in one Excel sheet (max {MAX_EXCEL_ROWS}); use --load")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    df.to_excel(path, sheet_name=SHEET_NAME, index=False)
+
+def load_fleet(db: Session, df: pd.DataFrame, chunk_size: int = 10000) -> int:
+    """
+    Bulk insert the fleet and derive metrics the way an upload does
+
+    Runs the same recompute, remaining-life and thickness-state passes as
+    /api/v1/cml/upload, but with batched INSERTs in place of the row-by-row ORM.
+    """
+    records = df.rename(columns={
+        'CML_ID': 'cml_id', 'Line_ID': 'line_id', 'Equipment_ID': 'equipment_id',
+        'Facility': 'facility', 'System': 'system', 'Commodity': 'commodity',
+        'Material_Type': 'material_type', 'Feature_Type': 'feature_type', 'CML_Shape': 'cml_shape',
+        'Design_Thickness_mm': 'design_thickness_mm', 'Min_Allowable_Thickness_mm': 'min_allowable_thickness_mm',
+        'Corrosion_Allowance_mm': 'corrosion_allowance_mm', 'Current_Thickness_mm': 'current_thickness_mm',
+        'Average_Corrosion_Rate_mm_per_year': 'average_corrosion_rate', 'Years_In_Service': 'years_in_service',
+        'Number_of_Inspections': 'number_of_inspections', 'Last_Inspection_Date': 'last_inspection_date',
+        'First_Inspection_Date': 'first_inspection_date', 'Remaining_Life_Years': 'remaining_life_years',
+        'Risk_Level': 'risk_level', 'Isometric_ID': 'isometric_id', 'Inspection_Technique': 'inspection_technique',
+        'Data_Quality_Score': 'data_quality_score', 'Elimination_Candidate': 'elimination_candidate',
+        'Requires_Engineering_Review': 'requires_engineering_review',
+        'Inspection_History_Dates': 'inspection_history_dates',
+        'Inspection_History_Measurements': 'inspection_history_measurements', 'Notes': 'notes'
+    })
+    records['risk_level'] = records['risk_level'].map(RiskLevel)
+    records['elimination_candidate'] = records['elimination_candidate'].astype(bool)
+    records['requires_engineering_review'] = records['requires_engineering_review'].astype(bool)
+    records = records.astype(object)
+
+    for start in range(0, len(records), chunk_size):
+        db.execute(insert(CML), records.iloc[start:start + chunk_size].to_dict('records'))
+        db.commit()
+        if (start // chunk_size) % 10 == 9:
+            logger.info(f"Inserted {start + chunk_size} CMLs...")
+
+    recompute_fleet_metrics(db)
+    refresh_remaining_life(db)
+    sync_thickness_states(db)
+    return len(records)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic CML fleet')
+    parser.add_argument('--cmls', type=int, default=10000, help='Number of CMLs')
+    parser.add_argument('--facilities', type=int, default=8, help='Number of facilities')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', type=str, help='Write the master sheet to this Excel file')
+    parser.add_argument('--load', action='store_true', help='Insert the fleet into the configured database')
+    parser.add_argument('--replace', action='store_true', help='Delete existing CMLs before loading')
+    args = parser.parse_args()
+
+    if not args.output and not args.load:
+        parser.error('Nothing to do: pass --output and/or --load')
+
+    start = time.perf_counter()
+    df = generate_fleet(args.cmls, n_facilities=args.facilities, seed=args.seed)
+    logger.info(f"Generated in {time.perf_counter() - start:.1f}s")
+
+    if args.output:
+        start = time.perf_counter()
+        write_master_sheet(df, args.output)
+        logger.info(f"✅ Master sheet written to {args.output} in {time.perf_counter() - start:.1f}s")
+
+    if args.load:
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        try:
+            if args.replace:
+                db.query(CML).delete()
+                db.commit()
+            start = time.perf_counter()
+            loaded = load_fleet(db, df)
+            logger.info(f"✅ Loaded {loaded} CMLs in {time.perf_counter() - start:.1f}s")
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    main()
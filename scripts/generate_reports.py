@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Generate PDF reports for every facility in one batch
+
+Loads the fleet once, renders the facility reports in parallel worker processes
+(skipping any whose data is unchanged since the last run) and prints per-facility timings.
+
+Usage:
+    python scripts/generate_reports.py
+    python scripts/generate_reports.py --facilities "Facility A" "Facility B" --zip monthly_reports.zip
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import argparse
+import json
+import logging
+from datetime import datetime
+
+from app.models import schemas
+from app.services.report_jobs import run_report_batch, write_report_zip, shutdown_report_workers
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate PDF reports for all facilities')
+    parser.add_argument('--facilities', type=str, nargs='+', help='Only these facilities (default: all)')
+    parser.add_argument('--start-date', type=str, help='Earliest last inspection date (YYYY-MM-DD)')
+    parser.add_argument('--end-date', type=str, help='Latest last inspection date (YYYY-MM-DD)')
+    parser.add_argument('--no-forecasts', action='store_true', help='Leave out forecast tables')
+    parser.add_argument('--no-shap', action='store_true', help='Leave out SHAP tables')
+    parser.add_argument('--zip', type=str, help='Also write all reports to this zip file')
+    parser.add_argument('--manifest', type=str, help='Write the manifest as JSON to this file')
+    args = parser.parse_args()
+
+    request = schemas.BatchReportRequest(
+        facilities=args.facilities,
+        start_date=datetime.strptime(args.start_date, '%Y-%m-%d').date() if args.start_date else None,
+        end_date=datetime.strptime(args.end_date, '%Y-%m-%d').date() if args.end_date else None,
+        include_forecasts=not args.no_forecasts,
+        include_shap=not args.no_shap
+    )
+
+    try:
+        manifest = run_report_batch(request)
+    finally:
+        shutdown_report_workers()
+
+    if not manifest['total_facilities']:
+        logger.warning("No CMLs found matching criteria")
+        return
+
+    print(f"\n{'facility':<30}{'CMLs':>8}{'pages':>8}{'seconds':>10}  path")
+    for report in manifest['reports']:
+        pages = report['pages'] if report['pages'] is not None else '-'
+        seconds = report['seconds'] if report['seconds'] is not None else 'cached'
+        print(f"{report['facility']:<30}{report['cml_count']:>8}{pages:>8}{seconds:>10}  {report['path']}")
+    print(f"\n{manifest['rendered']} rendered, {manifest['cached']} cached; "
+          f"load {manifest['load_seconds']}s, total {manifest['total_seconds']}s")
+
+    if args.zip:
+        write_report_zip(manifest, args.zip)
+        logger.info(f"✅ Reports zipped to {args.zip}")
+
+    if args.manifest:
+        with open(args.manifest, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        logger.info(f"✅ Manifest written to {args.manifest}")
+
+if __name__ == "__main__":
+    main()
@@ -9,3 +9,15 @@ GRANT ALL PRIVILEGES ON DATABASE cml_optimization TO cml_user;
 
 -- Create indexes for better performance (will be created by SQLAlchemy, but included here for reference)
 -- Tables will be created by SQLAlchemy Base.metadata.create_all()
+
+-- Existing deployments created before forecast runs were introduced need the new
+-- column and index on forecasts (the forecast_runs table is created by SQLAlchemy):
+--   ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS run_id INTEGER REFERENCES forecast_runs(id) ON DELETE CASCADE;
+--   CREATE INDEX IF NOT EXISTS ix_forecasts_cml_run ON forecasts (cml_id, run_id);
+--
+-- Corrosion rates recomputed from the inspection history after each upload:
+--   ALTER TABLE cmls ADD COLUMN IF NOT EXISTS short_term_corrosion_rate DOUBLE PRECISION;
+--   ALTER TABLE cmls ADD COLUMN IF NOT EXISTS long_term_corrosion_rate DOUBLE PRECISION;
+--
+-- Facility CML counts that weight fleet-wide SHAP importance:
+--   ALTER TABLE feature_importance_stats ADD COLUMN IF NOT EXISTS population INTEGER DEFAULT 0;
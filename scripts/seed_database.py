@@ -16,6 +16,7 @@ import logging
 
 from backend.app.core.database import SessionLocal, engine, Base
 from backend.app.models.db_models import CML, RiskLevel
+from backend.app.services.fleet_metrics import recompute_fleet_metrics
 
 logging.basicConfig(
     level=logging.INFO,
@@ -102,6 +103,11 @@ def seed_database(excel_file: str = 'data/raw/CML_Optimization_Sample_Data.xlsx'
                 failed += 1
         
         db.commit()
+        
+        # Derive corrosion rates, remaining life and risk from the inspection history
+        recomputed = recompute_fleet_metrics(db)
+        logger.info(f"Recomputed corrosion metrics for {recomputed} CMLs")
+        
         logger.info(f"✅ Database seeded successfully!")
         logger.info(f"   Successful: {successful}")
         logger.info(f"   Failed: {failed}")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Report per-worker memory of the gunicorn pre-fork server
+
+Reads the master pid from the gunicorn pidfile (or --pid), finds its worker processes
+and prints RSS, PSS and shared/private memory for each. RSS counts pages shared with
+the master in every worker; PSS divides them between the processes mapping them, so
+the PSS total is the server's actual footprint. Linux only (reads /proc).
+
+Usage:
+    python scripts/worker_memory.py
+    python scripts/worker_memory.py --pid 1234 --output worker_memory.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.core.serving import process_memory
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['rss_mb', 'pss_mb', 'shared_mb', 'private_mb', 'swap_mb']
+
+def child_pids(pid: int) -> list:
+    """Direct children of a process"""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields after it are fixed
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (FileNotFoundError, ProcessLookupError, IndexError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+def main():
+    parser = argparse.ArgumentParser(description='Report per-worker memory of the gunicorn server')
+    parser.add_argument('--pid', type=int, help='Master pid (default: read from --pidfile)')
+    parser.add_argument('--pidfile', type=str, default=os.getenv('PIDFILE', '/tmp/cml-gunicorn.pid'))
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    master = args.pid
+    if master is None:
+        try:
+            with open(args.pidfile) as f:
+                master = int(f.read().strip())
+        except FileNotFoundError:
+            logger.error(f"❌ No pidfile at {args.pidfile}; is the server running? Pass --pid otherwise")
+            sys.exit(1)
+
+    processes = {'master': {'pid': master, **process_memory(master)}}
+    for pid in child_pids(master):
+        processes[f'worker {pid}'] = {'pid': pid, **process_memory(pid)}
+    workers = [p for name, p in processes.items() if name != 'master']
+
+    totals = {column: round(sum(p.get(column, 0.0) for p in processes.values()), 1) for column in COLUMNS}
+    result = {
+        'master_pid': master,
+        'workers': len(workers),
+        'processes': processes,
+        'totals': totals,
+        'mean_worker_rss_mb': round(sum(p.get('rss_mb', 0.0) for p in workers) / len(workers), 1) if workers else 0.0,
+        'mean_worker_pss_mb': round(sum(p.get('pss_mb', 0.0) for p in workers) / len(workers), 1) if workers else 0.0,
+    }
+
+    print(f"\n{'process':<20}" + ''.join(f"{column:>12}" for column in COLUMNS))
+    for name, memory in list(processes.items()) + [('total', totals)]:
+        print(f"{name:<20}" + ''.join(f"{memory.get(column, '-'):>12}" for column in COLUMNS))
+    print(f"\n{len(workers)} workers, mean RSS {result['mean_worker_rss_mb']} MB, mean PSS {result['mean_worker_pss_mb']} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()